@@ -0,0 +1,120 @@
+"""
+Análisis de Componentes Principales sin interfaz gráfica.
+
+Expone el flujo completo (carga, PCA, búsqueda de combinaciones, informes y
+exportación) para usarlo desde scripts, la ventana de AppPCA o la línea de
+comandos (python -m acp).
+
+Los nombres se importan al primer uso: 'import acp' no carga numpy, pandas
+ni scikit-learn hasta que se pide algo de acp.combinaciones o acp.motor.
+"""
+import importlib
+
+_EXPORTADOS = {
+    # acp.parametros (ligero)
+    "ANCHO_HAZ": "parametros",
+    "FORMATOS_EXPORTACION": "parametros",
+    "MAX_K_COMBINACIONES": "parametros",
+    "METODOS_EXACTOS": "parametros",
+    "MODOS_BUSQUEDA": "parametros",
+    "MODOS_EXACTOS": "parametros",
+    "PRECISIONES": "parametros",
+    "PROCESOS_POR_DEFECTO": "parametros",
+    "TOP_N_COMBINACIONES": "parametros",
+    "BusquedaCancelada": "parametros",
+    # acp.rendimiento (ligero)
+    "RegistroRendimiento": "rendimiento",
+    "exportar_rendimiento": "rendimiento",
+    # acp.seleccion (ligero)
+    "PATRON_IDENTIFICADOR": "seleccion",
+    "SeleccionColumnas": "seleccion",
+    "columnas_por_defecto": "seleccion",
+    # acp.combinaciones (numpy)
+    "buscar_mejores_combinaciones": "combinaciones",
+    "elegir_modo_automatico": "combinaciones",
+    "matriz_correlacion": "combinaciones",
+    "total_combinaciones": "combinaciones",
+    # acp.cache (pandas)
+    "CARPETA_CACHE_DISCO": "cache",
+    "CacheDisco": "cache",
+    "CacheLRU": "cache",
+    "huella_archivo": "cache",
+    "huella_contenido": "cache",
+    "huella_datos": "cache",
+    # acp.carga (pandas)
+    "FILAS_POR_BLOQUE": "carga",
+    "FuenteDatos": "carga",
+    "cargar_datos": "carga",
+    "pyarrow_disponible": "carga",
+    # acp.estadisticas (pandas)
+    "EstadisticasSuficientes": "estadisticas",
+    "analizar_pca_desde_estadisticas": "estadisticas",
+    # acp.exportacion (pandas; openpyxl y pyarrow al usarlos)
+    "escribir_componentes": "exportacion",
+    "formato_exportacion": "exportacion",
+    # acp.incremental (pandas)
+    "EstadisticasIncrementales": "incremental",
+    "ModeloPCA": "incremental",
+    "analizar_pca_por_bloques": "incremental",
+    "exportar_componentes_por_bloques": "incremental",
+    "resultado_desde_estadisticas": "incremental",
+    "usar_por_bloques": "incremental",
+    # acp.indice (numpy)
+    "IndiceCombinaciones": "indice",
+    "formatear_consulta": "indice",
+    # acp.lotes (pandas y scikit-learn)
+    "OpcionesLote": "lotes",
+    "ResultadoArchivo": "lotes",
+    "archivos_del_lote": "lotes",
+    "formatear_resumen_lote": "lotes",
+    "procesar_archivo": "lotes",
+    "procesar_lote": "lotes",
+    # acp.resolutores (numpy y scikit-learn)
+    "RESOLUTORES": "resolutores",
+    "ResultadoResolutor": "resolutores",
+    "elegir_resolutor": "resolutores",
+    "resolver_pca": "resolutores",
+    "validar_resolutor": "resolutores",
+    # acp.motor (pandas y scikit-learn)
+    "CARPETA_REPORTES": "motor",
+    "ResultadoCombinaciones": "motor",
+    "ResultadoK": "motor",
+    "ResultadoPCA": "motor",
+    "analizar_pca": "motor",
+    "buscar_combinaciones": "motor",
+    "buscar_combinaciones_archivo": "motor",
+    "correlacion_para_combinaciones": "motor",
+    "exportar_componentes": "motor",
+    "formatear_informe_combinaciones": "motor",
+    "formatear_progreso": "motor",
+    "guardar_informe": "motor",
+    "guardar_indice": "motor",
+    "limpiar_datos": "motor",
+    "lineas_analisis": "motor",
+    "lineas_cierre_combinaciones": "motor",
+    "lineas_encabezado_combinaciones": "motor",
+    "lineas_reduccion": "motor",
+    "lineas_resultado_k": "motor",
+    "nombre_exportacion": "motor",
+    "retencion": "motor",
+}
+
+__all__ = list(_EXPORTADOS)
+
+
+def __getattr__(nombre):
+    modulo = _EXPORTADOS.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f".{modulo}", __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+def precargar():
+    """Importa el motor completo (numpy, pandas, scikit-learn) de una vez."""
+    importlib.import_module(".motor", __name__)
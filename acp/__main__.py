@@ -0,0 +1,298 @@
+"""
+Línea de comandos: el mismo análisis que la ventana, sin tkinter.
+
+Ejemplos:
+    python -m acp "nueva_base_1 2(matriz).csv"
+    python -m acp datos.csv --columnas A,B,C --componentes 2 --exportar pcs.csv
+    python -m acp datos.csv --combinaciones --modo haz --top 3 --guardar-informe
+    python -m acp datos.csv --combinaciones --rendimiento tiempos.json
+    python -m acp grande.csv --precision float32 --en-disco --exportar pcs.npy
+    python -m acp carpeta_datos --salida resultados --formato .csv --procesos 4
+    python -m acp "datos/**/*.xlsx" --patron "nucA" --componentes 2
+    python -m acp datos.csv --combinaciones --guardar-indice
+    python -m acp "Mejores Combinaciones/datos_Combinaciones.npz" --k 5 --contiene "area (nucA)" --limite 1
+    python -m acp "Mejores Combinaciones/datos_Combinaciones.npz" --minimo 90
+"""
+import argparse
+import glob
+import os
+import sys
+
+from .cache import CARPETA_CACHE_DISCO, CacheDisco
+from .carga import MOTOR_CSV, FuenteDatos
+from .incremental import analizar_pca_por_bloques, exportar_componentes_por_bloques, usar_por_bloques
+from .motor import (
+    CARPETA_REPORTES,
+    analizar_pca,
+    buscar_combinaciones_archivo,
+    exportar_componentes,
+    formatear_informe_combinaciones,
+    guardar_indice,
+    guardar_informe,
+    lineas_analisis,
+)
+from .indice import EXTENSION_INDICE, IndiceCombinaciones, formatear_consulta
+from .lotes import OpcionesLote, archivos_del_lote, formatear_resumen_lote, procesar_lote
+from .parametros import (
+    ANCHO_HAZ,
+    FORMATOS_EXPORTACION,
+    MAX_K_COMBINACIONES,
+    MODOS_BUSQUEDA,
+    PRECISIONES,
+    PROCESOS_POR_DEFECTO,
+    TOP_N_COMBINACIONES,
+)
+from .rendimiento import RegistroRendimiento, exportar_rendimiento
+from .resolutores import RESOLUTORES
+from .seleccion import columnas_por_defecto, compilar_filtro
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m acp",
+        description="Análisis de Componentes Principales y búsqueda de las mejores combinaciones de variables.")
+    parser.add_argument("archivo",
+                        help="Archivo CSV o Excel con los datos. Una carpeta o un patrón glob (entre comillas) procesa "
+                             "un lote: análisis, combinaciones, informe y exportación de cada archivo. Un índice "
+                             f"({EXTENSION_INDICE}) de --guardar-indice se consulta con --k, --contiene, --excluye, "
+                             "--minimo y --limite.")
+    parser.add_argument("--columnas",
+                        help="Variables a analizar separadas por comas (por defecto, las numéricas que no parecen identificadores).")
+    parser.add_argument("--patron",
+                        help="Deja solo las variables cuyo nombre contiene este texto (sin distinguir mayúsculas).")
+    parser.add_argument("--regex", action="store_true", help="--patron es una expresión regular.")
+    parser.add_argument("--componentes", type=int, default=1,
+                        help="Componentes para el resultado de reducción y cuya retención maximiza la "
+                             "búsqueda de combinaciones (por defecto 1).")
+    parser.add_argument("--resolutor", default="automatico", choices=["automatico"] + list(RESOLUTORES),
+                        help="Cómo calcular los componentes (por defecto automatico, según la forma de los datos).")
+    parser.add_argument("--precision", default="float64", choices=list(PRECISIONES.values()),
+                        help="Precisión de los datos y los componentes (float32 ocupa la mitad e informa el error frente a float64).")
+    parser.add_argument("--en-disco", action="store_true",
+                        help="Guarda los datos estandarizados y los componentes en archivos temporales mapeados en memoria "
+                             "(en la carpeta temporal del sistema, TMPDIR).")
+    parser.add_argument("--todos-los-componentes", action="store_true",
+                        help="Calcula todos los componentes aunque solo se retengan --componentes.")
+    parser.add_argument("--exportar", metavar="RUTA",
+                        help="Guarda los componentes y COMPONENTE_SUMA (.xlsx, .parquet, .csv o .npy).")
+    parser.add_argument("--combinaciones", action="store_true",
+                        help="Busca además las mejores combinaciones de variables.")
+    parser.add_argument("--modo", default="automatico", choices=list(MODOS_BUSQUEDA.values()),
+                        help="Modo de búsqueda de combinaciones (por defecto automatico).")
+    parser.add_argument("--max-k", type=int, default=MAX_K_COMBINACIONES,
+                        help=f"Tamaño máximo de subconjunto (por defecto {MAX_K_COMBINACIONES}).")
+    parser.add_argument("--top", type=int, default=TOP_N_COMBINACIONES,
+                        help=f"Subconjuntos listados por k (por defecto {TOP_N_COMBINACIONES}).")
+    parser.add_argument("--ancho-haz", type=int, default=ANCHO_HAZ,
+                        help=f"Ancho de la búsqueda en haz (por defecto {ANCHO_HAZ}).")
+    parser.add_argument("--procesos", type=int, default=PROCESOS_POR_DEFECTO,
+                        help=f"Procesos para la enumeración exacta, o archivos a la vez en un lote "
+                             f"(por defecto {PROCESOS_POR_DEFECTO}).")
+    parser.add_argument("--motor-csv", default=MOTOR_CSV, choices=["c", "pyarrow"],
+                        help=f"Lector de CSV (por defecto {MOTOR_CSV}; pyarrow solo si está instalado).")
+    parser.add_argument("--por-bloques", action="store_true",
+                        help="Analiza el archivo por bloques sin cargarlo en memoria (automático en CSV grandes).")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help=f"No usa ni guarda búsquedas de combinaciones en la caché de disco ({CARPETA_CACHE_DISCO}).")
+    parser.add_argument("--guardar-informe", action="store_true",
+                        help="Guarda el informe de combinaciones en 'Mejores Combinaciones'.")
+    parser.add_argument("--guardar-indice", action="store_true",
+                        help="Guarda todas las combinaciones puntuadas en 'Mejores Combinaciones' para consultarlas "
+                             "después sin repetir la búsqueda (solo las enumeradas en los modos exactos).")
+    parser.add_argument("--k", type=int, help="Índice: tamaño de las combinaciones (por defecto, todos).")
+    parser.add_argument("--contiene", help="Índice: variables que deben estar, separadas por comas.")
+    parser.add_argument("--excluye", help="Índice: variables que no deben estar, separadas por comas.")
+    parser.add_argument("--minimo", type=float, help="Índice: retención mínima en %%.")
+    parser.add_argument("--limite", type=int, help="Índice: combinaciones listadas por k (por defecto, todas).")
+    parser.add_argument("--salida", default=CARPETA_REPORTES, metavar="CARPETA",
+                        help=f"Lote: carpeta de los informes, las exportaciones y el índice (por defecto '{CARPETA_REPORTES}').")
+    parser.add_argument("--formato", default=next(iter(FORMATOS_EXPORTACION)), choices=list(FORMATOS_EXPORTACION),
+                        help="Lote: formato de las exportaciones de componentes (por defecto .xlsx).")
+    parser.add_argument("--rendimiento", metavar="RUTA",
+                        help="Guarda en un JSON el tiempo, la CPU y los conteos de cada etapa.")
+    parser.add_argument("--medir-memoria", action="store_true",
+                        help="Con --rendimiento, mide también el pico de memoria de cada etapa (más lento).")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    registros = []
+
+    def nuevo_registro(operacion):
+        registro = RegistroRendimiento(operacion, medir_memoria=args.rendimiento is not None and args.medir_memoria)
+        registros.append(registro)
+        return registro
+
+    try:
+        if os.path.isdir(args.archivo) or glob.has_magic(args.archivo):
+            return ejecutar_lote(args, nuevo_registro)
+        if args.archivo.lower().endswith(EXTENSION_INDICE):
+            return consultar_indice(args)
+        return ejecutar(args, nuevo_registro)
+    finally:
+        if args.rendimiento:
+            for registro in registros:
+                if registro.estado == "en curso":
+                    registro.terminar("interrumpida")
+            try:
+                exportar_rendimiento(registros, args.rendimiento)
+            except OSError as e:
+                print(f"No se pudo guardar el rendimiento: {e}", file=sys.stderr)
+
+
+def ejecutar(args, nuevo_registro):
+    """El flujo de main; cada operación se mide en un registro de nuevo_registro(operacion)."""
+    registro = nuevo_registro("Carga de archivo")
+    registro("Leyendo encabezado y vista previa")
+    try:
+        fuente = FuenteDatos(args.archivo)
+    except Exception as e:
+        registro.terminar("error")
+        print(f"No se pudo leer el archivo: {e}", file=sys.stderr)
+        return 1
+    registro.terminar()
+
+    if args.columnas:
+        columnas = separar_nombres(args.columnas)
+    else:
+        columnas = columnas_por_defecto(fuente.columnas, fuente.numericas)
+    if args.patron:
+        coincide = compilar_filtro(args.patron, args.regex)
+        columnas = [col for col in columnas if coincide(str(col))]
+    if not columnas:
+        print("Error: no hay variables para analizar.", file=sys.stderr)
+        return 1
+
+    faltantes = [col for col in columnas if col not in fuente.columnas]
+    if faltantes:
+        print(f"ERROR: Columna no encontrada '{faltantes[0]}'.", file=sys.stderr)
+        return 1
+
+    registro = nuevo_registro(f"Análisis ({len(columnas)} variables)")
+    por_bloques = args.por_bloques or usar_por_bloques(fuente)
+    if por_bloques:
+        resultado = analizar_pca_por_bloques(fuente, columnas, etapa=registro,
+                                             progreso=lambda filas: registro.contar(filas, "filas"))
+    else:
+        registro("Leyendo datos")
+        datos = fuente.cargar(columnas, motor_csv=args.motor_csv, precision=args.precision)
+        registro.contar(len(datos), "filas")
+        resultado = analizar_pca(datos, columnas, etapa=registro,
+                                 n_componentes=None if args.todos_los_componentes else max(1, args.componentes),
+                                 resolutor=args.resolutor, precision=args.precision, en_disco=args.en_disco)
+
+    registro("Escribiendo el informe")
+    if resultado.filas_limpias == 0:
+        print("".join(linea[0] for linea in lineas_analisis(resultado, 1)), end="")
+        registro.terminar()
+        return 1
+
+    n_componentes = min(max(1, args.componentes), resultado.n_componentes)
+    print("".join(linea[0] for linea in lineas_analisis(resultado, n_componentes)))
+    registro.terminar()
+
+    if args.exportar:
+        registro = nuevo_registro("Exportación")
+        registro("Escribiendo componentes")
+
+        def filas_escritas(filas):
+            registro.contar(filas, "filas")
+
+        try:
+            if por_bloques:
+                exportar_componentes_por_bloques(fuente, resultado.modelo, args.exportar, progreso=filas_escritas)
+            else:
+                exportar_componentes(resultado.datos_transformados, args.exportar, progreso=filas_escritas)
+        except Exception as e:
+            registro.terminar("error")
+            print(f"No se pudo exportar: {e}", file=sys.stderr)
+            return 1
+        registro.terminar()
+        print(f"Componentes guardados en: {args.exportar}")
+
+    if args.combinaciones:
+        if len(columnas) < 2:
+            print("Error: se necesitan al menos 2 variables para hacer combinaciones.", file=sys.stderr)
+            return 1
+        registro = nuevo_registro(f"Combinaciones ({len(columnas)} variables, modo {args.modo})")
+        registro("Leyendo datos y calculando la correlación")
+        combinaciones = buscar_combinaciones_archivo(fuente, columnas, args.modo, args.max_k,
+                                                     max(1, args.ancho_haz), max(1, args.procesos), max(1, args.top),
+                                                     progreso=lambda n=0: registro.contar(n, "combinaciones evaluadas"),
+                                                     al_inicio=lambda resultado: registro("Buscando combinaciones"),
+                                                     cache_disco=None if args.sin_cache else CacheDisco(),
+                                                     motor_csv=args.motor_csv, n_componentes=max(1, args.componentes),
+                                                     registrar_indice=args.guardar_indice)
+        registro("Escribiendo el informe")
+        informe = formatear_informe_combinaciones(combinaciones)
+        print("\n" + informe)
+        registro.terminar("completada (desde caché)" if combinaciones.desde_cache else "completada")
+        if args.guardar_informe:
+            print(f"Informe guardado en: {guardar_informe(informe, args.archivo)}")
+        if combinaciones.indice is not None:
+            print(f"Índice de {len(combinaciones.indice):,} combinaciones guardado en: "
+                  f"{guardar_indice(combinaciones.indice, args.archivo)}")
+    return 0
+
+
+def separar_nombres(texto):
+    """Nombres separados por comas (sin espacios alrededor ni vacíos)."""
+    return [nombre.strip() for nombre in (texto or "").split(",") if nombre.strip()]
+
+
+def consultar_indice(args):
+    """Consulta un índice de --guardar-indice e imprime las combinaciones que cumplen los filtros."""
+    try:
+        indice = IndiceCombinaciones.cargar(args.archivo)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"No se pudo leer el índice: {e}", file=sys.stderr)
+        return 1
+    try:
+        resultados = indice.consultar(k=args.k, contiene=separar_nombres(args.contiene),
+                                      excluye=separar_nombres(args.excluye),
+                                      minimo=None if args.minimo is None else args.minimo / 100, limite=args.limite)
+    except KeyError as e:
+        print(f"ERROR: Columna no encontrada {e} en el índice.", file=sys.stderr)
+        return 1
+    print(formatear_consulta(indice, resultados, args.k))
+    return 0
+
+
+def ejecutar_lote(args, nuevo_registro):
+    """
+    Modo lote de main: cada archivo de la carpeta o patrón args.archivo se
+    procesa en un proceso aparte (ver acp.lotes) y se informa al terminar.
+    """
+    archivos = archivos_del_lote(args.archivo)
+    if not archivos:
+        print(f"Error: no hay archivos CSV o Excel en '{args.archivo}'.", file=sys.stderr)
+        return 1
+    columnas = separar_nombres(args.columnas) or None
+    opciones = OpcionesLote(carpeta_salida=args.salida, formato=args.formato,
+                            columnas=tuple(columnas) if columnas else None, patron=args.patron, regex=args.regex,
+                            n_componentes=max(1, args.componentes), modo=args.modo, max_k=args.max_k,
+                            n_mejores=max(1, args.top), ancho_haz=max(1, args.ancho_haz), precision=args.precision,
+                            motor_csv=args.motor_csv, usar_cache=not args.sin_cache)
+    procesos = max(1, args.procesos)
+    registro = nuevo_registro(f"Lote ({len(archivos)} archivos, {min(procesos, len(archivos))} procesos)")
+    registro("Procesando archivos")
+    terminados = []
+
+    def al_terminar_archivo(resultado_archivo):
+        terminados.append(resultado_archivo)
+        registro.contar(resultado_archivo.filas_originales, "filas")
+        detalle = resultado_archivo.informe if resultado_archivo.estado == "completado" else resultado_archivo.error
+        print(f"[{len(terminados)}/{len(archivos)}] {resultado_archivo.ruta}: {resultado_archivo.estado} "
+              f"({resultado_archivo.segundos:.2f} s) - {detalle}")
+
+    resultados, segundos, indice = procesar_lote(archivos, opciones, procesos, al_terminar_archivo)
+    errores = sum(r.estado != "completado" for r in resultados)
+    registro.terminar("completada" if not errores else f"{errores} con error")
+    print("\n" + formatear_resumen_lote(resultados, segundos))
+    print(f"Índice del lote: {indice}")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
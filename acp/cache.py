@@ -0,0 +1,216 @@
+"""
+Cachés de resultados ya calculados.
+
+CacheLRU (en memoria, por sesión): la clave es una huella del contenido de
+las columnas analizadas (no de la ruta), así que volver a analizar la misma
+selección del mismo archivo devuelve el ResultadoPCA guardado sin limpiar,
+estandarizar ni descomponer otra vez; si el archivo cambia, la huella también.
+
+CacheDisco (entre sesiones): archivos .npz con la huella del contenido del
+archivo y las columnas como nombre. Guarda las estadísticas de las filas
+limpias, la matriz de correlación y los resultados de cada búsqueda de
+combinaciones, para no volver a leer el archivo ni repetir la búsqueda.
+"""
+import hashlib
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CAPACIDAD_CACHE = 16 # Análisis guardados en memoria (se descarta el usado hace más tiempo)
+CARPETA_CACHE_DISCO = os.path.join(os.path.expanduser("~"), ".cache", "acp") # Carpeta de CacheDisco
+LIMITE_CACHE_DISCO = 256 * 1024 ** 2 # Bytes en disco; al superarlo se borran las entradas usadas hace más tiempo
+BYTES_LECTURA_HUELLA = 1024 ** 2 # Tamaño de cada lectura al calcular la huella de un archivo
+
+
+def huella_datos(data_raw, selected_columns, *extra):
+    """
+    Huella (hex) del contenido de 'selected_columns' en 'data_raw', sus
+    nombres y cualquier parámetro extra que cambie el resultado.
+    """
+    columnas = list(selected_columns)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((columnas, extra)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(data_raw[columnas], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def huella_archivo(filepath, selected_columns, *extra):
+    """
+    Huella para cuando no se quiere leer el contenido (análisis por bloques):
+    ruta, tamaño y fecha de modificación del archivo.
+    """
+    estado = os.stat(filepath)
+    firma = (os.path.abspath(filepath), estado.st_size, estado.st_mtime_ns, list(selected_columns), extra)
+    return hashlib.blake2b(repr(firma).encode("utf-8"), digest_size=16).hexdigest()
+
+
+_huellas_contenido = {} # (ruta, tamaño, fecha) -> huella, para no releer el archivo en la misma sesión
+_candado_huellas = threading.Lock()
+
+
+def huella_contenido(filepath):
+    """
+    Huella (hex) de los bytes del archivo. No depende de la ruta ni de la
+    fecha: una copia o un archivo renombrado tienen la misma.
+    """
+    estado = os.stat(filepath)
+    firma = (os.path.abspath(filepath), estado.st_size, estado.st_mtime_ns)
+    with _candado_huellas:
+        if firma in _huellas_contenido:
+            return _huellas_contenido[firma]
+    h = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        while True:
+            parte = f.read(BYTES_LECTURA_HUELLA)
+            if not parte:
+                break
+            h.update(parte)
+    with _candado_huellas:
+        _huellas_contenido[firma] = h.hexdigest()
+    return _huellas_contenido[firma]
+
+
+class CacheLRU:
+    """Diccionario acotado que descarta la entrada usada hace más tiempo. Seguro entre hilos."""
+
+    def __init__(self, capacidad=CAPACIDAD_CACHE):
+        self.capacidad = capacidad
+        self._entradas = OrderedDict()
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        """El valor guardado (y lo marca como recién usado), o None."""
+        with self._candado:
+            if clave not in self._entradas:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return self._entradas[clave]
+
+    def guardar(self, clave, valor):
+        with self._candado:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._candado:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+class CacheDisco:
+    """
+    Caché persistente de arreglos numpy en archivos .npz. Cada entrada es un
+    diccionario nombre -> ndarray. Al leer una entrada se actualiza su fecha;
+    al guardar, si la carpeta supera limite_bytes se borran las entradas con
+    la fecha más antigua. Seguro entre hilos (no entre procesos, pero cada
+    archivo se escribe con un reemplazo atómico).
+    """
+
+    def __init__(self, carpeta=CARPETA_CACHE_DISCO, limite_bytes=LIMITE_CACHE_DISCO):
+        self.carpeta = carpeta
+        self.limite_bytes = limite_bytes
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def clave(filepath, selected_columns, *extra):
+        """Clave de una entrada: contenido del archivo, columnas y parámetros extra."""
+        firma = (huella_contenido(filepath), list(selected_columns), extra)
+        return hashlib.blake2b(repr(firma).encode("utf-8"), digest_size=16).hexdigest()
+
+    def _ruta(self, clave):
+        return os.path.join(self.carpeta, f"{clave}.npz")
+
+    def obtener(self, clave):
+        """Diccionario de arreglos guardado con 'clave', o None (una entrada dañada se borra)."""
+        ruta = self._ruta(clave)
+        with self._candado:
+            try:
+                with np.load(ruta, allow_pickle=False) as archivo:
+                    arreglos = {nombre: archivo[nombre] for nombre in archivo.files}
+                os.utime(ruta)
+            except FileNotFoundError:
+                self.fallos += 1
+                return None
+            except (OSError, ValueError, zipfile.BadZipFile):
+                self.fallos += 1
+                self._borrar(ruta)
+                return None
+            self.aciertos += 1
+            return arreglos
+
+    def guardar(self, clave, **arreglos):
+        """
+        Guarda los arreglos con 'clave'. Un error de escritura (disco lleno,
+        sin permisos) no interrumpe el análisis: la entrada simplemente no
+        queda guardada.
+        """
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._candado:
+            try:
+                os.makedirs(self.carpeta, exist_ok=True)
+                with open(temporal, "wb") as f:
+                    np.savez_compressed(f, **arreglos)
+                os.replace(temporal, ruta)
+            except OSError:
+                self._borrar(temporal)
+                return
+            self._desalojar()
+
+    def limpiar(self):
+        with self._candado:
+            for ruta, _, _ in self._entradas():
+                self._borrar(ruta)
+
+    def tamano_bytes(self):
+        with self._candado:
+            return sum(tamano for _, tamano, _ in self._entradas())
+
+    def __len__(self):
+        with self._candado:
+            return len(self._entradas())
+
+    def _entradas(self):
+        """[(ruta, bytes, fecha de último uso)] de los .npz de la carpeta."""
+        if not os.path.isdir(self.carpeta):
+            return []
+        entradas = []
+        for nombre in os.listdir(self.carpeta):
+            if nombre.endswith(".npz"):
+                ruta = os.path.join(self.carpeta, nombre)
+                try:
+                    estado = os.stat(ruta)
+                except OSError:
+                    continue
+                entradas.append((ruta, estado.st_size, estado.st_mtime_ns))
+        return entradas
+
+    def _desalojar(self):
+        entradas = sorted(self._entradas(), key=lambda entrada: entrada[2])
+        total = sum(tamano for _, tamano, _ in entradas)
+        for ruta, tamano, _ in entradas:
+            if total <= self.limite_bytes:
+                break
+            self._borrar(ruta)
+            total -= tamano
+
+    @staticmethod
+    def _borrar(ruta):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
@@ -0,0 +1,170 @@
+"""
+Carga de datos por columnas.
+
+Al abrir un archivo solo se leen el encabezado y unas pocas filas (para la
+lista de variables). Las columnas se leen completas cuando un análisis las
+pide: solo las seleccionadas, en bloques, con dtype float64 (o float32, si
+se pide precisión simple) explícito para las que la vista previa detectó
+como numéricas.
+"""
+import importlib.util
+import os
+import threading
+
+import pandas as pd
+
+FILAS_VISTA_PREVIA = 200 # Filas leídas al abrir el archivo para detectar columnas y tipos
+FILAS_POR_BLOQUE = 100_000 # Filas por bloque al leer columnas de un CSV
+MOTOR_CSV = "c" # "c" (en bloques, con progreso y cancelable) o "pyarrow" (de una vez, multihilo)
+EXTENSIONES_EXCEL = (".xlsx", ".xls")
+
+
+def pyarrow_disponible():
+    """True si se puede usar engine='pyarrow' en pd.read_csv."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _es_excel(filepath):
+    return os.path.splitext(filepath)[1].lower() in EXTENSIONES_EXCEL
+
+
+class FuenteDatos:
+    """
+    Archivo CSV o Excel cuyas columnas se leen bajo demanda.
+
+    Las columnas sin encabezado (las 'Unnamed' que deja una cola de comas
+    como ',,,') se descartan: no se pueden seleccionar ni analizar. Las
+    columnas ya leídas se guardan, así que pedirlas otra vez no relee el
+    archivo. Es seguro llamar a cargar() desde varios hilos.
+    """
+
+    def __init__(self, filepath, filas_vista=FILAS_VISTA_PREVIA):
+        self.ruta = filepath
+        if _es_excel(filepath):
+            vista = pd.read_excel(filepath, nrows=filas_vista)
+        else:
+            # index_col=False: con comas al final de cada fila pandas tomaría la primera columna como índice
+            vista = pd.read_csv(filepath, nrows=filas_vista, index_col=False)
+
+        self.vista_columnas = list(vista.columns) # Todas, con las 'Unnamed', en el orden del archivo
+        self.posiciones = {col: i for i, col in enumerate(vista.columns)
+                           if not str(col).startswith("Unnamed")}
+        self.columnas = list(self.posiciones)
+        self.vista = vista[self.columnas]
+        self.numericas = set(self.vista.select_dtypes(include="number").columns)
+        self._cargadas = {}
+        self._candado = threading.Lock()
+
+    def cargar(self, columnas=None, progreso=None, motor_csv=MOTOR_CSV, precision="float64"):
+        """
+        DataFrame con las columnas pedidas (todas si es None), leyendo del
+        archivo solo las que aún no se han cargado.
+
+        Args:
+            columnas (list): Nombres de columna de self.columnas.
+            progreso (callable): Opcional; recibe las filas leídas en cada
+                bloque (puede lanzar BusquedaCancelada para detener la lectura).
+            motor_csv (str): "c" o "pyarrow"; si pyarrow no está instalado se
+                usa "c".
+            precision (str): "float64" o "float32" para las columnas
+                numéricas. Cada precisión se guarda aparte.
+
+        Raises:
+            KeyError: Si alguna columna no existe en el archivo.
+        """
+        columnas = self.columnas if columnas is None else list(columnas)
+        faltantes = [col for col in columnas if col not in self.posiciones]
+        if faltantes:
+            raise KeyError(faltantes[0])
+
+        with self._candado:
+            pendientes = [col for col in dict.fromkeys(columnas) if (col, precision) not in self._cargadas]
+            if pendientes:
+                leidas = self._leer(pendientes, progreso, motor_csv, precision)
+                for col in pendientes:
+                    self._cargadas[(col, precision)] = leidas[col]
+            return pd.DataFrame({col: self._cargadas[(col, precision)] for col in columnas}, columns=columnas)
+
+    def bloques(self, columnas, filas_por_bloque=FILAS_POR_BLOQUE, precision="float64"):
+        """
+        Recorre las columnas pedidas en bloques de filas sin guardarlas, para
+        procesar archivos que no caben en memoria. Un Excel sale en un solo
+        bloque (con las columnas numéricas en 'precision').
+
+        Yields:
+            DataFrame: Hasta 'filas_por_bloque' filas con las columnas pedidas.
+        """
+        usecols = [self.posiciones[col] for col in columnas]
+        if _es_excel(self.ruta):
+            bloque = pd.read_excel(self.ruta, usecols=usecols)
+            if precision != "float64":
+                bloque = bloque.astype({col: precision for col in bloque.columns if bloque[col].dtype == "float64"})
+            yield bloque
+            return
+
+        tipos = {col: precision for col in columnas if col in self.numericas}
+        leidas = 0
+        while True:
+            try:
+                with pd.read_csv(self.ruta, usecols=usecols, dtype=tipos, index_col=False,
+                                 chunksize=filas_por_bloque, skiprows=range(1, leidas + 1)) as lector:
+                    for bloque in lector:
+                        leidas += len(bloque)
+                        yield bloque
+                return
+            except ValueError:
+                if tipos is None:
+                    raise
+                # Un valor no numérico después de la vista previa: se sigue desde ese
+                # bloque dejando que pandas infiera los tipos
+                tipos = None
+
+    def _leer(self, columnas, progreso, motor_csv, precision):
+        if motor_csv == "pyarrow" and pyarrow_disponible() and not _es_excel(self.ruta):
+            datos = self._leer_pyarrow(columnas, precision)
+            if progreso:
+                progreso(len(datos))
+            return datos
+
+        partes = []
+        for bloque in self.bloques(columnas, precision=precision):
+            partes.append(bloque)
+            if progreso:
+                progreso(len(bloque))
+        if not partes:
+            return self.vista[columnas].iloc[:0]
+        return pd.concat(partes, ignore_index=True)
+
+    def _leer_pyarrow(self, columnas, precision):
+        """
+        Lee las columnas de una vez con pyarrow.csv (multihilo). Las columnas
+        se piden por posición, con nombres propios, para que los encabezados
+        repetidos o vacíos no se confundan; un valor no numérico después de
+        la vista previa hace releer dejando que pyarrow infiera los tipos.
+        """
+        import numpy as np
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+
+        nombres = [f"c{i}" for i in range(len(self.vista_columnas))]
+        elegidas = [nombres[self.posiciones[col]] for col in columnas]
+        tipo = pa.from_numpy_dtype(np.dtype(precision))
+        tipos = {nombres[self.posiciones[col]]: tipo for col in columnas if col in self.numericas}
+        lectura = pa_csv.ReadOptions(column_names=nombres, skip_rows=1)
+        while True:
+            try:
+                tabla = pa_csv.read_csv(self.ruta, read_options=lectura, convert_options=pa_csv.ConvertOptions(
+                    include_columns=elegidas, column_types=tipos))
+                break
+            except pa.ArrowInvalid as e:
+                if not tipos or "conversion error" not in str(e):
+                    raise
+                tipos = {}
+        datos = tabla.to_pandas()
+        datos.columns = columnas
+        return datos
+
+
+def cargar_datos(filepath, columnas=None, progreso=None, motor_csv=MOTOR_CSV):
+    """Lee un archivo CSV o Excel (solo 'columnas' si se indican) en un DataFrame."""
+    return FuenteDatos(filepath).cargar(columnas, progreso, motor_csv)
@@ -0,0 +1,902 @@
+"""
+Motor de búsqueda de combinaciones de variables.
+
+La retención de los primeros componentes de un subconjunto estandarizado
+solo depende de su submatriz de correlación, así que todo el módulo trabaja
+sobre una matriz de correlación calculada una vez. No depende de tkinter ni
+de pandas.
+"""
+import heapq
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations, islice
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .indice import mascaras_combinaciones
+from .parametros import ANCHO_HAZ, MAX_K_COMBINACIONES, MODOS_EXACTOS
+
+# --- Motor de correlación para la búsqueda de combinaciones ---
+# La retención de PC1 de un subconjunto estandarizado solo depende de la
+# submatriz k x k de la matriz de correlación, así que basta calcularla una vez.
+TAMANO_LOTE_EIG = 4096 # Submatrices por llamada a eigvalsh
+LIMITE_ENUMERACION = 200000 # Por encima de esto se usa ramificación y acotamiento
+TOLERANCIA_PODA = 1e-12
+MAX_ELEMENTOS_LOTE = 2 ** 22 # Límite de memoria por lote (elementos de las submatrices apiladas)
+
+# --- Modos de búsqueda aproximada (tiempo polinomial) ---
+LIMITE_BUSQUEDA_EXACTA = 50_000_000 # Combinaciones totales a partir de las cuales el modo automático usa heurísticas
+MAX_ITER_INTERCAMBIO = 100 # Intercambios máximos por k en la búsqueda local
+UMBRAL_ELIMINACION_EXACTA = 64 # Por encima de este tamaño se elimina por carga en PC1
+
+# --- Enumeración en orden de código de Gray (puerta giratoria) ---
+PASOS_GRAY = 32 # Combinaciones seguidas que recorre cada caminante (la primera se descompone completa)
+ITERACIONES_GRAY = 4 # Iteraciones de potencia por combinación, partiendo del vector de la anterior
+MAX_FILAS_TABLA_GRAY = 4096 # Tablas de puerta giratoria completas que se guardan para reutilizarlas
+
+# --- Puntuación en paralelo ---
+MIN_COMBOS_PARALELO = 50_000 # Por debajo de esto no compensa arrancar procesos
+RANGOS_POR_PROCESO = 4 # Rangos contiguos por proceso (equilibrio de carga)
+MAX_COMBOS_POR_RANGO = 250_000 # Acota lo que tarda en detenerse un trabajador al cancelar
+
+
+def matriz_correlacion(data):
+    """
+    Calcula la matriz de correlación de las columnas de 'data' tal como la ve
+    StandardScaler + PCA: las columnas constantes quedan en cero (sin varianza).
+
+    Args:
+        data (DataFrame | ndarray): Datos numéricos ya limpios (sin NaN).
+
+    Returns:
+        ndarray: Matriz p x p de correlaciones.
+    """
+    valores = np.asarray(data, dtype=np.float64)
+    centrados = valores - valores.mean(axis=0)
+    desv = np.sqrt((centrados ** 2).sum(axis=0))
+    # Igual que StandardScaler: una columna constante no se escala y queda en 0
+    desv_seguras = np.where(desv > 0, desv, 1.0)
+    normalizados = centrados / desv_seguras
+    corr = normalizados.T @ normalizados
+    np.fill_diagonal(corr, (desv > 0).astype(np.float64))
+    return corr
+
+
+def puntuar_combinaciones(corr, indices, n_componentes=1):
+    """
+    Calcula la retención de los primeros n_componentes de muchas combinaciones
+    a la vez, apilando sus submatrices de correlación y resolviéndolas con
+    llamadas por lotes a eigvalsh.
+
+    Args:
+        corr (ndarray): Matriz de correlación p x p (ver matriz_correlacion).
+        indices (ndarray): Arreglo de enteros m x k con una combinación por fila.
+        n_componentes (int): Componentes cuya varianza se suma (1 = solo PC1).
+            Con k <= n_componentes la retención es total.
+
+    Returns:
+        ndarray: Vector de m retenciones (proporción de 0 a 1).
+    """
+    indices = np.asarray(indices, dtype=np.intp)
+    retenciones = np.empty(len(indices), dtype=np.float64)
+    if len(indices) == 0:
+        return retenciones
+    k = indices.shape[1]
+    tamano_lote = max(1, min(TAMANO_LOTE_EIG, MAX_ELEMENTOS_LOTE // (k * k)))
+    for inicio in range(0, len(indices), tamano_lote):
+        lote = indices[inicio:inicio + tamano_lote]
+        sub = corr[lote[:, :, None], lote[:, None, :]]
+        # eigvalsh devuelve los valores propios en orden ascendente: los
+        # n_componentes mayores son las últimas columnas (mismo costo que solo PC1)
+        valores = np.linalg.eigvalsh(sub)
+        retenidos = valores[:, -1] if n_componentes == 1 else valores[:, -n_componentes:].sum(axis=1)
+        traza = np.trace(sub, axis1=1, axis2=2)
+        retenciones[inicio:inicio + len(lote)] = np.divide(
+            retenidos, traza, out=np.zeros_like(retenidos), where=traza > 0)
+    return retenciones
+
+
+def rango_combinacion(combo, n):
+    """
+    Posición (rango) de una combinación ordenada dentro del orden
+    lexicográfico de combinations(range(n), k).
+    """
+    k = len(combo)
+    rango = 0
+    anterior = -1
+    for i, c in enumerate(combo):
+        # Se cuentan las combinaciones que empiezan por un valor menor en esta posición
+        for x in range(anterior + 1, c):
+            rango += math.comb(n - x - 1, k - i - 1)
+        anterior = c
+    return rango
+
+
+def combinacion_de_rango(rango, n, k):
+    """
+    Inversa de rango_combinacion: devuelve la combinación que ocupa la
+    posición 'rango' en el orden lexicográfico, sin generar las anteriores.
+    """
+    combo = []
+    x = 0
+    for i in range(k):
+        while True:
+            bloque = math.comb(n - x - 1, k - i - 1)
+            if rango < bloque:
+                break
+            rango -= bloque
+            x += 1
+        combo.append(x)
+        x += 1
+    return combo
+
+
+def _siguiente_combinacion(combo, n):
+    """Avanza 'combo' (en el sitio) a la siguiente combinación lexicográfica."""
+    k = len(combo)
+    i = k - 1
+    while i >= 0 and combo[i] == n - k + i:
+        i -= 1
+    if i < 0:
+        return False
+    combo[i] += 1
+    for j in range(i + 1, k):
+        combo[j] = combo[j - 1] + 1
+    return True
+
+
+# --- Orden de puerta giratoria (código de Gray para combinaciones) ---
+# R(n, k) = R(n-1, k) seguido de R(n-1, k-1) al revés con n-1 agregado: dos
+# combinaciones consecutivas difieren en una sola variable que sale y otra que
+# entra, y las filas quedan ordenadas de menor a mayor.
+_tablas_puerta_giratoria = {}
+
+
+def filas_puerta_giratoria(n, k, inicio, fin):
+    """
+    Combinaciones de k de range(n) con posición [inicio, fin) en el orden de
+    puerta giratoria, como arreglo (fin - inicio) x k de índices ordenados.
+    Se arman por tramos con NumPy (sin un paso de Python por combinación).
+    """
+    fin = min(fin, math.comb(n, k))
+    if fin <= inicio:
+        return np.empty((0, k), dtype=np.intp)
+    if k == 0:
+        return np.empty((fin - inicio, 0), dtype=np.intp)
+    if k == n:
+        return np.arange(n, dtype=np.intp)[None, :]
+    if math.comb(n, k) <= MAX_FILAS_TABLA_GRAY:
+        tabla = _tablas_puerta_giratoria.get((n, k))
+        if tabla is None:
+            tabla = _tramo_puerta_giratoria(n, k, 0, math.comb(n, k))
+            tabla.flags.writeable = False
+            _tablas_puerta_giratoria[(n, k)] = tabla
+        return tabla[inicio:fin]
+    return _tramo_puerta_giratoria(n, k, inicio, fin)
+
+
+def _tramo_puerta_giratoria(n, k, inicio, fin):
+    sin_ultima = math.comb(n - 1, k)
+    partes = []
+    if inicio < sin_ultima:
+        partes.append(filas_puerta_giratoria(n - 1, k, inicio, min(fin, sin_ultima)))
+    if fin > sin_ultima:
+        # Segunda mitad: R(n-1, k-1) recorrida al revés, con n-1 al final
+        con_ultima = math.comb(n - 1, k - 1)
+        desde = con_ultima - (fin - sin_ultima)
+        hasta = con_ultima - (max(inicio, sin_ultima) - sin_ultima)
+        resto = filas_puerta_giratoria(n - 1, k - 1, desde, hasta)[::-1]
+        partes.append(np.hstack([resto, np.full((len(resto), 1), n - 1, dtype=np.intp)]))
+    return np.concatenate(partes) if len(partes) > 1 else partes[0]
+
+
+def _cota_superior(rayleigh, residuo, traza, frobenius, k):
+    """
+    Cota superior de lambda1 para un vector unitario v con cociente de
+    Rayleigh 'rayleigh' y residuo |Sv - rayleigh·v| = 'residuo', usando solo
+    la traza y la norma de Frobenius de S (semidefinida positiva, k x k).
+
+    Se toma la menor de tres cotas válidas:
+    - Samuelson: ningún valor propio se aleja de la media traza/k más de
+      sqrt((k-1)/k) por la raíz de la suma de desvíos al cuadrado.
+    - Kato-Temple: si lambda2 <= alfa < rayleigh, lambda1 <= rayleigh +
+      residuo²/(rayleigh - alfa). Alfa sale de los mismos momentos: con
+      lambda1 >= rayleigh, los desvíos de lambda1 y lambda2 respecto de la
+      media, más los del resto (que suman lo opuesto), no pueden pasar la
+      suma total de desvíos al cuadrado.
+    - Residuo: hay un valor propio a distancia 'residuo' del cociente; si es
+      lambda1 vale rayleigh + residuo y si no, lambda1² + ese valor² no pasa
+      de |S|²_F.
+    """
+    media = traza / k
+    desvios = np.maximum(frobenius - traza * media, 0.0) # Suma de (lambda_i - media)²
+    samuelson = media + np.sqrt(desvios * (k - 1) / k)
+    if k == 2:
+        alfa = traza - rayleigh
+    else:
+        d1 = rayleigh - media
+        a = (k - 1) / (k - 2)
+        b = 2 * d1 / (k - 2)
+        c = a * d1 * d1 - desvios
+        alfa = media + (np.sqrt(np.maximum(b * b - 4 * a * c, 0.0)) - b) / (2 * a)
+    brecha = rayleigh - alfa
+    hay_brecha = brecha > 0
+    kato_temple = np.where(hay_brecha, rayleigh + residuo * residuo / np.where(hay_brecha, brecha, 1.0), np.inf)
+    abajo = np.maximum(rayleigh - residuo, 0.0)
+    por_residuo = np.maximum(rayleigh + residuo, np.sqrt(np.maximum(frobenius - abajo * abajo, 0.0)))
+    return np.minimum(np.minimum(samuelson, kato_temple), por_residuo)
+
+
+def cotas_puerta_giratoria(corr, filas, pasos=PASOS_GRAY, iteraciones=ITERACIONES_GRAY):
+    """
+    Cotas del mayor valor propio de muchas submatrices consecutivas en orden
+    de puerta giratoria, sin descomponerlas.
+
+    Las filas se reparten entre caminantes que avanzan 'pasos' combinaciones
+    cada uno, todos a la vez con operaciones por lotes. Al pasar a la
+    siguiente combinación solo cambia una variable: su fila y columna de la
+    submatriz se reemplazan en el sitio (O(k) en lugar de O(k²)) y el vector
+    propio anterior, con la entrada nueva estimada, arranca unas pocas
+    iteraciones de potencia (un producto matriz-vector cada una). El
+    cociente de Rayleigh del vector resultante es la cota inferior (nunca
+    supera a lambda1) y _cota_superior da la superior; con el arranque en
+    caliente ambas quedan muy juntas.
+
+    Args:
+        corr (ndarray): Matriz de correlación p x p.
+        filas (ndarray): m x k, tramo consecutivo de filas_puerta_giratoria.
+        pasos (int): Combinaciones por caminante.
+        iteraciones (int): Iteraciones de potencia por combinación.
+
+    Returns:
+        tuple: (inferior, superior, traza), tres vectores de m elementos.
+    """
+    m, k = filas.shape
+    caminantes = -(-m // pasos)
+    relleno = caminantes * pasos - m
+    if relleno:
+        # La última fila repetida: esos pasos no cambian de combinación
+        filas = np.concatenate([filas, np.repeat(filas[-1:], relleno, axis=0)])
+    recorrido = filas.reshape(caminantes, pasos, k)
+    inferior = np.empty((caminantes, pasos))
+    superior = np.empty((caminantes, pasos))
+    trazas = np.empty((caminantes, pasos))
+
+    # Primer paso de cada caminante: descomposición completa
+    variables = recorrido[:, 0, :].copy() # Variable de cada casilla (no quedan ordenadas)
+    sub = corr[variables[:, :, None], variables[:, None, :]]
+    valores, vectores = np.linalg.eigh(sub)
+    v = vectores[:, :, -1].copy()
+    rayleigh = valores[:, -1].copy()
+    todos = np.arange(caminantes)
+
+    for paso in range(pasos):
+        if paso > 0:
+            # Sale 'sale' y entra 'entra': Σ = sale - entra y Σ² = sale² - entra²
+            anteriores, nuevas = recorrido[:, paso - 1, :], recorrido[:, paso, :]
+            diferencia = anteriores.sum(axis=1) - nuevas.sum(axis=1)
+            cambian = diferencia != 0
+            sel = todos[cambian]
+            diferencia = diferencia[cambian]
+            suma = ((anteriores[cambian] ** 2).sum(axis=1) - (nuevas[cambian] ** 2).sum(axis=1)) // diferencia
+            sale = (suma + diferencia) // 2
+            entra = sale - diferencia
+            casilla = np.argmax(variables[sel] == sale[:, None], axis=1)
+
+            variables[sel, casilla] = entra
+            fila = corr[entra[:, None], variables[sel]]
+            sub[sel, casilla, :] = fila
+            sub[sel, :, casilla] = fila
+            # Entrada nueva del vector: la que pide Sv = lambda v con el resto fijo
+            v[sel, casilla] = 0.0
+            v[sel, casilla] = np.einsum('ij,ij->i', fila, v[sel]) / np.maximum(rayleigh[sel], TOLERANCIA_PODA)
+            norma = np.linalg.norm(v, axis=1, keepdims=True)
+            v = np.divide(v, norma, out=np.full_like(v, k ** -0.5), where=norma > 0)
+            for _ in range(iteraciones):
+                w = np.einsum('bij,bj->bi', sub, v)
+                norma = np.linalg.norm(w, axis=1, keepdims=True)
+                v = np.divide(w, norma, out=v, where=norma > 0)
+
+        w = np.einsum('bij,bj->bi', sub, v)
+        rayleigh = np.einsum('bi,bi->b', v, w)
+        residuo = np.linalg.norm(w - rayleigh[:, None] * v, axis=1)
+        traza = np.trace(sub, axis1=1, axis2=2)
+        frobenius = np.einsum('bij,bij->b', sub, sub)
+        inferior[:, paso] = rayleigh
+        superior[:, paso] = _cota_superior(rayleigh, residuo, traza, frobenius, k)
+        trazas[:, paso] = traza
+
+    return inferior.ravel()[:m], superior.ravel()[:m], trazas.ravel()[:m]
+
+
+def puntuar_tramo_gray(corr, filas, mejores, n_componentes=1, al_puntuar=None):
+    """
+    Agrega a 'mejores' las combinaciones de 'filas' (tramo del orden de
+    puerta giratoria que empieza en la posición mejores.orden). Solo se
+    descomponen con eigvalsh las que, por sus cotas, podrían entrar entre
+    las n mejores; el resultado es el mismo que puntuándolas todas. Las
+    cotas son solo de lambda1: con n_componentes > 1, o si al_puntuar (ver
+    buscar_mejores_combinaciones) necesita todas las retenciones, se
+    descomponen todas.
+
+    Returns:
+        int: Combinaciones que hubo que descomponer.
+    """
+    if len(filas) == 0:
+        return 0
+    if n_componentes > 1 or al_puntuar:
+        retenciones = puntuar_combinaciones(corr, filas, n_componentes)
+        mejores.agregar_lote(retenciones, filas)
+        if al_puntuar:
+            al_puntuar(filas.shape[1], mascaras_combinaciones(filas, corr.shape[0]), retenciones)
+        return len(filas)
+    inferior, superior, traza = cotas_puerta_giratoria(corr, filas)
+    con_traza = traza > 0
+    minimo = np.divide(inferior, traza, out=np.zeros_like(inferior), where=con_traza)
+    maximo = np.divide(superior, traza, out=np.zeros_like(superior), where=con_traza)
+    # La n-ésima mejor cota inferior del tramo ya es alcanzable: lo que no la supere no entra
+    umbral = mejores.umbral
+    if len(minimo) >= mejores.n:
+        umbral = max(umbral, float(np.partition(minimo, len(minimo) - mejores.n)[len(minimo) - mejores.n]))
+    candidatas = np.flatnonzero(maximo >= umbral - TOLERANCIA_PODA)
+    for i, retencion in zip(candidatas, puntuar_combinaciones(corr, filas[candidatas])):
+        mejores.agregar_entrada((float(retencion), -(mejores.orden + int(i)), tuple(int(c) for c in filas[i])))
+    mejores.orden += len(filas)
+    return len(candidatas)
+
+
+# Vista de la matriz de correlación en memoria compartida (una por proceso trabajador)
+_memoria_trabajador = None
+_corr_trabajador = None
+
+
+def _iniciar_trabajador(nombre_memoria, forma):
+    """Inicializador del pool: se conecta UNA vez a la matriz compartida."""
+    global _memoria_trabajador, _corr_trabajador
+    _memoria_trabajador = shared_memory.SharedMemory(name=nombre_memoria)
+    _corr_trabajador = np.ndarray(forma, dtype=np.float64, buffer=_memoria_trabajador.buf)
+
+
+class MejoresN:
+    """
+    Conserva los n subconjuntos de mayor retención vistos hasta ahora en un
+    min-heap acotado, así la memoria es O(n) sin importar cuántas
+    combinaciones se evalúen. En caso de empate gana la vista primero (la de
+    menor orden), igual que argmax en la búsqueda en serie.
+
+    Args:
+        n (int): Número de subconjuntos a conservar.
+        orden_inicial (int): Orden de la primera combinación que se agregue
+            (el rango de inicio, cuando se puntúa un tramo de combinaciones).
+    """
+
+    def __init__(self, n, orden_inicial=0):
+        self.n = max(1, n)
+        self.heap = []
+        self.presentes = set()
+        self.orden = orden_inicial
+
+    @property
+    def umbral(self):
+        """Retención a superar para entrar (-inf mientras no haya n subconjuntos)."""
+        return self.heap[0][0] if len(self.heap) >= self.n else -math.inf
+
+    def agregar_entrada(self, entrada):
+        """Agrega una entrada (retención, -orden, tupla de índices) ya construida."""
+        if entrada[2] in self.presentes:
+            return
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, entrada)
+        elif entrada > self.heap[0]:
+            self.presentes.discard(heapq.heapreplace(self.heap, entrada)[2])
+        else:
+            return
+        self.presentes.add(entrada[2])
+
+    def agregar_lote(self, retenciones, combos):
+        """Agrega un lote de combinaciones con sus retenciones (solo las n mejores del lote compiten)."""
+        m = len(retenciones)
+        if m > self.n:
+            # Las n mejores con el mismo desempate que el heap: entre iguales al corte, las de menor orden
+            corte = np.partition(retenciones, m - self.n)[m - self.n]
+            mayores = np.flatnonzero(retenciones > corte)
+            iguales = np.flatnonzero(retenciones == corte)[:self.n - len(mayores)]
+            candidatas = np.sort(np.concatenate([mayores, iguales]))
+        else:
+            candidatas = range(m)
+        umbral = self.umbral
+        for i in candidatas:
+            if retenciones[i] >= umbral:
+                self.agregar_entrada((float(retenciones[i]), -(self.orden + int(i)),
+                                      tuple(sorted(int(c) for c in combos[i]))))
+        self.orden += m
+
+    def ordenados(self):
+        """Lista [(retención, tupla de índices)] de mayor a menor retención."""
+        return [(ret, combo) for ret, _, combo in sorted(self.heap, reverse=True)]
+
+
+def _puntuar_rango(n, k, inicio, fin, n_mejores=1, n_componentes=1, registrar=False):
+    """
+    Puntúa las combinaciones con rango en [inicio, fin) dentro de un proceso
+    trabajador y devuelve sus n_mejores entradas (retención, -rango, índices).
+    Con registrar devuelve además todas las máscaras y retenciones del rango
+    (ver acp.indice): (entradas, máscaras, retenciones).
+    """
+    combo = combinacion_de_rango(inicio, n, k)
+    mejores = MejoresN(n_mejores, orden_inicial=inicio)
+    registradas = []
+    rango = inicio
+    while rango < fin:
+        m = min(TAMANO_LOTE_EIG, fin - rango)
+        bloque = np.empty((m, k), dtype=np.intp)
+        for fila in range(m):
+            bloque[fila] = combo
+            _siguiente_combinacion(combo, n)
+        retenciones = puntuar_combinaciones(_corr_trabajador, bloque, n_componentes)
+        mejores.agregar_lote(retenciones, bloque)
+        if registrar:
+            registradas.append((mascaras_combinaciones(bloque, n), retenciones))
+        rango += m
+    return _con_registradas(mejores.heap, registradas, n) if registrar else mejores.heap
+
+
+def _puntuar_rango_gray(n, k, inicio, fin, n_mejores=1, n_componentes=1, registrar=False):
+    """Como _puntuar_rango, con [inicio, fin) en el orden de puerta giratoria."""
+    mejores = MejoresN(n_mejores, orden_inicial=inicio)
+    registradas = []
+
+    def registrar_lote(_, mascaras, retenciones):
+        registradas.append((mascaras, retenciones))
+
+    tamano = TAMANO_LOTE_EIG * PASOS_GRAY
+    for desde in range(inicio, fin, tamano):
+        puntuar_tramo_gray(_corr_trabajador, filas_puerta_giratoria(n, k, desde, min(fin, desde + tamano)), mejores,
+                           n_componentes, registrar_lote if registrar else None)
+    return _con_registradas(mejores.heap, registradas, n) if registrar else mejores.heap
+
+
+def _con_registradas(entradas, registradas, n):
+    """(entradas, máscaras, retenciones) con los lotes registrados de un rango ya juntos."""
+    if not registradas:
+        return entradas, mascaras_combinaciones(np.empty((0, 0), dtype=np.intp), n), np.empty(0)
+    return entradas, np.concatenate([m for m, _ in registradas]), np.concatenate([r for _, r in registradas])
+
+
+def puntuar_en_paralelo(executor, n, k, procesos, progreso=None, n_mejores=1, puntuador=_puntuar_rango,
+                        n_componentes=1, al_puntuar=None):
+    """
+    Enumera las C(n, k) combinaciones repartidas en rangos contiguos entre los
+    procesos del pool y reduce los mejores parciales.
+
+    Args:
+        executor (ProcessPoolExecutor): Pool ya inicializado con la matriz compartida.
+        n (int): Número de variables.
+        k (int): Tamaño de las combinaciones.
+        procesos (int): Número de procesos del pool.
+        progreso (callable): Opcional; recibe el número de combinaciones de
+            cada rango terminado y puede lanzar BusquedaCancelada.
+        n_mejores (int): Subconjuntos a conservar.
+        puntuador (callable): _puntuar_rango (orden lexicográfico) o
+            _puntuar_rango_gray (orden de puerta giratoria).
+        n_componentes (int): Componentes retenidos (ver puntuar_combinaciones).
+        al_puntuar (callable): Opcional; recibe (k, máscaras, retenciones) de
+            cada rango terminado (ver buscar_mejores_combinaciones).
+
+    Returns:
+        list: [(retención, tupla de índices)] de mayor a menor retención.
+    """
+    total = math.comb(n, k)
+    n_rangos = min(total, max(procesos * RANGOS_POR_PROCESO, -(-total // MAX_COMBOS_POR_RANGO)))
+    cortes = [total * i // n_rangos for i in range(n_rangos + 1)]
+    registrar = al_puntuar is not None
+    futuros = {executor.submit(puntuador, n, k, cortes[i], cortes[i + 1], n_mejores, n_componentes, registrar):
+               cortes[i + 1] - cortes[i] for i in range(n_rangos)}
+    # Reducción: las entradas guardan el rango, así que en empate gana el menor (igual que en serie)
+    mejores = MejoresN(n_mejores)
+    try:
+        for futuro in as_completed(futuros):
+            entradas = futuro.result()
+            if registrar:
+                entradas, mascaras, retenciones = entradas
+                al_puntuar(k, mascaras, retenciones)
+            for entrada in entradas:
+                mejores.agregar_entrada(entrada)
+            if progreso:
+                progreso(futuros[futuro])
+    except BaseException:
+        # Al cancelar, los rangos pendientes no llegan a ejecutarse
+        for futuro in futuros:
+            futuro.cancel()
+        raise
+    return mejores.ordenados()
+
+
+def _mejores_pares(corr, n):
+    """Los n pares de variables con mayor correlación absoluta (los mejores subconjuntos de 2)."""
+    filas, columnas = np.triu_indices(corr.shape[0], k=1)
+    abs_pares = np.abs(corr[filas, columnas])
+    orden = np.argsort(-abs_pares, kind='stable')[:n]
+    return [(int(filas[i]), int(columnas[i])) for i in orden]
+
+
+def _cargas(sub, n_componentes=1):
+    """
+    Peso de cada variable de 'sub' en sus primeros n_componentes: la norma de
+    sus cargas escaladas por la raíz de cada valor propio (con uno solo, el
+    mismo orden que |carga en PC1|).
+    """
+    valores, vectores = np.linalg.eigh(sub)
+    if n_componentes == 1:
+        return np.abs(vectores[:, -1])
+    return np.sqrt((vectores[:, -n_componentes:] ** 2 * np.clip(valores[-n_componentes:], 0.0, None)).sum(axis=1))
+
+
+def _puntuar_y_registrar(corr, candidatos, registro, progreso, n_componentes=1):
+    """Puntúa un lote de candidatos del mismo tamaño y lo agrega al MejoresN de ese tamaño."""
+    candidatos = np.asarray(candidatos, dtype=np.intp)
+    retenciones = puntuar_combinaciones(corr, candidatos, n_componentes)
+    k = candidatos.shape[1]
+    if k in registro:
+        registro[k].agregar_lote(retenciones, candidatos)
+    if progreso:
+        progreso(len(candidatos))
+    return retenciones
+
+
+def busqueda_voraz(corr, max_k, progreso=None, n_mejores=1, n_componentes=1):
+    """
+    Selección hacia adelante: parte del par más correlacionado y agrega, una a
+    una, la variable que más aumenta la retención de los primeros n_componentes.
+
+    Args:
+        corr (ndarray): Matriz de correlación p x p.
+        max_k (int): Tamaño máximo de subconjunto.
+        progreso (callable): Opcional; recibe las evaluaciones de cada paso.
+        n_mejores (int): Subconjuntos a conservar por k (entre los evaluados).
+        n_componentes (int): Componentes retenidos (ver puntuar_combinaciones).
+
+    Returns:
+        tuple: ({k: [(retención, tupla de índices)]}, evaluaciones)
+    """
+    p = corr.shape[0]
+    registro = {k: MejoresN(n_mejores) for k in range(2, max_k + 1)}
+    pares = _mejores_pares(corr, n_mejores)
+    _puntuar_y_registrar(corr, pares, registro, progreso, n_componentes)
+    evaluaciones = len(pares)
+    actual = list(pares[0])
+    while len(actual) < max_k:
+        restantes = [c for c in range(p) if c not in actual]
+        candidatos = [actual + [c] for c in restantes]
+        retenciones = _puntuar_y_registrar(corr, candidatos, registro, progreso, n_componentes)
+        evaluaciones += len(candidatos)
+        actual = sorted(actual + [restantes[int(np.argmax(retenciones))]])
+    return {k: r.ordenados() for k, r in registro.items()}, evaluaciones
+
+
+def busqueda_eliminacion(corr, max_k, progreso=None, n_mejores=1, n_componentes=1):
+    """
+    Eliminación hacia atrás: parte de todas las variables y quita, una a una,
+    la que menos retención hace perder. Mientras el conjunto es mayor que
+    UMBRAL_ELIMINACION_EXACTA se quita la de menor carga en los componentes
+    actuales (ver _cargas; una sola descomposición por paso); por debajo se
+    prueban todas las eliminaciones.
+
+    Args:
+        corr (ndarray): Matriz de correlación p x p.
+        max_k (int): Tamaño máximo de subconjunto.
+        progreso (callable): Opcional; recibe las evaluaciones de cada paso.
+        n_mejores (int): Subconjuntos a conservar por k (entre los evaluados).
+        n_componentes (int): Componentes retenidos (ver puntuar_combinaciones).
+
+    Returns:
+        tuple: ({k: [(retención, tupla de índices)]}, evaluaciones)
+    """
+    actual = list(range(corr.shape[0]))
+    registro = {k: MejoresN(n_mejores) for k in range(2, max_k + 1)}
+    evaluaciones = 0
+    if len(actual) <= max_k:
+        _puntuar_y_registrar(corr, [actual], registro, progreso, n_componentes)
+        evaluaciones += 1
+    while len(actual) > 2:
+        if len(actual) > UMBRAL_ELIMINACION_EXACTA:
+            sub = corr[np.ix_(actual, actual)]
+            # Las columnas constantes (diagonal 0) se quitan primero
+            carga = np.where(np.diag(sub) > 0, _cargas(sub, n_componentes), -1.0)
+            actual.pop(int(np.argmin(carga)))
+            evaluaciones += 1
+            if progreso:
+                progreso(1)
+            continue
+        candidatos = [actual[:i] + actual[i + 1:] for i in range(len(actual))]
+        retenciones = _puntuar_y_registrar(corr, candidatos, registro, progreso, n_componentes)
+        evaluaciones += len(candidatos)
+        actual = candidatos[int(np.argmax(retenciones))]
+    return {k: r.ordenados() for k, r in registro.items()}, evaluaciones
+
+
+def busqueda_haz(corr, max_k, ancho=ANCHO_HAZ, progreso=None, n_mejores=1, n_componentes=1):
+    """
+    Búsqueda en haz: como la selección hacia adelante, pero conserva en cada
+    nivel los 'ancho' mejores subconjuntos en lugar de solo uno.
+
+    Args:
+        corr (ndarray): Matriz de correlación p x p.
+        max_k (int): Tamaño máximo de subconjunto.
+        ancho (int): Subconjuntos conservados por nivel.
+        progreso (callable): Opcional; recibe las evaluaciones de cada nivel.
+        n_mejores (int): Subconjuntos a conservar por k (entre los evaluados).
+        n_componentes (int): Componentes retenidos (ver puntuar_combinaciones).
+
+    Returns:
+        tuple: ({k: [(retención, tupla de índices)]}, evaluaciones)
+    """
+    p = corr.shape[0]
+    registro = {k: MejoresN(n_mejores) for k in range(2, max_k + 1)}
+    # Nivel 2: los mejores pares por correlación absoluta
+    haz = _mejores_pares(corr, max(ancho, n_mejores))
+    _puntuar_y_registrar(corr, haz, registro, progreso, n_componentes)
+    evaluaciones = len(haz)
+    haz = haz[:ancho]
+
+    for k in range(3, max_k + 1):
+        candidatos = sorted({tuple(sorted(sub + (c,))) for sub in haz for c in range(p) if c not in sub})
+        retenciones = _puntuar_y_registrar(corr, candidatos, registro, progreso, n_componentes)
+        evaluaciones += len(candidatos)
+        orden = np.argsort(-retenciones, kind='stable')[:ancho]
+        haz = [candidatos[i] for i in orden]
+    return {k: r.ordenados() for k, r in registro.items()}, evaluaciones
+
+
+def busqueda_intercambio(corr, max_k, progreso=None, n_mejores=1, n_componentes=1):
+    """
+    Búsqueda local por intercambios: parte de la solución voraz de cada k y
+    cambia una variable de dentro por una de fuera mientras mejore la retención.
+
+    Args:
+        corr (ndarray): Matriz de correlación p x p.
+        max_k (int): Tamaño máximo de subconjunto.
+        progreso (callable): Opcional; recibe las evaluaciones de cada paso.
+        n_mejores (int): Subconjuntos a conservar por k (entre los evaluados).
+        n_componentes (int): Componentes retenidos (ver puntuar_combinaciones).
+
+    Returns:
+        tuple: ({k: [(retención, tupla de índices)]}, evaluaciones)
+    """
+    p = corr.shape[0]
+    voraz, evaluaciones = busqueda_voraz(corr, max_k, progreso, n_mejores, n_componentes)
+    registro = {k: MejoresN(n_mejores) for k in range(2, max_k + 1)}
+    for k, lista in voraz.items():
+        for retencion, indices in lista:
+            registro[k].agregar_lote(np.array([retencion]), [indices])
+        retencion, actual = lista[0][0], list(lista[0][1])
+        for _ in range(MAX_ITER_INTERCAMBIO):
+            fuera = [c for c in range(p) if c not in actual]
+            candidatos = [sorted(actual[:i] + [c] + actual[i + 1:]) for i in range(k) for c in fuera]
+            if not candidatos:
+                break
+            retenciones = _puntuar_y_registrar(corr, candidatos, registro, progreso, n_componentes)
+            evaluaciones += len(candidatos)
+            pos = int(np.argmax(retenciones))
+            if retenciones[pos] <= retencion + TOLERANCIA_PODA:
+                break
+            retencion, actual = retenciones[pos], candidatos[pos]
+    return {k: r.ordenados() for k, r in registro.items()}, evaluaciones
+
+
+def mejores_subconjuntos_exactos(corr, k, progreso=None, n_mejores=1, n_componentes=1, semilla=None):
+    """
+    Búsqueda exacta de los n_mejores subconjuntos de k variables con mayor
+    retención de los primeros n_componentes mediante ramificación y acotamiento.
+
+    Por el teorema de entrelazamiento de Cauchy, el i-ésimo valor propio de una
+    submatriz principal nunca supera al i-ésimo de la matriz que la contiene
+    (y por lo tanto tampoco la suma de los m mayores). Así, para un nodo con
+    variables fijas S y candidatas C, ningún subconjunto completado dentro de
+    S ∪ C puede superar (lambda1 + ... + lambdam)(S ∪ C) / k, y agregar
+    variables nunca eleva esa cota. Las ramas cuya cota no supera la n-ésima
+    mejor solución encontrada se podan.
+
+    Args:
+        corr (ndarray): Matriz de correlación p x p.
+        k (int): Tamaño del subconjunto.
+        progreso (callable): Opcional; recibe las evaluaciones de cada nodo.
+        n_mejores (int): Subconjuntos a conservar.
+        n_componentes (int): Componentes retenidos (ver puntuar_combinaciones).
+        semilla (list): Opcional; [(retención, tupla de índices)] de k
+            variables para la cota inicial, como los de busqueda_voraz (que
+            se llama si es None; sus evaluaciones se cuentan solo entonces).
+
+    Returns:
+        tuple: ([(retención, tupla de índices)], nodos evaluados)
+    """
+    evaluaciones = 0
+    if semilla is None:
+        voraz, evaluaciones = busqueda_voraz(corr, k, n_mejores=n_mejores, n_componentes=n_componentes)
+        semilla = voraz[k]
+    mejores = MejoresN(n_mejores)
+    for retencion, indices in semilla:
+        mejores.agregar_lote(np.array([retencion]), [indices])
+
+    # Variables con más peso en los componentes globales primero: así las uniones de
+    # los hermanos posteriores (sin esas variables) tienen cotas bajas y se podan antes.
+    orden = [int(c) for c in np.argsort(-_cargas(corr, n_componentes), kind='stable')]
+    diagonal = np.diag(corr)
+
+    def cota(indices):
+        sub = corr[np.ix_(indices, indices)]
+        # La traza de cualquier completación es al menos k menos las columnas constantes
+        constantes = int(np.sum(diagonal[indices] == 0))
+        # La retención nunca pasa de 1 (con k <= n_componentes se alcanza y poda todo)
+        return min(np.linalg.eigvalsh(sub)[-n_componentes:].sum() / max(k - constantes, 1), 1.0)
+
+    def explorar(actual, candidatos):
+        nonlocal evaluaciones
+        faltan = k - len(actual)
+
+        # Último nivel: todas las hojas se evalúan en un solo lote
+        if faltan == 1:
+            hojas = np.array([actual + [c] for c in candidatos])
+            mejores.agregar_lote(puntuar_combinaciones(corr, hojas, n_componentes), hojas)
+            evaluaciones += len(hojas)
+            if progreso:
+                progreso(len(hojas))
+            return
+
+        for pos in range(len(candidatos) - faltan + 1):
+            hijo = actual + [candidatos[pos]]
+            resto = candidatos[pos + 1:]
+            evaluaciones += 1
+            if progreso:
+                progreso(1)
+            # La unión de cada hermano siguiente está contenida en esta, así que
+            # si esta cota no alcanza, tampoco alcanzan las siguientes.
+            if cota(hijo + resto) <= mejores.umbral + TOLERANCIA_PODA:
+                break
+            explorar(hijo, resto)
+
+    explorar([], orden)
+
+    return mejores.ordenados(), evaluaciones
+
+
+def total_combinaciones(n_total, max_k=MAX_K_COMBINACIONES):
+    """Número de subconjuntos de 2 a max_k variables (lo que recorre la búsqueda exacta)."""
+    return sum(math.comb(n_total, k) for k in range(2, min(max_k, n_total) + 1))
+
+
+def elegir_modo_automatico(n_total, max_k=MAX_K_COMBINACIONES):
+    """Búsqueda exacta si el total de combinaciones es manejable; si no, intercambio local."""
+    return "exacta" if total_combinaciones(n_total, max_k) <= LIMITE_BUSQUEDA_EXACTA else "intercambio"
+
+
+def buscar_mejores_combinaciones(corr, max_k=MAX_K_COMBINACIONES, modo="exacta", ancho_haz=ANCHO_HAZ,
+                                 procesos=1, progreso=None, n_mejores=1, n_componentes=1, al_puntuar=None):
+    """
+    Generador con los n_mejores subconjuntos de cada tamaño k, de 2 a max_k.
+
+    En modo "exacta" cada k se enumera por completo (si cabe en
+    LIMITE_ENUMERACION por proceso) o se resuelve por ramificación y
+    acotamiento, y se entrega en cuanto está listo. Las combinaciones se
+    consumen de forma perezosa y solo se guardan los n_mejores en un heap, así
+    que la memoria no depende de C(n, k). Con procesos > 1 las enumeraciones
+    grandes se reparten en un ProcessPoolExecutor que recibe la matriz de
+    correlación una sola vez por memoria compartida. El modo "gray" es
+    igual de exacto, pero enumera en orden de puerta giratoria: cada
+    combinación cambia una sola variable respecto de la anterior, y eso
+    permite acotar su valor propio con el vector de la anterior y descomponer
+    solo las que pueden entrar entre las n_mejores (ver
+    cotas_puerta_giratoria). Los modos aproximados
+    ("voraz", "eliminacion", "haz", "intercambio") calculan todos los k juntos
+    y sus n_mejores salen de los subconjuntos que llegaron a evaluar.
+
+    La retención que se maximiza es la de los primeros n_componentes (la
+    suma de los n_componentes mayores valores propios sobre la traza); cada
+    submatriz se descompone igual que para PC1, así que el costo no cambia
+    (salvo en modo "gray", cuyas cotas son solo de PC1).
+
+    Args:
+        corr (ndarray): Matriz de correlación p x p.
+        max_k (int): Tamaño máximo de subconjunto.
+        modo (str): Uno de los valores de MODOS_BUSQUEDA (salvo "automatico").
+        ancho_haz (int): Ancho de la búsqueda en haz.
+        procesos (int): Procesos para la enumeración exacta.
+        progreso (callable): Opcional; recibe cada incremento de combinaciones
+            evaluadas. Si lanza BusquedaCancelada, la búsqueda se detiene y
+            libera el pool de procesos.
+        n_mejores (int): Subconjuntos a conservar por k.
+        n_componentes (int): Componentes cuya retención se maximiza.
+        al_puntuar (callable): Opcional; recibe (k, máscaras, retenciones) de
+            cada lote puntuado por enumeración en los modos exactos, con las
+            máscaras de bits de acp.indice.mascaras_combinaciones (así se
+            llena un IndiceCombinaciones). En modo "gray" obliga a
+            descomponer todas las combinaciones. Los k resueltos por
+            ramificación y los modos aproximados no lo llaman.
+
+    Yields:
+        tuple: (k, [(retención, tupla de índices)], evaluaciones, método) con
+        la lista de mayor a menor retención; método es "enumeracion", "gray"
+        o "ramificacion" en los modos exactos, o el modo aproximado (en ese caso las
+        evaluaciones son el total de la búsqueda).
+    """
+    n_total = corr.shape[0]
+    max_k = min(max_k, n_total)
+
+    if modo in MODOS_EXACTOS:
+        gray = modo == "gray"
+        memoria = None
+        executor = None
+        semillas = None
+        try:
+            for k in range(2, max_k + 1):
+                n_combos = math.comb(n_total, k)
+                if n_combos > LIMITE_ENUMERACION * procesos:
+                    # Demasiadas combinaciones para enumerar: búsqueda exacta con poda
+                    evaluaciones_semilla = 0
+                    if semillas is None:
+                        # La selección hacia adelante hasta max_k da a la vez las semillas de todos los k
+                        semillas, evaluaciones_semilla = busqueda_voraz(corr, max_k, n_mejores=n_mejores,
+                                                                        n_componentes=n_componentes)
+                    mejores, evaluaciones = mejores_subconjuntos_exactos(corr, k, progreso, n_mejores, n_componentes,
+                                                                         semillas[k])
+                    yield k, mejores, evaluaciones + evaluaciones_semilla, "ramificacion"
+                elif procesos > 1 and n_combos >= MIN_COMBOS_PARALELO:
+                    if executor is None:
+                        # La matriz se copia una sola vez a memoria compartida para todo el pool
+                        memoria = shared_memory.SharedMemory(create=True, size=max(corr.nbytes, 1))
+                        np.ndarray(corr.shape, dtype=np.float64, buffer=memoria.buf)[:] = corr
+                        executor = ProcessPoolExecutor(max_workers=procesos,
+                                                       initializer=_iniciar_trabajador,
+                                                       initargs=(memoria.name, corr.shape))
+                    mejores = puntuar_en_paralelo(executor, n_total, k, procesos, progreso, n_mejores,
+                                                  _puntuar_rango_gray if gray else _puntuar_rango, n_componentes,
+                                                  al_puntuar)
+                    yield k, mejores, n_combos, "gray" if gray else "enumeracion"
+                elif gray:
+                    mejores = MejoresN(n_mejores)
+                    tamano = TAMANO_LOTE_EIG * PASOS_GRAY
+                    for inicio in range(0, n_combos, tamano):
+                        filas = filas_puerta_giratoria(n_total, k, inicio, inicio + tamano)
+                        puntuar_tramo_gray(corr, filas, mejores, n_componentes, al_puntuar)
+                        if progreso:
+                            progreso(len(filas))
+                    yield k, mejores.ordenados(), n_combos, "gray"
+                else:
+                    # Flujo perezoso de combinaciones de tamaño k (como índices de columna),
+                    # consumido por bloques para informar el avance y cancelar entre bloques
+                    combos = combinations(range(n_total), k)
+                    mejores = MejoresN(n_mejores)
+                    while True:
+                        bloque = np.array(list(islice(combos, TAMANO_LOTE_EIG)), dtype=np.intp)
+                        if len(bloque) == 0:
+                            break
+                        # Retención de cada subconjunto = mayores valores propios de su submatriz de correlación / k
+                        retenciones = puntuar_combinaciones(corr, bloque, n_componentes)
+                        mejores.agregar_lote(retenciones, bloque)
+                        if al_puntuar:
+                            al_puntuar(k, mascaras_combinaciones(bloque, n_total), retenciones)
+                        if progreso:
+                            progreso(len(bloque))
+                    yield k, mejores.ordenados(), n_combos, "enumeracion"
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            if memoria is not None:
+                memoria.close()
+                memoria.unlink()
+        return
+
+    if modo == "voraz":
+        mejores, evaluaciones = busqueda_voraz(corr, max_k, progreso, n_mejores, n_componentes)
+    elif modo == "eliminacion":
+        mejores, evaluaciones = busqueda_eliminacion(corr, max_k, progreso, n_mejores, n_componentes)
+    elif modo == "haz":
+        mejores, evaluaciones = busqueda_haz(corr, max_k, ancho_haz, progreso, n_mejores, n_componentes)
+    elif modo == "intercambio":
+        mejores, evaluaciones = busqueda_intercambio(corr, max_k, progreso, n_mejores, n_componentes)
+    else:
+        raise ValueError(f"Modo de búsqueda desconocido: {modo}")
+
+    for k in range(2, max_k + 1):
+        yield k, mejores[k], evaluaciones, modo
@@ -0,0 +1,126 @@
+"""
+Estadísticas suficientes del archivo completo, calculadas una sola vez.
+
+En una pasada por bloques se acumulan, para cada patrón de datos faltantes
+(qué columnas son NaN en la fila), el número de filas, la media y la matriz
+de co-momentos de todas las columnas. Las filas limpias de cualquier
+selección son justo las de los patrones sin faltantes en esas columnas, así
+que su covarianza, correlación y componentes salen de fusionar esos
+patrones: O(patrones·k² + k³) sin volver a leer filas. Las filas solo se
+releen al exportar los componentes.
+"""
+import numpy as np
+
+from .carga import FILAS_POR_BLOQUE
+from .incremental import EstadisticasIncrementales, a_numerico, resultado_desde_estadisticas
+
+MAX_PATRONES_FALTANTES = 256 # Patrones de faltantes distintos admitidos antes de desistir
+MAX_BYTES_ESTADISTICAS = 256 * 1024 ** 2 # Memoria máxima para los co-momentos de todos los patrones
+
+
+class EstadisticasSuficientes:
+    """
+    n, media y co-momentos por patrón de faltantes de todas las columnas de
+    un archivo. Los valores faltantes se guardan como 0 en la media y los
+    co-momentos de su patrón; nunca se usan porque para_columnas solo
+    fusiona patrones sin faltantes en las columnas pedidas.
+    """
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        self.posiciones = {col: i for i, col in enumerate(self.columnas)}
+        self.filas = 0
+        self.patrones = {} # bytes del patrón -> (máscara de faltantes, EstadisticasIncrementales)
+
+    @classmethod
+    def desde_fuente(cls, fuente_datos, progreso=None, filas_por_bloque=FILAS_POR_BLOQUE):
+        """
+        Una pasada por bloques sobre todas las columnas de 'fuente_datos'.
+
+        Args:
+            fuente_datos (FuenteDatos): Archivo abierto.
+            progreso (callable): Opcional; recibe las filas leídas en cada
+                bloque (puede lanzar BusquedaCancelada para detener la lectura).
+            filas_por_bloque (int): Filas por bloque.
+
+        Returns:
+            EstadisticasSuficientes, o None si hay demasiados patrones de
+            faltantes (o columnas) para guardarlos en memoria; en ese caso
+            los análisis leen las filas como siempre.
+        """
+        estadisticas = cls(fuente_datos.columnas)
+        for bloque in fuente_datos.bloques(estadisticas.columnas, filas_por_bloque):
+            if not estadisticas.agregar(a_numerico(bloque, estadisticas.columnas)):
+                return None
+            if progreso:
+                progreso(len(bloque))
+        return estadisticas
+
+    def agregar(self, datos):
+        """
+        Incorpora un bloque (ndarray n_b x p con NaN en los faltantes).
+
+        Returns:
+            bool: False si se superó MAX_PATRONES_FALTANTES o MAX_BYTES_ESTADISTICAS.
+        """
+        self.filas += len(datos)
+        if len(datos) == 0:
+            return True
+        faltantes = np.isnan(datos)
+        claves, grupo = np.unique(np.packbits(faltantes, axis=1), axis=0, return_inverse=True)
+        grupo = grupo.ravel()
+        datos = np.where(faltantes, 0.0, datos)
+        p = len(self.columnas)
+        for i, clave in enumerate(claves):
+            clave = clave.tobytes()
+            if clave not in self.patrones:
+                if len(self.patrones) >= MAX_PATRONES_FALTANTES \
+                        or (len(self.patrones) + 1) * p * p * 8 > MAX_BYTES_ESTADISTICAS:
+                    return False
+                mascara = np.unpackbits(claves[i], count=p).astype(bool)
+                self.patrones[clave] = (mascara, EstadisticasIncrementales(p))
+            self.patrones[clave][1].agregar(datos[grupo == i])
+        return True
+
+    def faltantes_por_columna(self):
+        """Filas con faltante (o valor no numérico) en cada columna: {columna: filas}."""
+        conteo = np.zeros(len(self.columnas), dtype=np.int64)
+        for mascara, estadisticas in self.patrones.values():
+            conteo += mascara * estadisticas.n
+        return dict(zip(self.columnas, conteo.tolist()))
+
+    def para_columnas(self, selected_columns):
+        """
+        EstadisticasIncrementales de las filas sin faltantes en
+        'selected_columns' (las mismas que deja limpiar_datos).
+
+        Raises:
+            KeyError: Si alguna columna no está en el archivo.
+        """
+        indices = [self.posiciones[col] for col in selected_columns]
+        sub = np.ix_(indices, indices)
+        resultado = EstadisticasIncrementales(len(indices))
+        for mascara, estadisticas in self.patrones.values():
+            if not mascara[indices].any():
+                resultado.fusionar(estadisticas.n, estadisticas.media[indices], estadisticas.comomentos[sub])
+        return resultado
+
+
+def analizar_pca_desde_estadisticas(estadisticas, selected_columns, etapa=None):
+    """
+    Versión de analizar_pca que no lee filas: todo sale de 'estadisticas'.
+    Como en el análisis por bloques, datos_transformados queda en None y
+    resultado.modelo sirve para exportar con exportar_componentes_por_bloques.
+
+    Args:
+        estadisticas (EstadisticasSuficientes): Del archivo abierto.
+        selected_columns (list): Columnas a analizar.
+        etapa (callable): Opcional; recibe el nombre de cada etapa.
+
+    Returns:
+        ResultadoPCA
+    """
+    if etapa:
+        etapa("Calculando componentes...")
+    columnas = list(selected_columns)
+    return resultado_desde_estadisticas(columnas, estadisticas.filas, estadisticas.para_columnas(columnas))
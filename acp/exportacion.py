@@ -0,0 +1,206 @@
+"""
+Escritura de los componentes principales por bloques.
+
+Todos los formatos reciben los componentes como una secuencia de bloques
+(ndarray filas x componentes), les añaden COMPONENTE_SUMA y los escriben
+sin juntar el archivo completo en memoria:
+
+    .xlsx:    SpreadsheetML escrito fila a fila dentro del zip (sin openpyxl).
+    .parquet: un grupo de filas de pyarrow por bloque.
+    .csv:     texto bloque a bloque sobre el mismo archivo (como pandas.to_csv).
+    .npy:     memmap de NumPy (COMPONENTE_SUMA en la última columna).
+"""
+import os
+import threading
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from .parametros import FORMATOS_EXPORTACION
+
+FILAS_POR_BLOQUE_EXPORTACION = 50_000 # Filas por bloque al exportar datos que ya están en memoria
+MAX_FILAS_EXCEL = 1_048_575 # Filas de datos que caben en una hoja de Excel (más el encabezado)
+HOJA_EXCEL = "Sheet1" # Nombre de la hoja (el mismo que ponía pandas.to_excel)
+NIVEL_COMPRESION_XLSX = 1 # zlib: el nivel 1 comprime casi igual que el 6 en mucho menos tiempo
+
+
+def formato_exportacion(filepath):
+    """Extensión de FORMATOS_EXPORTACION para 'filepath'; una extensión desconocida se escribe como Excel."""
+    extension = os.path.splitext(filepath)[1].lower()
+    return extension if extension in FORMATOS_EXPORTACION else ".xlsx"
+
+
+def nombres_columnas(n_componentes):
+    """PC1..PCn y COMPONENTE_SUMA."""
+    return [f"PC{i+1}" for i in range(n_componentes)] + ["COMPONENTE_SUMA"]
+
+
+def bloques_de_arreglo(datos, filas_por_bloque=FILAS_POR_BLOQUE_EXPORTACION):
+    """Divide un ndarray en vistas de hasta 'filas_por_bloque' filas (sin copiarlo)."""
+    for inicio in range(0, len(datos), filas_por_bloque):
+        yield datos[inicio:inicio + filas_por_bloque]
+
+
+def escribir_componentes(bloques, filepath, n_componentes, n_filas=None, progreso=None):
+    """
+    Escribe los bloques de componentes y COMPONENTE_SUMA en 'filepath', con
+    el formato que indica su extensión (ver formato_exportacion). Si la
+    escritura falla o se cancela, 'filepath' queda como estaba.
+
+    Args:
+        bloques (iterable): ndarray de n_b x n_componentes cada uno.
+        filepath (str): Ruta de salida.
+        n_componentes (int): Columnas de cada bloque.
+        n_filas (int): Filas en total; obligatorio para .npy (se reserva el
+            archivo de antemano) y opcional para los demás.
+        progreso (callable): Opcional; recibe las filas escritas en cada
+            bloque (puede lanzar BusquedaCancelada para detener la escritura).
+
+    Returns:
+        int: Filas escritas.
+
+    Raises:
+        ImportError: Si falta pyarrow (.parquet).
+        ValueError: Si las filas no caben en una hoja de Excel o no coinciden
+            con n_filas en un .npy.
+    """
+    formato = formato_exportacion(filepath)
+    if formato == ".npy" and n_filas is None:
+        raise ValueError("Para escribir un .npy hace falta conocer el número de filas")
+    if formato == ".xlsx" and n_filas is not None and n_filas > MAX_FILAS_EXCEL:
+        raise ValueError(f"Excel admite hasta {MAX_FILAS_EXCEL:,} filas por hoja; use .parquet, .csv o .npy")
+
+    escritor = {".xlsx": _escribir_xlsx, ".parquet": _escribir_parquet,
+                ".csv": _escribir_csv, ".npy": _escribir_npy}[formato]
+    # Se escribe a un archivo temporal junto al destino y se renombra al final: una cancelación o un
+    # error no deja un archivo a medias ni toca el que ya hubiera en 'filepath'
+    temporal = f"{filepath}.{os.getpid()}-{threading.get_ident()}.parcial"
+    try:
+        filas = escritor(_con_suma(bloques, progreso), temporal, n_componentes, n_filas)
+        os.replace(temporal, filepath)
+        return filas
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _con_suma(bloques, progreso):
+    """Cada bloque como float64 con COMPONENTE_SUMA en la última columna."""
+    for bloque in bloques:
+        salida = np.empty((len(bloque), bloque.shape[1] + 1))
+        salida[:, :-1] = bloque
+        salida[:, -1] = bloque.sum(axis=1)
+        yield salida
+        if progreso:
+            progreso(len(bloque))
+
+
+_XLSX_FIJOS = {
+    "[Content_Types].xml":
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>',
+    "_rels/.rels":
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>',
+    "xl/workbook.xml":
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{HOJA_EXCEL}" sheetId="1" r:id="rId1"/></sheets></workbook>',
+    "xl/_rels/workbook.xml.rels":
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>',
+}
+
+
+def _filas_xlsx(bloque):
+    """Filas <row> de SpreadsheetML para un bloque (celdas vacías en NaN o infinito)."""
+    if np.isfinite(bloque).all():
+        return "".join("<row><c><v>" + "</v></c><c><v>".join(map(repr, fila)) + "</v></c></row>"
+                       for fila in bloque.tolist())
+    return "".join("<row>" + "".join(f"<c><v>{valor!r}</v></c>" if np.isfinite(valor) else "<c/>" for valor in fila)
+                   + "</row>" for fila in bloque.tolist())
+
+
+def _escribir_xlsx(bloques, filepath, n_componentes, n_filas):
+    """
+    Libro de una sola hoja escrito directamente como SpreadsheetML dentro
+    del zip, fila a fila: sin openpyxl y sin guardar el libro en memoria
+    (openpyxl, incluso en modo solo escritura, trata cada celda como objeto
+    y es unas diez veces más lento).
+    """
+    encabezado = "".join(f'<c t="inlineStr"><is><t>{nombre}</t></is></c>' for nombre in nombres_columnas(n_componentes))
+    escritas = 0
+    with zipfile.ZipFile(filepath, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESION_XLSX) as libro:
+        for nombre, contenido in _XLSX_FIJOS.items():
+            libro.writestr(nombre, contenido)
+        with libro.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as hoja:
+            hoja.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        f'<sheetData><row>{encabezado}</row>').encode("utf-8"))
+            for bloque in bloques:
+                escritas += len(bloque)
+                if escritas > MAX_FILAS_EXCEL:
+                    raise ValueError(f"Excel admite hasta {MAX_FILAS_EXCEL:,} filas por hoja; use .parquet, .csv o .npy")
+                hoja.write(_filas_xlsx(bloque).encode("ascii"))
+            hoja.write(b"</sheetData></worksheet>")
+    return escritas
+
+
+def _escribir_parquet(bloques, filepath, n_componentes, n_filas):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    nombres = nombres_columnas(n_componentes)
+    esquema = pa.schema([(nombre, pa.float64()) for nombre in nombres])
+    escritas = 0
+    with pq.ParquetWriter(filepath, esquema) as escritor:
+        for bloque in bloques:
+            escritor.write_table(pa.Table.from_arrays([bloque[:, j] for j in range(bloque.shape[1])], schema=esquema))
+            escritas += len(bloque)
+    return escritas
+
+
+def _escribir_csv(bloques, filepath, n_componentes, n_filas):
+    nombres = nombres_columnas(n_componentes)
+    escritas = 0
+    with open(filepath, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(nombres) + "\n")
+        for bloque in bloques:
+            if np.isfinite(bloque).all():
+                # Mismo texto que to_csv (repr de cada float), sin pasar por un DataFrame
+                f.write("".join(",".join(map(repr, fila)) + "\n" for fila in bloque.tolist()))
+            else:
+                pd.DataFrame(bloque, columns=nombres).to_csv(f, header=False, index=False)
+            escritas += len(bloque)
+    return escritas
+
+
+def _escribir_npy(bloques, filepath, n_componentes, n_filas):
+    salida = np.lib.format.open_memmap(filepath, mode="w+", dtype=np.float64, shape=(n_filas, n_componentes + 1))
+    escritas = 0
+    try:
+        for bloque in bloques:
+            if escritas + len(bloque) > n_filas:
+                raise ValueError(f"Hay más de las {n_filas} filas reservadas en el .npy")
+            salida[escritas:escritas + len(bloque)] = bloque
+            escritas += len(bloque)
+        salida.flush()
+    finally:
+        del salida # Cierra el memmap (necesario para poder borrarlo en Windows)
+    return escritas
@@ -0,0 +1,208 @@
+"""
+PCA por bloques para archivos que no caben en memoria.
+
+Primera pasada: media y matriz de co-momentos acumuladas bloque a bloque con
+la fusión de Chan/Welford (estable numéricamente). Con eso salen la matriz de
+covarianza original y la de los datos estandarizados, cuyos vectores propios
+son los componentes principales. Segunda pasada (opcional): se proyecta cada
+bloque y los componentes se escriben directamente a disco. La memoria queda
+acotada por el tamaño del bloque, no por el número de filas.
+"""
+import os
+import time
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from .cache import huella_archivo
+from .carga import FILAS_POR_BLOQUE
+from .exportacion import escribir_componentes
+from .motor import ResultadoPCA
+from .resolutores import orientar_componentes
+
+UMBRAL_BYTES_POR_BLOQUES = 512 * 1024 ** 2 # CSV más grandes que esto se analizan por bloques
+
+
+class EstadisticasIncrementales:
+    """
+    Media y matriz de co-momentos (suma de productos de desviaciones) de p
+    variables, actualizadas bloque a bloque.
+    """
+
+    def __init__(self, p):
+        self.n = 0
+        self.media = np.zeros(p)
+        self.comomentos = np.zeros((p, p))
+
+    def agregar(self, bloque):
+        """Incorpora un bloque (ndarray n_b x p, sin NaN)."""
+        if len(bloque) == 0:
+            return
+        media_b = bloque.mean(axis=0)
+        centrado = bloque - media_b
+        self.fusionar(len(bloque), media_b, centrado.T @ centrado)
+
+    def fusionar(self, n_b, media_b, comomentos_b):
+        """Incorpora las estadísticas (n, media, co-momentos) de otro grupo de filas."""
+        if n_b == 0:
+            return
+        n = self.n + n_b
+        delta = media_b - self.media
+        self.comomentos += comomentos_b + np.outer(delta, delta) * (self.n * n_b / n)
+        self.media += delta * (n_b / n)
+        self.n = n
+
+    def covarianza(self, ddof=1):
+        """Matriz de covarianza (NaN si no hay filas suficientes, como pandas)."""
+        if self.n - ddof <= 0:
+            return np.full_like(self.comomentos, np.nan)
+        return self.comomentos / (self.n - ddof)
+
+
+@dataclass
+class ModeloPCA:
+    """Lo necesario para proyectar filas nuevas: StandardScaler + PCA ajustados."""
+    columnas: list
+    media: np.ndarray
+    escala: np.ndarray
+    componentes: np.ndarray # Un componente por fila, como PCA.components_
+    n_filas: int
+
+    def proyectar(self, datos):
+        return ((datos - self.media) / self.escala) @ self.componentes.T
+
+
+def usar_por_bloques(fuente_datos):
+    """True si el archivo es un CSV lo bastante grande para analizarlo por bloques."""
+    ruta = fuente_datos.ruta
+    return ruta.lower().endswith(".csv") and os.path.getsize(ruta) > UMBRAL_BYTES_POR_BLOQUES
+
+
+def a_numerico(bloque, columnas):
+    """Las columnas de un bloque como ndarray float64, con lo no numérico como NaN (igual que limpiar_datos)."""
+    for col in bloque.columns:
+        if not pd.api.types.is_numeric_dtype(bloque[col]):
+            bloque[col] = pd.to_numeric(bloque[col], errors='coerce')
+    return bloque[columnas].to_numpy(dtype=np.float64)
+
+
+def _bloques_numericos(fuente_datos, columnas, filas_por_bloque, progreso):
+    """
+    Bloques como ndarray float64 con la misma limpieza que limpiar_datos
+    (conversión a numérico y sin filas con faltantes).
+
+    Yields:
+        tuple: (ndarray de filas válidas, filas leídas del archivo)
+    """
+    for bloque in fuente_datos.bloques(columnas, filas_por_bloque):
+        datos = a_numerico(bloque, columnas)
+        if progreso:
+            progreso(len(bloque))
+        yield datos[~np.isnan(datos).any(axis=1)], len(bloque)
+
+
+def analizar_pca_por_bloques(fuente_datos, selected_columns, etapa=None, progreso=None,
+                             filas_por_bloque=FILAS_POR_BLOQUE, cache=None):
+    """
+    Versión por bloques de analizar_pca: mismos resultados, sin cargar el
+    archivo completo. Los componentes no se calculan aquí (datos_transformados
+    queda en None); resultado.modelo sirve para exportarlos con
+    exportar_componentes_por_bloques.
+
+    Args:
+        fuente_datos (FuenteDatos): Archivo abierto.
+        selected_columns (list): Columnas a analizar.
+        etapa (callable): Opcional; recibe el nombre de cada etapa.
+        progreso (callable): Opcional; recibe las filas leídas en cada bloque.
+        filas_por_bloque (int): Filas por bloque.
+        cache (CacheLRU): Opcional; la clave es la ruta, el tamaño y la fecha
+            del archivo (leer el contenido para la huella costaría otra pasada).
+
+    Returns:
+        ResultadoPCA
+    """
+    columnas = list(selected_columns)
+    clave = None
+    if cache is not None:
+        clave = huella_archivo(fuente_datos.ruta, columnas, "por_bloques")
+        guardado = cache.obtener(clave)
+        if guardado is not None:
+            return replace(guardado, desde_cache=True)
+
+    if etapa:
+        etapa("Leyendo datos por bloques...")
+    estadisticas = EstadisticasIncrementales(len(columnas))
+    filas_originales = 0
+    for datos, leidas in _bloques_numericos(fuente_datos, columnas, filas_por_bloque, progreso):
+        estadisticas.agregar(datos)
+        filas_originales += leidas
+
+    if etapa:
+        etapa("Calculando componentes...")
+    resultado = resultado_desde_estadisticas(columnas, filas_originales, estadisticas)
+    if cache is not None and resultado.filas_limpias > 0:
+        cache.guardar(clave, resultado)
+    return resultado
+
+
+def resultado_desde_estadisticas(columnas, filas_originales, estadisticas):
+    """
+    ResultadoPCA (sin datos_transformados, con modelo) a partir de la media
+    y los co-momentos de las filas limpias: solo operaciones p x p.
+    """
+    resultado = ResultadoPCA(columnas=list(columnas), filas_originales=filas_originales,
+                             filas_limpias=estadisticas.n)
+    if resultado.filas_limpias == 0 or len(columnas) == 0:
+        return resultado
+
+    n = estadisticas.n
+    covarianza = estadisticas.covarianza()
+    resultado.matriz_covarianza = pd.DataFrame(covarianza, columns=columnas, index=columnas)
+
+    # StandardScaler usa la desviación poblacional; las columnas constantes quedan con escala 1
+    escala = np.sqrt(np.diag(estadisticas.comomentos) / n)
+    escala[escala == 0] = 1.0
+    covarianza_estandar = covarianza / np.outer(escala, escala)
+
+    inicio = time.perf_counter()
+    valores, vectores = np.linalg.eigh(covarianza_estandar)
+    orden = np.argsort(valores)[::-1][:min(n, len(columnas))]
+    valores = np.clip(valores[orden], 0.0, None)
+    componentes = orientar_componentes(vectores[:, orden].T)
+
+    resultado.resolutor = "covarianza"
+    resultado.segundos_resolutor = time.perf_counter() - inicio
+    resultado.n_componentes = len(componentes)
+    resultado.varianza_explicada = valores / valores.sum()
+    pc_names = [f"PC{i+1}" for i in range(resultado.n_componentes)]
+    resultado.matriz_covarianza_pca = pd.DataFrame(componentes @ covarianza_estandar @ componentes.T,
+                                                   columns=pc_names, index=pc_names)
+    resultado.modelo = ModeloPCA(columnas=list(columnas), media=estadisticas.media, escala=escala,
+                                 componentes=componentes, n_filas=n)
+    return resultado
+
+
+def exportar_componentes_por_bloques(fuente_datos, modelo, filepath, progreso=None,
+                                     filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Segunda pasada: proyecta el archivo bloque a bloque y escribe todos los
+    componentes más COMPONENTE_SUMA en 'filepath' (.xlsx, .parquet, .csv o
+    .npy; ver acp.exportacion) sin tenerlos todos en memoria.
+
+    Args:
+        progreso (callable): Opcional; recibe las filas escritas en cada bloque.
+
+    Raises:
+        ImportError: Si falta pyarrow (.parquet).
+        ValueError: Si el archivo cambió desde el análisis (o no cabe en
+            una hoja de Excel).
+    """
+    bloques = (modelo.proyectar(datos) for datos, _ in
+               _bloques_numericos(fuente_datos, modelo.columnas, filas_por_bloque, None))
+    escritas = escribir_componentes(bloques, filepath, len(modelo.componentes), n_filas=modelo.n_filas,
+                                    progreso=progreso)
+    if escritas != modelo.n_filas:
+        os.remove(filepath)
+        raise ValueError(f"El archivo cambió desde el análisis: {escritas} filas válidas en lugar de {modelo.n_filas}")
+    return escritas
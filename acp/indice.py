@@ -0,0 +1,211 @@
+"""
+Índice columnar de todas las combinaciones puntuadas por una búsqueda.
+
+Cada combinación se guarda como una máscara de bits (una fila de palabras
+uint64, el bit i es la columna i) junto a su retención y su tamaño k. Las
+filas de cada k están ordenadas de mayor a menor retención y 'inicios' marca
+dónde empieza cada k, así que "todas por encima de 90 %" es una búsqueda
+binaria y "la mejor de 5 que contiene X" es un recorrido vectorizado que se
+queda con la primera coincidencia. Se guarda como .npz sin comprimir (una
+columna por arreglo). Este módulo solo depende de numpy.
+"""
+import math
+
+import numpy as np
+
+MAX_FILAS_INDICE = 20_000_000 # Combinaciones registradas como máximo (16 bytes cada una con <= 64 variables)
+EXTENSION_INDICE = ".npz"
+BITS_POR_PALABRA = 64
+
+
+def palabras_mascara(n_variables):
+    """Palabras uint64 por máscara para n_variables columnas."""
+    return max(1, -(-n_variables // BITS_POR_PALABRA))
+
+
+def mascaras_combinaciones(indices, n_variables):
+    """
+    Máscaras de bits de muchas combinaciones a la vez.
+
+    Args:
+        indices (ndarray): m x k índices de columna, una combinación por fila.
+        n_variables (int): Columnas totales (define las palabras por máscara).
+
+    Returns:
+        ndarray: m x palabras_mascara(n_variables), dtype uint64.
+    """
+    indices = np.asarray(indices, dtype=np.intp)
+    mascaras = np.zeros((len(indices), palabras_mascara(n_variables)), dtype=np.uint64)
+    filas = np.arange(len(indices))
+    for columna in indices.T:
+        mascaras[filas, columna // BITS_POR_PALABRA] |= np.left_shift(
+            np.uint64(1), (columna % BITS_POR_PALABRA).astype(np.uint64))
+    return mascaras
+
+
+class IndiceCombinaciones:
+    """
+    Combinaciones puntuadas, por columnas. Se llena con agregar (una llamada
+    por lote puntuado, en cualquier orden) y se ordena con cerrar; después
+    solo se consulta.
+
+    Un k es 'completo' si se registraron sus C(n, k) combinaciones: solo
+    entonces las consultas sobre ese k son exactas. Los k resueltos por
+    ramificación y acotamiento, los de los modos aproximados y los que no
+    entraron en max_filas quedan incompletos o ausentes.
+
+    Args:
+        columnas (list): Nombres de las variables (el bit i es columnas[i]).
+        n_componentes (int): Componentes cuya retención se puntuó.
+        max_filas (int): Combinaciones registradas como máximo; los lotes
+            que no caben se descartan y su k queda incompleto.
+    """
+
+    def __init__(self, columnas, n_componentes=1, max_filas=MAX_FILAS_INDICE):
+        self.columnas = [str(col) for col in columnas]
+        self.n_componentes = n_componentes
+        self.max_filas = max_filas
+        self._partes = {}
+        self._filas = 0
+        self.k = np.empty(0, dtype=np.int64)
+        self.inicios = np.zeros(1, dtype=np.int64)
+        self.completos = np.empty(0, dtype=bool)
+        self.retenciones = np.empty(0)
+        self.mascaras = np.empty((0, palabras_mascara(len(self.columnas))), dtype=np.uint64)
+
+    def __len__(self):
+        return int(self.inicios[-1]) + self._filas
+
+    def agregar(self, k, mascaras, retenciones):
+        """Registra un lote de combinaciones de tamaño k (ver mascaras_combinaciones)."""
+        partes = self._partes.setdefault(int(k), [])
+        if self._filas + len(retenciones) > self.max_filas:
+            partes.append(None) # Marca de lote descartado: este k ya no puede ser completo
+            return
+        partes.append((np.asarray(mascaras, dtype=np.uint64), np.asarray(retenciones, dtype=np.float64)))
+        self._filas += len(retenciones)
+
+    def cerrar(self):
+        """Junta los lotes y ordena cada k de mayor a menor retención (en empate, el orden de llegada)."""
+        ks = sorted(self._partes)
+        mascaras, retenciones, completos, inicios = [], [], [], [0]
+        for k in ks:
+            partes = self._partes[k]
+            validas = [parte for parte in partes if parte is not None]
+            ret_k = np.concatenate([r for _, r in validas]) if validas else np.empty(0)
+            orden = np.argsort(-ret_k, kind='stable')
+            retenciones.append(ret_k[orden])
+            mascaras.append(np.concatenate([m for m, _ in validas])[orden] if validas else self.mascaras[:0])
+            completos.append(len(validas) == len(partes) and len(ret_k) == math.comb(len(self.columnas), k))
+            inicios.append(inicios[-1] + len(ret_k))
+        self.k = np.array(ks, dtype=np.int64)
+        self.inicios = np.array(inicios, dtype=np.int64)
+        self.completos = np.array(completos, dtype=bool)
+        if ks:
+            self.retenciones = np.concatenate(retenciones)
+            self.mascaras = np.concatenate(mascaras)
+        self._partes = {}
+        self._filas = 0
+        return self
+
+    def guardar(self, ruta):
+        """Escribe el índice (ya cerrado) como .npz sin comprimir."""
+        with open(ruta, "wb") as f:
+            np.savez(f, columnas=np.array(self.columnas, dtype=str), n_componentes=np.int64(self.n_componentes),
+                     k=self.k, inicios=self.inicios, completos=self.completos, retenciones=self.retenciones,
+                     mascaras=self.mascaras)
+        return ruta
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Lee un índice escrito con guardar.
+
+        Raises:
+            OSError, ValueError, KeyError: Si el archivo no es un índice válido.
+        """
+        with np.load(ruta, allow_pickle=False) as archivo:
+            indice = cls([str(col) for col in archivo["columnas"]], int(archivo["n_componentes"]))
+            indice.k = archivo["k"]
+            indice.inicios = archivo["inicios"]
+            indice.completos = archivo["completos"]
+            indice.retenciones = archivo["retenciones"]
+            indice.mascaras = archivo["mascaras"]
+        return indice
+
+    def mascara(self, nombres):
+        """
+        Máscara (1 x palabras) de un conjunto de columnas por nombre.
+
+        Raises:
+            KeyError: Si algún nombre no es una columna del índice.
+        """
+        posiciones = {col: i for i, col in enumerate(self.columnas)}
+        indices = np.array([[posiciones[str(nombre)] for nombre in nombres]], dtype=np.intp).reshape(1, -1)
+        return mascaras_combinaciones(indices, len(self.columnas))
+
+    def nombres(self, mascara):
+        """Tupla de nombres de columna de una máscara, en el orden de las columnas."""
+        bits = np.unpackbits(np.ascontiguousarray(mascara, dtype='<u8').view(np.uint8), bitorder='little')
+        return tuple(self.columnas[i] for i in np.flatnonzero(bits[:len(self.columnas)]))
+
+    def completo(self, k):
+        """True si se registraron todas las combinaciones de tamaño k."""
+        posicion = np.flatnonzero(self.k == k)
+        return bool(len(posicion) and self.completos[posicion[0]])
+
+    def consultar(self, k=None, contiene=(), excluye=(), minimo=None, limite=None):
+        """
+        Combinaciones registradas que cumplen todas las condiciones, sin
+        volver a puntuar nada.
+
+        Args:
+            k (int): Tamaño de las combinaciones (None = todos los registrados).
+            contiene (list): Columnas que deben estar todas.
+            excluye (list): Columnas que no deben estar.
+            minimo (float): Retención mínima (proporción de 0 a 1).
+            limite (int): Máximo de resultados por k (None = todos).
+
+        Returns:
+            list: [(k, retención, tupla de nombres)], por k y dentro de cada k
+            de mayor a menor retención.
+
+        Raises:
+            KeyError: Si alguna columna de 'contiene' o 'excluye' no existe.
+        """
+        requerida = self.mascara(contiene)
+        prohibida = self.mascara(excluye)
+        resultados = []
+        for posicion, tamano in enumerate(self.k):
+            if k is not None and tamano != k:
+                continue
+            inicio, fin = int(self.inicios[posicion]), int(self.inicios[posicion + 1])
+            if minimo is not None:
+                # Retenciones de mayor a menor: las que alcanzan el mínimo son un prefijo
+                fin = inicio + int(np.searchsorted(-self.retenciones[inicio:fin], -minimo, side='right'))
+            mascaras = self.mascaras[inicio:fin]
+            cumplen = ((mascaras & requerida) == requerida).all(axis=1) & ((mascaras & prohibida) == 0).all(axis=1)
+            for i in np.flatnonzero(cumplen)[:limite]:
+                resultados.append((int(tamano), float(self.retenciones[inicio + i]), self.nombres(mascaras[i])))
+        return resultados
+
+
+def formatear_consulta(indice, resultados, k=None):
+    """
+    Resultado de IndiceCombinaciones.consultar como texto, con un aviso por
+    cada k consultado que no tiene todas sus combinaciones.
+    """
+    retenidos = "PC1" if indice.n_componentes == 1 else f"PC1 a PC{indice.n_componentes}"
+    lineas = [f"{len(resultados)} combinaciones (retención de {retenidos}):"]
+    for tamano, retencion_k, nombres in resultados:
+        lineas.append(f"  k={tamano}  {retencion_k * 100:6.2f}%  {', '.join(nombres)}")
+    consultados = [int(t) for t in indice.k if k is None or t == k]
+    if len(indice.k) == 0:
+        lineas.append("El índice está vacío: solo la enumeración de los modos exactos registra combinaciones.")
+    elif k is not None and not consultados:
+        lineas.append(f"El índice no tiene combinaciones de {k} variables.")
+    for tamano in consultados:
+        if not indice.completo(tamano):
+            lineas.append(f"Aviso: para k={tamano} solo se registraron algunas combinaciones "
+                          f"(ramificación, modo aproximado o límite del índice); el resultado puede no ser exacto.")
+    return "\n".join(lineas)
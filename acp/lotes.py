@@ -0,0 +1,321 @@
+"""
+Procesamiento por lotes: el análisis y la búsqueda de combinaciones de
+muchos archivos a la vez, sin ventana.
+
+Cada archivo de una carpeta o patrón glob se procesa en un proceso del pool
+con la misma regla de selección de columnas y deja, en la carpeta de
+salida, su Reporte_No_<n>_<archivo>.txt (análisis y combinaciones) y sus
+componentes como <archivo>_ACP_<k>Variables (ver nombres_de_salida si dos
+archivos del lote se llaman igual). Un error en un archivo queda
+registrado en su resultado y no detiene a los demás. Al final se escribe un
+índice CSV con una fila por archivo.
+"""
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+from .cache import CacheDisco
+from .carga import MOTOR_CSV, FuenteDatos
+from .incremental import analizar_pca_por_bloques, exportar_componentes_por_bloques, usar_por_bloques
+from .motor import (
+    CARPETA_REPORTES,
+    analizar_pca,
+    buscar_combinaciones_archivo,
+    exportar_componentes,
+    formatear_informe_combinaciones,
+    guardar_informe,
+    lineas_analisis,
+    nombre_base,
+    nombre_exportacion,
+)
+from .parametros import ANCHO_HAZ, MAX_K_COMBINACIONES, TOP_N_COMBINACIONES
+from .seleccion import columnas_por_defecto, compilar_filtro
+
+EXTENSIONES_LOTE = (".csv", ".xlsx", ".xls") # Archivos que se toman de una carpeta
+NOMBRE_INDICE = "Indice_Lote.csv" # Resumen del lote, en la carpeta de salida
+COLUMNAS_INDICE = ("archivo", "estado", "filas_originales", "filas_limpias", "variables", "componentes",
+                   "retencion", "mejor_combinacion", "informe", "exportacion", "segundos", "error")
+
+
+@dataclass
+class OpcionesLote:
+    """
+    Lo que se hace con cada archivo del lote.
+
+    La regla de columnas es la de la línea de comandos: 'columnas' (si se
+    da, todas deben existir en cada archivo) o, si no, las de
+    columnas_por_defecto; 'patron' deja solo las que coinciden (subcadena o,
+    con 'regex', expresión regular, sin distinguir mayúsculas).
+    """
+    carpeta_salida: str = CARPETA_REPORTES
+    formato: str = ".xlsx" # Extensión de la exportación (ver FORMATOS_EXPORTACION)
+    columnas: tuple = None
+    patron: str = None
+    regex: bool = False
+    n_componentes: int = 1
+    modo: str = "automatico"
+    max_k: int = MAX_K_COMBINACIONES
+    n_mejores: int = TOP_N_COMBINACIONES
+    ancho_haz: int = ANCHO_HAZ
+    precision: str = "float64"
+    motor_csv: str = MOTOR_CSV
+    usar_cache: bool = True
+
+
+@dataclass
+class ResultadoArchivo:
+    """Resultado de un archivo del lote (estado "completado" o "error")."""
+    ruta: str
+    estado: str = "completado"
+    filas_originales: int = 0
+    filas_limpias: int = 0
+    columnas: list = field(default_factory=list)
+    n_componentes: int = 0
+    retencion: float = None # % retenido por los primeros n_componentes
+    mejor_combinacion: tuple = None # (retención, nombres) del mayor k buscado
+    informe: str = None
+    exportacion: str = None
+    segundos: float = 0.0
+    error: str = None
+
+
+def archivos_del_lote(entrada):
+    """
+    Archivos a procesar, ordenados: los CSV y Excel de una carpeta (sin
+    subcarpetas), los que coinciden con un patrón glob ('**' incluye
+    subcarpetas) o un único archivo.
+
+    Returns:
+        list: Rutas de los archivos.
+    """
+    if os.path.isdir(entrada):
+        rutas = [os.path.join(entrada, nombre) for nombre in os.listdir(entrada)]
+    elif glob.has_magic(entrada):
+        rutas = glob.glob(entrada, recursive=True)
+    else:
+        return [entrada]
+    return sorted(ruta for ruta in rutas
+                  if os.path.isfile(ruta) and os.path.splitext(ruta)[1].lower() in EXTENSIONES_LOTE)
+
+
+def nombres_de_salida(archivos):
+    """
+    Nombre base de las salidas de cada archivo del lote, sin repetidos: el
+    nombre del archivo sin extensión o, si otro archivo del lote tiene el
+    mismo, su ruta relativa a la carpeta común con '_' en lugar de los
+    separadores (y, si aún se repite, un sufijo _2, _3...).
+
+    Returns:
+        list: Un nombre por archivo, en el orden de 'archivos'.
+    """
+    bases = [nombre_base(ruta, "datos") for ruta in archivos]
+    repetidas = {base for base in bases if bases.count(base) > 1}
+    carpetas = [os.path.dirname(os.path.abspath(ruta)) for ruta in archivos]
+    raiz = os.path.commonpath(carpetas) if carpetas else ""
+    nombres, usados = [], set()
+    for ruta, base in zip(archivos, bases):
+        nombre = base
+        if base in repetidas:
+            relativa = os.path.relpath(os.path.abspath(ruta), raiz)
+            nombre = relativa.replace(os.sep, "_").replace(".", "_")
+        candidato, n = nombre, 1
+        while candidato in usados:
+            n += 1
+            candidato = f"{nombre}_{n}"
+        usados.add(candidato)
+        nombres.append(candidato)
+    return nombres
+
+
+def columnas_del_archivo(fuente_datos, opciones):
+    """
+    Aplica la regla de columnas de 'opciones' a un archivo.
+
+    Raises:
+        KeyError: Si falta alguna de opciones.columnas.
+        ValueError: Si la regla no deja ninguna variable.
+    """
+    if opciones.columnas:
+        columnas = list(opciones.columnas)
+        for col in columnas:
+            if col not in fuente_datos.columnas:
+                raise KeyError(col)
+    else:
+        columnas = columnas_por_defecto(fuente_datos.columnas, fuente_datos.numericas)
+    if opciones.patron:
+        coincide = compilar_filtro(opciones.patron, opciones.regex)
+        columnas = [col for col in columnas if coincide(str(col))]
+    if not columnas:
+        raise ValueError("no hay variables para analizar")
+    return columnas
+
+
+def procesar_archivo(ruta, opciones, nombre=None):
+    """
+    Analiza un archivo, busca sus mejores combinaciones y escribe su informe y
+    su exportación en opciones.carpeta_salida. Nunca lanza: un error queda en
+    el resultado (con lo que se haya escrito hasta ese momento).
+
+    Args:
+        ruta (str): Archivo a procesar.
+        opciones (OpcionesLote): Qué hacer con él.
+        nombre (str): Nombre base de sus salidas (ver nombres_de_salida);
+            None = el del archivo.
+
+    Returns:
+        ResultadoArchivo
+    """
+    inicio = time.perf_counter()
+    resultado_archivo = ResultadoArchivo(ruta=ruta)
+    # nombre_exportacion y guardar_informe solo toman el nombre de esta ruta, sin carpeta ni extensión
+    ruta_salida = (nombre or nombre_base(ruta, "datos")) + os.path.splitext(ruta)[1]
+    try:
+        fuente = FuenteDatos(ruta)
+        columnas = columnas_del_archivo(fuente, opciones)
+        resultado_archivo.columnas = columnas
+
+        por_bloques = usar_por_bloques(fuente)
+        if por_bloques:
+            resultado = analizar_pca_por_bloques(fuente, columnas)
+        else:
+            datos = fuente.cargar(columnas, motor_csv=opciones.motor_csv, precision=opciones.precision)
+            resultado = analizar_pca(datos, columnas, n_componentes=max(1, opciones.n_componentes),
+                                     precision=opciones.precision)
+        resultado_archivo.filas_originales = resultado.filas_originales
+        resultado_archivo.filas_limpias = resultado.filas_limpias
+        if resultado.filas_limpias < 2:
+            # Con una sola fila no hay varianza: el análisis saldría lleno de NaN
+            raise ValueError(f"quedan {resultado.filas_limpias} filas después de quitar las que tienen faltantes "
+                             f"(hacen falta al menos 2)")
+
+        n_componentes = min(max(1, opciones.n_componentes), resultado.n_componentes)
+        resultado_archivo.n_componentes = n_componentes
+        resultado_archivo.retencion = resultado.retencion(n_componentes)[0]
+        partes = ["".join(linea[0] for linea in lineas_analisis(resultado, n_componentes))]
+
+        os.makedirs(opciones.carpeta_salida, exist_ok=True)
+        salida = os.path.join(opciones.carpeta_salida, nombre_exportacion(ruta_salida, len(columnas)) + opciones.formato)
+        if por_bloques:
+            exportar_componentes_por_bloques(fuente, resultado.modelo, salida)
+        else:
+            exportar_componentes(resultado.datos_transformados, salida)
+        resultado_archivo.exportacion = salida
+        del resultado
+
+        if len(columnas) >= 2:
+            # Un solo proceso por búsqueda: el paralelismo del lote ya es entre archivos
+            combinaciones = buscar_combinaciones_archivo(
+                fuente, columnas, opciones.modo, opciones.max_k, max(1, opciones.ancho_haz), 1,
+                max(1, opciones.n_mejores), cache_disco=CacheDisco() if opciones.usar_cache else None,
+                motor_csv=opciones.motor_csv, n_componentes=n_componentes)
+            partes.append(formatear_informe_combinaciones(combinaciones))
+            if combinaciones.resultados:
+                resultado_archivo.mejor_combinacion = combinaciones.resultados[-1].mejores[0]
+        resultado_archivo.informe = guardar_informe("\n\n".join(partes), ruta_salida, opciones.carpeta_salida)
+    except Exception as e:
+        resultado_archivo.estado = "error"
+        resultado_archivo.error = f"{type(e).__name__}: {e}"
+    resultado_archivo.segundos = time.perf_counter() - inicio
+    return resultado_archivo
+
+
+def procesar_lote(archivos, opciones, procesos=1, al_terminar_archivo=None):
+    """
+    Procesa 'archivos' con procesar_archivo, repartidos entre 'procesos'
+    procesos (con 1, en este mismo proceso), y escribe el índice del lote.
+
+    Args:
+        archivos (list): Rutas (ver archivos_del_lote).
+        opciones (OpcionesLote): Qué hacer con cada archivo.
+        procesos (int): Archivos procesados a la vez.
+        al_terminar_archivo (callable): Opcional; recibe cada ResultadoArchivo
+            en cuanto está listo (en el orden en que terminan).
+
+    Returns:
+        tuple: ([ResultadoArchivo] en el orden de 'archivos', segundos totales,
+                ruta del índice)
+    """
+    inicio = time.perf_counter()
+    resultados = [None] * len(archivos)
+    nombres = nombres_de_salida(archivos)
+
+    def terminar(i, resultado_archivo):
+        resultados[i] = resultado_archivo
+        if al_terminar_archivo:
+            al_terminar_archivo(resultado_archivo)
+
+    procesos = max(1, min(procesos, len(archivos)))
+    if procesos == 1:
+        for i, ruta in enumerate(archivos):
+            terminar(i, procesar_archivo(ruta, opciones, nombres[i]))
+    else:
+        pendientes = []
+        with ProcessPoolExecutor(max_workers=procesos) as executor:
+            futuros = {executor.submit(procesar_archivo, ruta, opciones, nombres[i]): i for i, ruta in enumerate(archivos)}
+            try:
+                for futuro in as_completed(futuros):
+                    try:
+                        terminar(futuros[futuro], futuro.result())
+                    except BrokenProcessPool:
+                        # Un trabajador murió (memoria agotada, señal) y con él todo el pool
+                        pendientes.append(futuros[futuro])
+            except BaseException:
+                for futuro in futuros:
+                    futuro.cancel()
+                raise
+        for i in sorted(pendientes):
+            # Cada pendiente se reintenta en su propio proceso: el que rompió el pool no arrastra a los demás
+            terminar(i, _procesar_aislado(archivos[i], opciones, nombres[i]))
+    segundos = time.perf_counter() - inicio
+    return resultados, segundos, escribir_indice(resultados, opciones.carpeta_salida)
+
+
+def _procesar_aislado(ruta, opciones, nombre):
+    """procesar_archivo en un proceso nuevo; si el proceso muere, el archivo queda con error."""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(procesar_archivo, ruta, opciones, nombre).result()
+        except BrokenProcessPool as e:
+            return ResultadoArchivo(ruta=ruta, estado="error", error=f"el proceso terminó de forma anormal ({e})")
+
+
+def escribir_indice(resultados, carpeta, nombre=NOMBRE_INDICE):
+    """
+    Escribe el índice del lote (una fila por archivo, ver COLUMNAS_INDICE)
+    como CSV en 'carpeta'.
+
+    Returns:
+        str: Ruta del índice.
+
+    Raises:
+        OSError: Si no se puede escribir.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, nombre)
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUMNAS_INDICE)
+        for r in resultados:
+            mejor = "" if r.mejor_combinacion is None else \
+                f"{r.mejor_combinacion[0] * 100:.2f}% - {', '.join(r.mejor_combinacion[1])}"
+            escritor.writerow([r.ruta, r.estado, r.filas_originales, r.filas_limpias, len(r.columnas),
+                               r.n_componentes, "" if r.retencion is None else f"{r.retencion:.2f}", mejor,
+                               r.informe or "", r.exportacion or "", f"{r.segundos:.3f}", r.error or ""])
+    return ruta
+
+
+def formatear_resumen_lote(resultados, segundos):
+    """Resumen del lote: archivos completados y con error, y archivos y filas por segundo."""
+    completados = [r for r in resultados if r.estado == "completado"]
+    filas = sum(r.filas_originales for r in completados)
+    por_segundo = 1 / segundos if segundos > 0 else 0.0
+    lineas = [f"Lote: {len(completados)} de {len(resultados)} archivos completados en {segundos:.2f} s "
+              f"({len(resultados) * por_segundo:.2f} archivos/s, {filas * por_segundo:,.0f} filas/s)."]
+    for r in resultados:
+        if r.estado != "completado":
+            lineas.append(f"  Error en {r.ruta}: {r.error}")
+    return "\n".join(lineas)
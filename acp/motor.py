@@ -0,0 +1,748 @@
+"""
+Flujo completo del análisis sin interfaz gráfica: carga, limpieza, PCA,
+retención, búsqueda de combinaciones, informes y exportación.
+
+La ventana (AppPCA) y la línea de comandos (python -m acp) usan estas mismas
+funciones; aquí no se importa tkinter.
+"""
+import os
+import tempfile
+from math import comb
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+from .cache import huella_datos
+from .carga import MOTOR_CSV
+from .combinaciones import buscar_mejores_combinaciones, elegir_modo_automatico, matriz_correlacion
+from .exportacion import bloques_de_arreglo, escribir_componentes
+from .indice import EXTENSION_INDICE, IndiceCombinaciones
+from .parametros import (ANCHO_HAZ, MAX_K_COMBINACIONES, METODOS_EXACTOS, MODOS_EXACTOS, PROCESOS_POR_DEFECTO,
+                         TOP_N_COMBINACIONES)
+from .resolutores import RESOLUTORES, resolver_pca
+
+CARPETA_REPORTES = "Mejores Combinaciones"
+MAX_VARIABLES_MATRIZ_TEXTO = 50 # Matrices más anchas no se escriben en el informe (p² celdas de texto)
+FILAS_MUESTRA_PRECISION = 1000 # Filas recalculadas en float64 para informar el error de float32
+ELEMENTOS_POR_BLOQUE = 2 ** 20 # Celdas por bloque de filas al limpiar, estandarizar y proyectar (8 MB en float64)
+
+
+@dataclass
+class ResultadoPCA:
+    """Resultado de analizar_pca. Si no quedan filas válidas solo trae los conteos."""
+    columnas: list
+    filas_originales: int
+    filas_limpias: int
+    matriz_covarianza: pd.DataFrame = None
+    datos_transformados: np.ndarray = None
+    n_componentes: int = 0
+    varianza_explicada: np.ndarray = None
+    matriz_covarianza_pca: pd.DataFrame = None
+    modelo: object = None # ModeloPCA si se analizó por bloques (datos_transformados queda en None)
+    resolutor: str = None # Clave de RESOLUTORES usada para los componentes
+    segundos_resolutor: float = 0.0
+    componentes_truncados: bool = False # True si solo se calcularon los componentes pedidos
+    desde_cache: bool = False
+    precision: str = "float64" # dtype de los datos estandarizados y de datos_transformados
+    en_disco: bool = False # True si datos_transformados es un np.memmap sobre un archivo temporal
+    error_precision: tuple = None # (error en la varianza explicada, error relativo de los componentes) de float32
+    arreglos_completos: int = 0 # Arreglos del tamaño de los datos que reservó el análisis
+
+    def sirve_para(self, n_componentes):
+        """True si este resultado alcanza para retener n_componentes (None = todos)."""
+        if not self.componentes_truncados:
+            return True
+        return n_componentes is not None and n_componentes <= self.n_componentes
+
+    @property
+    def filas_eliminadas(self):
+        return self.filas_originales - self.filas_limpias
+
+    def retencion(self, n_componentes):
+        """(% retenido, % perdido) al quedarse con los primeros n_componentes."""
+        return retencion(self.varianza_explicada, n_componentes)
+
+
+@dataclass
+class ResultadoK:
+    """Mejores subconjuntos de tamaño k: mejores = [(retención, tupla de nombres)]."""
+    k: int
+    mejores: list
+    evaluaciones: int
+    metodo: str
+
+
+@dataclass
+class ResultadoCombinaciones:
+    """Resultado de buscar_combinaciones, con un ResultadoK por cada tamaño."""
+    columnas: list
+    modo: str
+    modo_solicitado: str
+    resultados: list = field(default_factory=list)
+    evaluaciones_totales: int = None
+    desde_cache: bool = False
+    n_componentes: int = 1 # Componentes cuya retención se maximizó
+    indice: IndiceCombinaciones = None # Todas las combinaciones puntuadas, si se pidió registrar_indice
+
+
+# --- Limpieza ---
+
+def arreglo_de_trabajo(forma, dtype=np.float64, en_disco=False, carpeta=None):
+    """
+    Arreglo sin inicializar para datos grandes: en memoria, o un np.memmap
+    sobre un archivo temporal de 'carpeta' (None = la carpeta temporal del
+    sistema) que el sistema borra al liberar el arreglo.
+    """
+    if not en_disco or 0 in forma:
+        return np.empty(forma, dtype=dtype)
+    with tempfile.TemporaryFile(dir=carpeta, prefix="acp_") as archivo:
+        # El mapeo conserva su propio descriptor: el archivo sigue vivo mientras exista el arreglo
+        return np.memmap(archivo, dtype=dtype, mode="w+", shape=forma)
+
+
+def filas_por_bloque(columnas):
+    """Filas de cada bloque para que tenga unas ELEMENTOS_POR_BLOQUE celdas con 'columnas' columnas."""
+    return max(1, ELEMENTOS_POR_BLOQUE // max(columnas, 1))
+
+
+def matriz_limpia(data_raw, selected_columns, dtype=np.float64, en_disco=False, carpeta=None, filas=None):
+    """
+    Las columnas seleccionadas como un único arreglo numérico contiguo, sin
+    las filas con faltantes, en una sola pasada por bloques de filas.
+
+    Cada bloque se convierte a float64 (pd.to_numeric solo en las columnas
+    no numéricas), se le quitan las filas con NaN con una sola máscara, se
+    acumulan su media y co-momentos y se copia a su lugar definitivo. El
+    único arreglo de tamaño completo es el resultado (ver arreglo_de_trabajo);
+    si se descartan filas, su parte final queda sin usar.
+
+    Args:
+        data_raw (DataFrame): Datos tal como se cargaron.
+        selected_columns (list): Columnas a limpiar.
+        dtype: dtype del resultado ("float64" o "float32").
+        en_disco (bool): Resultado en un archivo temporal mapeado en memoria.
+        carpeta (str): Carpeta del archivo temporal (None = la del sistema).
+        filas (int): Filas convertidas a la vez (None = filas_por_bloque).
+
+    Returns:
+        tuple: (ndarray filas limpias x columnas, filas antes de limpiar,
+                EstadisticasIncrementales de las filas limpias, en float64)
+
+    Raises:
+        KeyError: Si alguna columna seleccionada no existe (o es 'Unnamed').
+    """
+    from .incremental import EstadisticasIncrementales # incremental importa este módulo
+
+    columnas = list(selected_columns)
+    for col in columnas:
+        # Las columnas 'Unnamed' no se analizan nunca
+        if str(col).startswith("Unnamed"):
+            raise KeyError(col)
+    series = [data_raw[col] for col in columnas]
+    numericas = [pd.api.types.is_numeric_dtype(serie) for serie in series]
+
+    n, p = len(data_raw), len(columnas)
+    paso = filas or filas_por_bloque(p)
+    matriz = arreglo_de_trabajo((n, p), dtype, en_disco, carpeta)
+    bloque = np.empty((min(paso, n), p))
+    estadisticas = EstadisticasIncrementales(p)
+    limpias = 0
+    for inicio in range(0, n, paso):
+        actual = bloque[:min(paso, n - inicio)]
+        for j, serie in enumerate(series):
+            parte = serie.iloc[inicio:inicio + len(actual)]
+            if not numericas[j]:
+                parte = pd.to_numeric(parte, errors='coerce')
+            actual[:, j] = parte.to_numpy(dtype=np.float64, na_value=np.nan)
+        completas = ~np.isnan(actual).any(axis=1)
+        validas = actual if completas.all() else actual[completas]
+        estadisticas.agregar(validas)
+        matriz[limpias:limpias + len(validas)] = validas
+        limpias += len(validas)
+    return matriz[:limpias], n, estadisticas
+
+
+def limpiar_datos(data_raw, selected_columns, etapa=None):
+    """
+    Convierte las columnas seleccionadas a numérico y elimina las filas con
+    faltantes (ver matriz_limpia).
+
+    Args:
+        data_raw (DataFrame): Datos tal como se cargaron.
+        selected_columns (list): Columnas a limpiar.
+        etapa (callable): Opcional; recibe el nombre del paso al empezarlo.
+
+    Returns:
+        tuple: (DataFrame numérico limpio, filas antes de limpiar)
+
+    Raises:
+        KeyError: Si alguna columna seleccionada no existe.
+    """
+    if etapa:
+        etapa("Limpiando datos...")
+    matriz, rows_before_drop, _ = matriz_limpia(data_raw, selected_columns)
+    return pd.DataFrame(matriz, columns=list(selected_columns), copy=False), rows_before_drop
+
+
+# --- PCA y retención ---
+
+def _estadisticas_por_bloques(datos):
+    """EstadisticasIncrementales de un ndarray sin NaN, pasando a float64 un bloque a la vez."""
+    from .incremental import EstadisticasIncrementales # incremental importa este módulo
+
+    estadisticas = EstadisticasIncrementales(datos.shape[1])
+    for bloque in bloques_de_arreglo(datos, filas_por_bloque(datos.shape[1])):
+        estadisticas.agregar(np.asarray(bloque, dtype=np.float64))
+    return estadisticas
+
+
+def error_precision(muestra, resultado, componentes, media, escala):
+    """
+    Cuánto se aleja un análisis en float32 de hacer las mismas cuentas en
+    float64 con los mismos datos.
+
+    La varianza explicada de referencia sale de los valores propios de la
+    matriz de correlación (derivada de resultado.matriz_covarianza, que ya
+    está en float64); los componentes de las filas de 'muestra' (las
+    primeras filas limpias, sin estandarizar) se recalculan en float64 con
+    las cargas 'componentes'.
+
+    Returns:
+        tuple: (diferencia máxima en la proporción de varianza explicada,
+                diferencia máxima de los componentes relativa a su mayor valor absoluto)
+    """
+    cov = resultado.matriz_covarianza.to_numpy()
+    desvios = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    utiles = desvios > 0 # Las columnas constantes quedan en cero al estandarizar
+    corr = cov[np.ix_(utiles, utiles)] / np.outer(desvios[utiles], desvios[utiles])
+    valores = np.clip(np.linalg.eigvalsh(corr)[::-1], 0.0, None)
+    referencia = np.zeros(len(resultado.varianza_explicada))
+    if valores.sum() > 0:
+        comunes = min(len(valores), len(referencia))
+        referencia[:comunes] = valores[:comunes] / valores.sum()
+    error_varianza = float(np.max(np.abs(resultado.varianza_explicada - referencia), initial=0.0))
+
+    esperado = ((muestra - media) / escala) @ componentes.T
+    obtenido = np.asarray(resultado.datos_transformados[:len(muestra)], dtype=np.float64)
+    maximo = max(float(np.max(np.abs(esperado), initial=0.0)), np.finfo(np.float64).tiny)
+    return error_varianza, float(np.max(np.abs(obtenido - esperado), initial=0.0)) / maximo
+
+
+def analizar_pca(data_raw, selected_columns, etapa=None, progreso=None, n_componentes=None,
+                 resolutor="automatico", cache=None, precision="float64", en_disco=False, carpeta_disco=None):
+    """
+    Limpieza, matriz de covarianza, estandarización y PCA.
+
+    Los datos limpios se estandarizan en el sitio, así que solo se reservan
+    dos arreglos del tamaño de los datos: la matriz limpia (matriz_limpia) y
+    los componentes (ResultadoPCA.arreglos_completos los cuenta). La
+    covarianza original sale de la misma pasada que la limpieza.
+
+    Args:
+        data_raw (DataFrame): Datos tal como se cargaron.
+        selected_columns (list): Columnas a analizar.
+        etapa (callable): Opcional; recibe el nombre de cada etapa al empezarla.
+        progreso (callable): Opcional; se llama al terminar cada etapa (puede
+            lanzar BusquedaCancelada para detener el análisis).
+        n_componentes (int): Componentes que se van a retener; con pocos
+            componentes y datos grandes el modo automático solo calcula esos
+            (SVD aleatorizada). None = todos.
+        resolutor (str): "automatico" o una clave de RESOLUTORES (ver
+            acp.resolutores).
+        cache (CacheLRU): Opcional; si ya se analizó el mismo contenido se
+            devuelve el resultado guardado (con desde_cache=True).
+        precision (str): "float64" o "float32" (ver PRECISIONES) para los
+            datos estandarizados y los componentes. En float32 se informa
+            el error frente a float64 (ResultadoPCA.error_precision).
+        en_disco (bool): Si es True, los datos estandarizados y los
+            componentes van a archivos temporales mapeados en memoria, en
+            'carpeta_disco' (None = la carpeta temporal del sistema).
+
+    Returns:
+        ResultadoPCA
+    """
+    def avisar(nombre):
+        if etapa:
+            etapa(nombre)
+
+    def avanzar():
+        if progreso:
+            progreso()
+
+    clave = None
+    if cache is not None:
+        # El almacenamiento es parte del resultado: con otro en_disco o carpeta se vuelve a analizar
+        clave = huella_datos(data_raw, selected_columns, resolutor, precision, en_disco,
+                             carpeta_disco if en_disco else None)
+        guardado = cache.obtener(clave)
+        if guardado is not None and guardado.sirve_para(n_componentes):
+            return replace(guardado, desde_cache=True)
+
+    # --- 1. Limpieza de Datos (conversión a numérico y filas con faltantes) ---
+    avisar("Limpiando datos...")
+    data_scaled, original_rows, estadisticas = matriz_limpia(data_raw, selected_columns, precision,
+                                                             en_disco, carpeta_disco)
+    avanzar()
+    resultado = ResultadoPCA(columnas=list(selected_columns),
+                             filas_originales=original_rows,
+                             filas_limpias=len(data_scaled),
+                             precision=precision,
+                             en_disco=en_disco,
+                             arreglos_completos=1)
+    if resultado.filas_limpias == 0 or len(resultado.columnas) == 0:
+        return resultado
+
+    # --- 2. Matriz de Varianza-Covarianza (Datos Originales) ---
+    avisar("Calculando matriz de covarianza...")
+    resultado.matriz_covarianza = pd.DataFrame(estadisticas.covarianza(), columns=resultado.columnas,
+                                               index=resultado.columnas)
+    avanzar()
+
+    # --- 3. Estandarización (en el sitio) ---
+    avisar("Estandarizando...")
+    # Como StandardScaler: desviación poblacional y escala 1 en las columnas constantes
+    media = estadisticas.media
+    escala = np.sqrt(np.diag(estadisticas.comomentos) / estadisticas.n)
+    escala[escala == 0] = 1.0
+    muestra = np.array(data_scaled[:FILAS_MUESTRA_PRECISION], dtype=np.float64) if precision != "float64" else None
+    media_dtype, escala_dtype = media.astype(precision), escala.astype(precision)
+    for bloque in bloques_de_arreglo(data_scaled, filas_por_bloque(len(resultado.columnas))):
+        bloque -= media_dtype
+        bloque /= escala_dtype
+    avanzar()
+
+    # --- 4. Análisis de Componentes Principales (PCA) ---
+    avisar("Ajustando PCA...")
+    # Sin truncar se calculan min(n_muestras, n_variables) componentes, como PCA()
+    pca = resolver_pca(data_scaled, n_componentes, resolutor)
+    resultado.datos_transformados = arreglo_de_trabajo((len(data_scaled), len(pca.componentes)), precision,
+                                                       en_disco, carpeta_disco)
+    resultado.arreglos_completos += 1
+    componentes = pca.componentes.T.astype(precision)
+    paso = filas_por_bloque(len(resultado.columnas))
+    for inicio in range(0, len(data_scaled), paso):
+        np.matmul(data_scaled[inicio:inicio + paso], componentes, out=resultado.datos_transformados[inicio:inicio + paso])
+    del data_scaled # Libera los datos estandarizados (y su archivo temporal) antes de seguir
+    resultado.n_componentes = len(pca.componentes)
+    resultado.varianza_explicada = pca.proporciones
+    resultado.resolutor = pca.nombre
+    resultado.segundos_resolutor = pca.segundos
+    resultado.componentes_truncados = resultado.n_componentes < min(resultado.filas_limpias, len(resultado.columnas))
+    if muestra is not None:
+        resultado.error_precision = error_precision(muestra, resultado, pca.componentes, media, escala)
+    avanzar()
+
+    # --- 5. Matriz de Covarianza de PCA ---
+    avisar("Calculando covarianza de los componentes...")
+    pca_cov_matrix = _estadisticas_por_bloques(resultado.datos_transformados).covarianza()
+    pc_names = [f"PC{i+1}" for i in range(resultado.n_componentes)]
+    resultado.matriz_covarianza_pca = pd.DataFrame(pca_cov_matrix, columns=pc_names, index=pc_names)
+    if cache is not None:
+        cache.guardar(clave, resultado)
+    return resultado
+
+
+def retencion(explained_variance, n_componentes):
+    """(% de varianza retenida, % perdida) por los primeros n_componentes."""
+    info_kept = np.sum(explained_variance[:n_componentes]) * 100
+    return info_kept, 100.0 - info_kept
+
+
+def lineas_analisis(resultado, n_componentes, con_reduccion=True):
+    """
+    Texto del análisis como lista de tuplas (texto,) o (texto, etiqueta), con
+    las mismas etiquetas de estilo que usa el panel de resultados. Con
+    con_reduccion=False se omite la sección 4 (ver lineas_reduccion).
+    """
+    lineas = [(f"Se cargaron {resultado.filas_originales} filas (para estas variables).\n",)]
+    if resultado.filas_eliminadas > 0:
+        lineas.append((f"Se eliminaron {resultado.filas_eliminadas} filas con datos faltantes o no numéricos.\n", 'warning'))
+    if resultado.filas_limpias == 0:
+        lineas.append(("ERROR: No hay datos válidos para analizar.\n",))
+        return lineas
+
+    lineas.append((f"Analizando {resultado.filas_limpias} filas y {len(resultado.columnas)} variables:\n",))
+    lineas.append((", ".join(resultado.columnas) + "\n\n",))
+
+    lineas.append(("--- 1. Matriz de varianza-covarianza (Datos originales) ---\n", 'title'))
+    lineas.append(_texto_matriz(resultado.matriz_covarianza, "Ver matriz (Original)"))
+
+    lineas.append(("--- 2. Análisis de Componentes Principales (sobre datos estandarizados) ---\n", 'title'))
+    lineas.append(("Varianza explicada por cada componente:\n",))
+    for i, var in enumerate(resultado.varianza_explicada):
+        lineas.append((f"  Componente principal {i+1}: {var*100:6.2f}%\n",))
+    if resultado.resolutor:
+        truncado = f", solo los primeros {resultado.n_componentes}" if resultado.componentes_truncados else ""
+        origen = ", desde caché" if resultado.desde_cache else ""
+        lineas.append((f"Resolutor: {RESOLUTORES[resultado.resolutor]}{truncado} ({resultado.segundos_resolutor:.3f} s{origen})\n", 'info'))
+    if resultado.error_precision is not None:
+        error_varianza, error_componentes = resultado.error_precision
+        lineas.append((f"Precisión {resultado.precision}: diferencia máxima con float64 de {error_varianza * 100:.1e} puntos "
+                       f"porcentuales en la varianza explicada y {error_componentes:.1e} (relativa) en los componentes.\n", 'info'))
+    if resultado.en_disco:
+        lineas.append(("Datos estandarizados y componentes en archivos temporales mapeados en memoria.\n", 'info'))
+
+    lineas.append(("\n--- 3. Matriz de covarianza (Nuevas variables PCA) ---\n", 'title'))
+    lineas.append(("Esta matriz muestra que las nuevas variables (Componentes Principales) no están correlacionadas entre sí (valores fuera de la diagonal son ~0).\nLa diagonal muestra la varianza de cada componente.\n\n",
+                   'info'))
+    lineas.append(_texto_matriz(resultado.matriz_covarianza_pca, "Ver matriz (PCA)"))
+
+    if con_reduccion:
+        lineas.extend(lineas_reduccion(resultado, n_componentes))
+    return lineas
+
+
+def _texto_matriz(matriz, boton):
+    """La matriz como texto, o un aviso si es demasiado grande para el informe."""
+    if len(matriz.columns) > MAX_VARIABLES_MATRIZ_TEXTO:
+        return (f"(Matriz de {len(matriz.index)} x {len(matriz.columns)}: demasiado grande para el informe; "
+                f"en la ventana se ve con '{boton}'.)\n\n", 'info')
+    return (matriz.to_string(float_format="%.4f") + "\n\n",)
+
+
+def lineas_reduccion(resultado, n_componentes):
+    """
+    Sección 4 del análisis (retención y pérdida con n_componentes), aparte
+    para poder actualizarla sin recalcular el resto.
+    """
+    lineas = [(f"\n--- 4. Resultado de reducción a {n_componentes} Componente(s) (para cálculo) ---\n", 'title')]
+    if resultado.componentes_truncados and n_componentes > resultado.n_componentes:
+        lineas.append((f"\nSolo se calcularon {resultado.n_componentes} componentes: presione 'Analizar Variables' para calcular más.\n", 'warning'))
+        return lineas
+
+    info_kept, info_lost = resultado.retencion(n_componentes)
+    s_comps = "s" if n_componentes > 1 else ""
+    s_pc = f"PC1 a PC{n_componentes}" if n_componentes > 1 else "PC1"
+
+    lineas.append((f"\nPorcentaje de información (varianza) retenida por {s_pc}: \n", 'success'))
+    lineas.append((f"{info_kept:.2f}%\n\n", 'success'))
+    lineas.append((f"Porcentaje de información (varianza) PERDIDA al reducir a {n_componentes} componente{s_comps}: \n", 'warning'))
+    lineas.append((f"{info_lost:.2f}%\n", 'warning'))
+    return lineas
+
+
+# --- Búsqueda de combinaciones ---
+
+def _limpiar_para_combinaciones(data_raw, selected_columns):
+    """Solo las filas completas (la misma limpieza que la búsqueda usó siempre)."""
+    data_clean = data_raw[list(selected_columns)].copy()
+    data_clean = data_clean.select_dtypes(include=[np.number]).dropna()
+    return data_clean[list(selected_columns)]
+
+
+def correlacion_para_combinaciones(data_raw, selected_columns):
+    """
+    Matriz de correlación de las columnas seleccionadas, usando solo las
+    filas completas.
+    """
+    return matriz_correlacion(_limpiar_para_combinaciones(data_raw, selected_columns))
+
+
+def buscar_combinaciones(data_raw, selected_columns, modo="automatico", max_k=MAX_K_COMBINACIONES,
+                         ancho_haz=ANCHO_HAZ, procesos=PROCESOS_POR_DEFECTO, n_mejores=TOP_N_COMBINACIONES,
+                         progreso=None, al_inicio=None, al_resultado=None, corr=None, n_componentes=1,
+                         registrar_indice=False):
+    """
+    Busca los mejores subconjuntos de 2 a max_k variables (ver
+    buscar_mejores_combinaciones) y traduce los índices a nombres de columna.
+
+    Args:
+        data_raw (DataFrame): Datos tal como se cargaron (no se usa si se da corr).
+        selected_columns (list): Variables candidatas (al menos 2).
+        modo (str): "automatico" o uno de los modos de MODOS_BUSQUEDA.
+        max_k, ancho_haz, procesos, n_mejores: Ver buscar_mejores_combinaciones.
+        progreso (callable): Callback de avance del motor.
+        al_inicio (callable): Opcional; recibe el ResultadoCombinaciones (aún
+            vacío) cuando la correlación está lista y el modo decidido.
+        al_resultado (callable): Opcional; recibe cada ResultadoK en cuanto
+            está listo.
+        corr (ndarray): Opcional; matriz de correlación ya calculada.
+        n_componentes (int): Componentes cuya retención se maximiza (1 = PC1).
+        registrar_indice (bool): Si es True, resultado.indice guarda todas las
+            combinaciones puntuadas por enumeración (ver acp.indice), para
+            consultarlas después sin repetir la búsqueda.
+
+    Returns:
+        ResultadoCombinaciones
+    """
+    selected_columns = list(selected_columns)
+    if corr is None:
+        corr = correlacion_para_combinaciones(data_raw, selected_columns)
+
+    modo_elegido = elegir_modo_automatico(len(selected_columns), max_k) if modo == "automatico" else modo
+    resultado = ResultadoCombinaciones(columnas=selected_columns, modo=modo_elegido, modo_solicitado=modo,
+                                       n_componentes=n_componentes)
+    if registrar_indice:
+        resultado.indice = IndiceCombinaciones(selected_columns, n_componentes)
+    if al_inicio:
+        al_inicio(resultado)
+
+    for k, mejores, evaluaciones, metodo in buscar_mejores_combinaciones(
+            corr, max_k, modo_elegido, ancho_haz, procesos, progreso, n_mejores, n_componentes,
+            resultado.indice.agregar if registrar_indice else None):
+        resultado_k = ResultadoK(
+            k=k,
+            mejores=[(retencion_k, tuple(selected_columns[i] for i in indices)) for retencion_k, indices in mejores],
+            evaluaciones=evaluaciones,
+            metodo=metodo)
+        resultado.resultados.append(resultado_k)
+        if metodo not in METODOS_EXACTOS:
+            resultado.evaluaciones_totales = evaluaciones
+        if al_resultado:
+            al_resultado(resultado_k)
+    if registrar_indice:
+        resultado.indice.cerrar()
+    return resultado
+
+
+def buscar_combinaciones_archivo(fuente_datos, selected_columns, modo="automatico", max_k=MAX_K_COMBINACIONES,
+                                 ancho_haz=ANCHO_HAZ, procesos=PROCESOS_POR_DEFECTO, n_mejores=TOP_N_COMBINACIONES,
+                                 progreso=None, al_inicio=None, al_resultado=None, cache_disco=None,
+                                 progreso_lectura=None, motor_csv=MOTOR_CSV, n_componentes=1,
+                                 registrar_indice=False):
+    """
+    buscar_combinaciones leyendo las columnas de 'fuente_datos' solo si hace
+    falta. Con cache_disco (CacheDisco), una búsqueda ya hecha sobre el mismo
+    contenido se devuelve sin leer el archivo (con las mismas llamadas a
+    al_inicio y al_resultado, y desde_cache=True), y una búsqueda nueva sobre
+    columnas ya vistas reutiliza su matriz de correlación guardada. Con
+    registrar_indice la búsqueda se repite siempre (la caché no guarda las
+    combinaciones puntuadas).
+
+    Args:
+        fuente_datos (FuenteDatos): Archivo abierto.
+        progreso_lectura (callable): Opcional; recibe las filas leídas en cada bloque.
+        motor_csv (str): Lector de CSV (ver FuenteDatos.cargar).
+        Los demás: ver buscar_combinaciones.
+
+    Returns:
+        ResultadoCombinaciones
+    """
+    selected_columns = list(selected_columns)
+    if cache_disco is None:
+        data_raw = fuente_datos.cargar(selected_columns, progreso=progreso_lectura, motor_csv=motor_csv)
+        return buscar_combinaciones(data_raw, selected_columns, modo, max_k, ancho_haz, procesos, n_mejores,
+                                    progreso, al_inicio, al_resultado, n_componentes=n_componentes,
+                                    registrar_indice=registrar_indice)
+
+    # procesos no entra en la clave: no cambia el resultado
+    clave_busqueda = cache_disco.clave(fuente_datos.ruta, selected_columns, "busqueda", modo, max_k, ancho_haz, n_mejores,
+                                       n_componentes)
+    guardado = None if registrar_indice else cache_disco.obtener(clave_busqueda)
+    if guardado is not None:
+        return _repetir_busqueda(_combinaciones_desde_arreglos(guardado, selected_columns, modo, n_componentes),
+                                 al_inicio, al_resultado)
+
+    clave_correlacion = cache_disco.clave(fuente_datos.ruta, selected_columns, "correlacion")
+    guardado = cache_disco.obtener(clave_correlacion)
+    if guardado is not None:
+        corr = guardado["correlacion"]
+    else:
+        data_raw = fuente_datos.cargar(selected_columns, progreso=progreso_lectura, motor_csv=motor_csv)
+        valores = _limpiar_para_combinaciones(data_raw, selected_columns).to_numpy(dtype=np.float64)
+        corr = matriz_correlacion(valores)
+        # Estadísticas suficientes de las filas limpias, junto a la correlación
+        media = valores.mean(axis=0) if len(valores) else np.zeros(len(selected_columns))
+        centrados = valores - media
+        cache_disco.guardar(clave_correlacion, n=np.int64(len(valores)), media=media,
+                            comomentos=centrados.T @ centrados, correlacion=corr)
+
+    resultado = buscar_combinaciones(None, selected_columns, modo, max_k, ancho_haz, procesos, n_mejores,
+                                     progreso, al_inicio, al_resultado, corr=corr, n_componentes=n_componentes,
+                                     registrar_indice=registrar_indice)
+    cache_disco.guardar(clave_busqueda, **_combinaciones_a_arreglos(resultado))
+    return resultado
+
+
+def _repetir_busqueda(resultado, al_inicio, al_resultado):
+    """Entrega un resultado guardado por los mismos callbacks que una búsqueda real."""
+    if al_inicio:
+        al_inicio(replace(resultado, resultados=[]))
+    if al_resultado:
+        for resultado_k in resultado.resultados:
+            al_resultado(resultado_k)
+    return resultado
+
+
+def _combinaciones_a_arreglos(resultado):
+    """ResultadoCombinaciones -> arreglos para CacheDisco (nombres como índices, -1 = vacío)."""
+    posiciones = {col: i for i, col in enumerate(resultado.columnas)}
+    n_mejores = max((len(rk.mejores) for rk in resultado.resultados), default=0)
+    max_k = max((rk.k for rk in resultado.resultados), default=0)
+    retenciones = np.full((len(resultado.resultados), n_mejores), np.nan)
+    indices = np.full((len(resultado.resultados), n_mejores, max_k), -1, dtype=np.int64)
+    for i, rk in enumerate(resultado.resultados):
+        for j, (retencion_k, nombres) in enumerate(rk.mejores):
+            retenciones[i, j] = retencion_k
+            indices[i, j, :len(nombres)] = [posiciones[col] for col in nombres]
+    evaluaciones_totales = -1 if resultado.evaluaciones_totales is None else resultado.evaluaciones_totales
+    return {
+        "modo": np.array(resultado.modo),
+        "k": np.array([rk.k for rk in resultado.resultados], dtype=np.int64),
+        "evaluaciones": np.array([rk.evaluaciones for rk in resultado.resultados], dtype=np.int64),
+        "metodos": np.array([rk.metodo for rk in resultado.resultados], dtype=str),
+        "puestos": np.array([len(rk.mejores) for rk in resultado.resultados], dtype=np.int64),
+        "retenciones": retenciones,
+        "indices": indices,
+        "evaluaciones_totales": np.array(evaluaciones_totales, dtype=np.int64),
+    }
+
+
+def _combinaciones_desde_arreglos(arreglos, selected_columns, modo_solicitado, n_componentes=1):
+    """Inversa de _combinaciones_a_arreglos."""
+    evaluaciones_totales = int(arreglos["evaluaciones_totales"])
+    resultado = ResultadoCombinaciones(columnas=list(selected_columns), modo=str(arreglos["modo"]),
+                                       modo_solicitado=modo_solicitado,
+                                       evaluaciones_totales=None if evaluaciones_totales < 0 else evaluaciones_totales,
+                                       desde_cache=True, n_componentes=n_componentes)
+    for i, k in enumerate(arreglos["k"]):
+        puestos = int(arreglos["puestos"][i])
+        mejores = [(float(retencion_k), tuple(selected_columns[j] for j in indices if j >= 0))
+                   for retencion_k, indices in zip(arreglos["retenciones"][i][:puestos], arreglos["indices"][i][:puestos])]
+        resultado.resultados.append(ResultadoK(k=int(k), mejores=mejores, evaluaciones=int(arreglos["evaluaciones"][i]),
+                                               metodo=str(arreglos["metodos"][i])))
+    return resultado
+
+
+def lineas_encabezado_combinaciones(resultado):
+    """Encabezado del informe de combinaciones como tuplas (texto[, etiqueta])."""
+    lineas = [(f"Analizando combinaciones posibles desde {len(resultado.columnas)} variables base...\n",),
+              ("-"*60 + "\n", 'info')]
+    if resultado.n_componentes > 1:
+        lineas.append((f"Objetivo: retención conjunta de PC1 a PC{resultado.n_componentes}.\n", 'info'))
+    if resultado.modo_solicitado == "automatico" and resultado.modo not in MODOS_EXACTOS:
+        lineas.append((f"Demasiadas combinaciones para una búsqueda exacta: usando modo aproximado '{resultado.modo}'.\n", 'info'))
+    return lineas
+
+
+def lineas_resultado_k(resultado_k, n_total, n_componentes=1):
+    """Bloque del informe para un tamaño k como tuplas (texto[, etiqueta])."""
+    best_variance, best_cols = resultado_k.mejores[0]
+    k = resultado_k.k
+    retenidos = "PC1" if n_componentes == 1 else f"PC1 a PC{n_componentes}"
+    lineas = [(f"\nMejores {k} Variables:\n", 'header'),
+              (f"Retención ({retenidos}): {best_variance * 100:.2f}%\n",),
+              (f"Variables: {', '.join(best_cols)}\n", 'var_list')]
+    if len(resultado_k.mejores) > 1:
+        # Siguientes del ranking, para elegir entre casi-empates
+        lineas.append(("Siguientes mejores:\n",))
+        for puesto, (retencion_k, nombres) in enumerate(resultado_k.mejores[1:], start=2):
+            lineas.append((f"  {puesto}. {retencion_k * 100:.2f}% - {', '.join(nombres)}\n", 'info'))
+    if resultado_k.metodo == "ramificacion":
+        lineas.append((f"Óptimo exacto (ramificación y acotamiento): {resultado_k.evaluaciones} evaluaciones de {comb(n_total, k)} combinaciones\n", 'info'))
+    return lineas
+
+
+def lineas_cierre_combinaciones(resultado):
+    """Cierre del informe de combinaciones como tuplas (texto[, etiqueta])."""
+    lineas = []
+    if resultado.evaluaciones_totales is not None:
+        lineas.append((f"\nBúsqueda aproximada ({resultado.modo}): {resultado.evaluaciones_totales} evaluaciones en total.\n", 'info'))
+    lineas.append(("\n" + "="*60 + "\nAnálisis Finalizado.",))
+    return lineas
+
+
+def formatear_informe_combinaciones(resultado):
+    """Informe completo de combinaciones como texto plano (igual al de la ventana)."""
+    lineas = lineas_encabezado_combinaciones(resultado)
+    for resultado_k in resultado.resultados:
+        lineas.extend(lineas_resultado_k(resultado_k, len(resultado.columnas), resultado.n_componentes))
+    lineas.extend(lineas_cierre_combinaciones(resultado))
+    return "".join(linea[0] for linea in lineas)
+
+
+def formatear_progreso(avance, total, segundos):
+    """
+    Texto de avance para la barra de progreso: evaluaciones, velocidad y
+    tiempo restante estimado (si se conoce el total).
+    """
+    velocidad = avance / segundos if segundos > 0 else 0.0
+    texto = f"{avance:,} evaluadas · {velocidad:,.0f} comb/s · {segundos:.1f} s"
+    if total and velocidad > 0 and avance < total:
+        restante = int((total - avance) / velocidad)
+        texto += f" · ETA {restante // 60:02d}:{restante % 60:02d}"
+    return texto
+
+
+# --- Informes y exportación ---
+
+def nombre_base(filepath, fallback):
+    """Nombre del archivo sin carpeta ni extensión (o 'fallback' si no hay ruta)."""
+    if not filepath:
+        return fallback
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+
+def guardar_informe(content, filepath=None, folder_name=CARPETA_REPORTES):
+    """
+    Guarda un informe como Reporte_No_<n>_<archivo>.txt en 'folder_name',
+    numerándolo según los informes que ya existen para ese archivo (con el
+    primer número libre, también entre procesos que guardan a la vez).
+
+    Returns:
+        str: Ruta del informe guardado.
+
+    Raises:
+        OSError: Si no se puede crear la carpeta o escribir el archivo.
+    """
+    os.makedirs(folder_name, exist_ok=True)
+    base_name = nombre_base(filepath, "datos_desconocidos")
+
+    # Informes de este archivo: "Reporte_No_<n>_<nombre base>.txt", con el nombre exacto
+    sufijo = f"_{base_name}.txt"
+    current_files = [f for f in os.listdir(folder_name)
+                     if f.startswith("Reporte_No_") and f.endswith(sufijo)
+                     and f[len("Reporte_No_"):-len(sufijo)].isdigit()]
+    numero = len(current_files) + 1
+    while True:
+        full_path = os.path.join(folder_name, f"Reporte_No_{numero}{sufijo}")
+        try:
+            # O_EXCL reserva el número: otro proceso del lote no puede tomar el mismo
+            descriptor = os.open(full_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            break
+        except FileExistsError:
+            numero += 1
+
+    with open(descriptor, "w", encoding="utf-8") as f:
+        f.write(content)
+    return full_path
+
+
+def guardar_indice(indice, filepath=None, folder_name=CARPETA_REPORTES):
+    """
+    Guarda un IndiceCombinaciones como <archivo>_Combinaciones.npz en
+    'folder_name' (reemplaza el de la búsqueda anterior sobre ese archivo).
+
+    Returns:
+        str: Ruta del índice guardado.
+
+    Raises:
+        OSError: Si no se puede crear la carpeta o escribir el archivo.
+    """
+    os.makedirs(folder_name, exist_ok=True)
+    nombre = f"{nombre_base(filepath, 'datos_desconocidos')}_Combinaciones{EXTENSION_INDICE}"
+    return indice.guardar(os.path.join(folder_name, nombre))
+
+
+def nombre_exportacion(filepath, num_vars):
+    """Nombre sugerido (sin extensión) para exportar los componentes: <archivo>_ACP_<n>Variables."""
+    return f"{nombre_base(filepath, 'datos_analizados')}_ACP_{num_vars}Variables"
+
+
+def exportar_componentes(data_transformed, filepath, progreso=None):
+    """
+    Guarda todos los componentes y la columna COMPONENTE_SUMA en el formato
+    de la extensión de 'filepath' (.xlsx, .parquet, .csv o .npy; ver
+    acp.exportacion). Una extensión desconocida se escribe como Excel.
+
+    Args:
+        data_transformed (ndarray): Componentes, filas x componentes.
+        filepath (str): Ruta de salida.
+        progreso (callable): Opcional; recibe las filas escritas en cada bloque.
+
+    Raises:
+        ImportError: Si falta pyarrow (.parquet).
+    """
+    return escribir_componentes(bloques_de_arreglo(data_transformed), filepath, data_transformed.shape[1],
+                                n_filas=len(data_transformed), progreso=progreso)
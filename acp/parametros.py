@@ -0,0 +1,42 @@
+"""
+Valores por defecto de la búsqueda de combinaciones y formatos de
+exportación que también usa la ventana. Este módulo no importa numpy,
+pandas ni scikit-learn, para que la interfaz pueda dibujarse antes de
+cargarlos.
+"""
+import os
+
+MAX_K_COMBINACIONES = 9 # Tamaño máximo de subconjunto a buscar
+ANCHO_HAZ = 10 # Subconjuntos conservados por nivel en la búsqueda en haz
+TOP_N_COMBINACIONES = 5 # Subconjuntos listados por k en el informe
+PROCESOS_POR_DEFECTO = os.cpu_count() or 1
+
+MODOS_BUSQUEDA = {
+    "Automático": "automatico",
+    "Exacta": "exacta",
+    "Exacta (código de Gray)": "gray",
+    "Voraz (hacia adelante)": "voraz",
+    "Eliminación hacia atrás": "eliminacion",
+    "Búsqueda en haz": "haz",
+    "Intercambio local": "intercambio",
+}
+MODOS_EXACTOS = ("exacta", "gray") # Modos que recorren todas las combinaciones (el total se conoce de antemano)
+METODOS_EXACTOS = ("enumeracion", "gray", "ramificacion") # Métodos por k de los modos exactos
+
+# Precisión de los datos analizados y de los componentes (float32 ocupa la mitad)
+PRECISIONES = {
+    "Doble (float64)": "float64",
+    "Simple (float32)": "float32",
+}
+
+# Extensión -> descripción, en el orden en que se ofrecen al guardar los componentes
+FORMATOS_EXPORTACION = {
+    ".xlsx": "Archivos Excel",
+    ".parquet": "Archivos Parquet",
+    ".csv": "Archivos CSV",
+    ".npy": "Arreglo NumPy",
+}
+
+
+class BusquedaCancelada(Exception):
+    """Se lanza desde el callback de progreso para detener un cálculo en curso."""
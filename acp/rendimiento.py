@@ -0,0 +1,148 @@
+"""
+Tiempos, CPU y memoria por etapa de cada operación (carga, análisis,
+búsqueda de combinaciones, exportación).
+
+Un RegistroRendimiento se puede pasar directamente como callback 'etapa' de
+las funciones del motor: cada llamada cierra la etapa anterior y abre la
+siguiente. El pico de memoria se mide con tracemalloc solo si se pide,
+porque ralentiza las partes en Python puro; como tracemalloc es global,
+incluye lo que reserven otros hilos durante la etapa, y sigue activo
+mientras quede algún registro que lo use. Este módulo no importa numpy ni
+pandas.
+"""
+import json
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+VERSION_JSON_RENDIMIENTO = 1 # Cambiar si cambia el formato de a_dict
+
+_candado_memoria = threading.Lock()
+_registros_con_memoria = 0 # Registros en curso que miden memoria (tracemalloc se detiene al llegar a 0)
+
+
+def _usar_tracemalloc(activo):
+    """Cuenta un registro más (o menos) que mide memoria; inicia o detiene tracemalloc si hace falta."""
+    global _registros_con_memoria
+    with _candado_memoria:
+        if activo:
+            _registros_con_memoria += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        else:
+            _registros_con_memoria -= 1
+            if _registros_con_memoria == 0 and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+@dataclass
+class MedidaEtapa:
+    """Una etapa medida; 'cantidad' cuenta lo que diga 'unidad' (combinaciones evaluadas, filas...)."""
+    nombre: str
+    segundos: float = 0.0
+    segundos_cpu: float = 0.0 # De todo el proceso (incluye los hilos de BLAS)
+    pico_bytes: int = None
+    cantidad: int = None
+    unidad: str = ""
+
+
+class RegistroRendimiento:
+    """
+    Medidas de las etapas de una operación.
+
+    Uso:
+        registro = RegistroRendimiento("Análisis")
+        analizar_pca(datos, columnas, etapa=registro)
+        registro.terminar()
+        registro.a_dict()
+
+    Entre etapas puede haber tiempo sin medir: cerrar_etapa() cierra la
+    actual sin abrir otra (p. ej. al acabar el trabajo en segundo plano,
+    antes de que la ventana muestre el resultado).
+    """
+
+    def __init__(self, operacion, medir_memoria=False):
+        self.operacion = operacion
+        self.inicio = time.time()
+        self.etapas = []
+        self.estado = "en curso"
+        self.medir_memoria = medir_memoria
+        self._actual = None
+        self._inicio_etapa = None
+        self._inicio_cpu = None
+        if medir_memoria:
+            _usar_tracemalloc(True)
+
+    def __call__(self, nombre):
+        """Empieza la etapa 'nombre' (se quitan los puntos suspensivos de los mensajes)."""
+        self.cerrar_etapa()
+        self._actual = MedidaEtapa(nombre.rstrip(". "))
+        if self.medir_memoria and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._inicio_etapa = time.perf_counter()
+        self._inicio_cpu = time.process_time()
+
+    def contar(self, cantidad=1, unidad="evaluaciones"):
+        """Suma 'cantidad' a la etapa en curso."""
+        if self._actual is not None:
+            self._actual.cantidad = (self._actual.cantidad or 0) + cantidad
+            self._actual.unidad = unidad
+
+    def cerrar_etapa(self):
+        """Cierra la etapa en curso, si la hay, sin abrir otra."""
+        if self._actual is None:
+            return
+        self._actual.segundos = time.perf_counter() - self._inicio_etapa
+        self._actual.segundos_cpu = time.process_time() - self._inicio_cpu
+        if self.medir_memoria and tracemalloc.is_tracing():
+            self._actual.pico_bytes = tracemalloc.get_traced_memory()[1]
+        self.etapas.append(self._actual)
+        self._actual = None
+
+    def terminar(self, estado="completada"):
+        """Cierra la etapa en curso y deja de usar tracemalloc."""
+        self.cerrar_etapa()
+        self.estado = estado
+        if self.medir_memoria:
+            self.medir_memoria = False
+            _usar_tracemalloc(False)
+
+    @property
+    def segundos(self):
+        return sum(medida.segundos for medida in self.etapas)
+
+    def a_dict(self):
+        return {
+            "operacion": self.operacion,
+            "inicio": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.inicio)),
+            "estado": self.estado,
+            "segundos": self.segundos,
+            "etapas": [asdict(medida) for medida in self.etapas],
+        }
+
+    def lineas(self):
+        """Tabla de texto con una fila por etapa (para la ventana o la consola)."""
+        lineas = [f"{self.operacion}: {self.segundos:.3f} s, {self.estado} "
+                  f"({time.strftime('%H:%M:%S', time.localtime(self.inicio))})"]
+        for medida in self.etapas:
+            linea = f"  {medida.nombre:<44} {medida.segundos:8.3f} s  CPU {medida.segundos_cpu:8.3f} s"
+            if medida.pico_bytes is not None:
+                linea += f"  pico {medida.pico_bytes / 1024 ** 2:8.1f} MB"
+            if medida.cantidad is not None:
+                linea += f"  {medida.cantidad:,} {medida.unidad}"
+            lineas.append(linea)
+        return lineas
+
+
+def exportar_rendimiento(registros, filepath):
+    """
+    Guarda los registros en un JSON: {"version", "registros": [a_dict(), ...]}.
+
+    Args:
+        registros (list): RegistroRendimiento, del más antiguo al más nuevo.
+        filepath (str): Ruta de salida.
+    """
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION_JSON_RENDIMIENTO, "registros": [registro.a_dict() for registro in registros]},
+                  f, indent=2, ensure_ascii=False)
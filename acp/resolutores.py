@@ -0,0 +1,195 @@
+"""
+Resolutores de PCA sobre datos ya estandarizados (Z, n filas x p variables).
+
+Todos devuelven lo mismo que PCA() de scikit-learn (componentes por fila,
+varianzas con ddof=1 y el mismo criterio de signo), por tres caminos:
+
+    covarianza: eigh de la matriz p x p Z'Z/(n-1). Para datos altos (n >= p).
+    gram:       eigh de la matriz n x n ZZ'/(n-1). Para datos anchos (p > n).
+    aleatorio:  SVD truncada aleatorizada con solo los componentes pedidos.
+    exacto:     SVD completa (la referencia para validar los demás).
+
+Z puede ser float32 (o un np.memmap): los productos Z'Z, ZZ' y Z'U se
+acumulan en float64 por bloques, sin pasar Z entera a float64.
+"""
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.utils.extmath import randomized_svd
+
+RESOLUTORES = {
+    "covarianza": "eigh de la covarianza p×p",
+    "gram": "eigh de la matriz de Gram n×n",
+    "aleatorio": "SVD truncada aleatorizada",
+    "exacto": "SVD completa",
+}
+MIN_DIMENSION_ALEATORIO = 200 # min(n, p) desde el cual compensa la SVD aleatorizada
+FRACCION_ALEATORIO = 0.1 # ... si se piden a lo sumo esta fracción de min(n, p) componentes
+ITERACIONES_ALEATORIO = 7 # Iteraciones de potencia de la SVD aleatorizada
+SOBREMUESTREO_ALEATORIO = 10 # Columnas extra del subespacio aleatorio
+TOLERANCIA_VALIDACION = 1e-6 # Error relativo máximo frente al resolutor exacto
+ELEMENTOS_POR_BLOQUE = 2 ** 22 # Elementos de Z que se pasan a float64 a la vez (32 MB)
+
+
+@dataclass
+class ResultadoResolutor:
+    """Componentes (k x p), varianza de cada uno y varianza total de Z."""
+    componentes: np.ndarray
+    varianzas: np.ndarray
+    varianza_total: float
+    nombre: str
+    segundos: float = 0.0
+
+    @property
+    def proporciones(self):
+        """Proporción de la varianza total explicada por cada componente."""
+        if self.varianza_total <= 0:
+            return np.zeros_like(self.varianzas)
+        return self.varianzas / self.varianza_total
+
+
+def elegir_resolutor(n, p, n_componentes=None):
+    """
+    Camino más barato según la forma de los datos y los componentes pedidos
+    (None = todos).
+    """
+    menor = min(n, p)
+    if n_componentes is not None and menor >= MIN_DIMENSION_ALEATORIO \
+            and n_componentes <= FRACCION_ALEATORIO * menor:
+        return "aleatorio"
+    return "covarianza" if n >= p else "gram"
+
+
+def orientar_componentes(componentes):
+    """Mismo signo que scikit-learn: la carga de mayor valor absoluto, positiva."""
+    if len(componentes) == 0:
+        return componentes
+    signos = np.sign(componentes[np.arange(len(componentes)), np.argmax(np.abs(componentes), axis=1)])
+    return componentes * np.where(signos == 0, 1.0, signos)[:, None]
+
+
+def _bloques_float64(Z, eje):
+    """Vistas de Z en float64 por bloques de filas (eje 0) o de columnas (eje 1)."""
+    if Z.dtype == np.float64:
+        yield 0, Z
+        return
+    largo = Z.shape[eje]
+    paso = max(1, ELEMENTOS_POR_BLOQUE // max(Z.shape[1 - eje], 1))
+    for inicio in range(0, largo, paso):
+        bloque = Z[inicio:inicio + paso] if eje == 0 else Z[:, inicio:inicio + paso]
+        yield inicio, np.asarray(bloque, dtype=np.float64)
+
+
+def _producto_columnas(Z):
+    """Z'Z en float64."""
+    total = None
+    for _, bloque in _bloques_float64(Z, 0):
+        parcial = bloque.T @ bloque
+        total = parcial if total is None else total + parcial
+    return total
+
+
+def _producto_filas(Z):
+    """ZZ' en float64."""
+    total = None
+    for _, bloque in _bloques_float64(Z, 1):
+        parcial = bloque @ bloque.T
+        total = parcial if total is None else total + parcial
+    return total
+
+
+def _proyectar_transpuesta(Z, U):
+    """Z'U en float64 (p x k)."""
+    resultado = np.empty((Z.shape[1], U.shape[1]))
+    for inicio, bloque in _bloques_float64(Z, 1):
+        resultado[inicio:inicio + bloque.shape[1]] = bloque.T @ U
+    return resultado
+
+
+def _eigh_descendente(matriz, k):
+    valores, vectores = np.linalg.eigh(matriz)
+    orden = np.argsort(valores)[::-1][:k]
+    return np.clip(valores[orden], 0.0, None), vectores[:, orden]
+
+
+def resolver_pca(Z, n_componentes=None, resolutor="automatico", semilla=0):
+    """
+    Componentes principales de Z (centrada).
+
+    Args:
+        Z (ndarray): Datos estandarizados, n x p.
+        n_componentes (int): Componentes a calcular; None = min(n, p). Los
+            resolutores exactos calculan todos igualmente (cuestan lo mismo).
+        resolutor (str): "automatico" o una clave de RESOLUTORES.
+        semilla (int): Semilla de la SVD aleatorizada (resultados reproducibles).
+
+    Returns:
+        ResultadoResolutor
+    """
+    n, p = Z.shape
+    k_max = min(n, p)
+    if resolutor == "automatico":
+        resolutor = elegir_resolutor(n, p, n_componentes)
+    if resolutor not in RESOLUTORES:
+        raise ValueError(f"Resolutor desconocido: {resolutor}")
+    if resolutor == "aleatorio" and n_componentes is None:
+        raise ValueError("La SVD aleatorizada necesita el número de componentes")
+
+    inicio = time.perf_counter()
+    gl = max(n - 1, 1) # Grados de libertad (ddof=1, como PCA de scikit-learn)
+    varianza_total = sum(float(np.einsum('ij,ij->', bloque, bloque)) for _, bloque in _bloques_float64(Z, 0)) / gl
+
+    if resolutor == "covarianza":
+        varianzas, vectores = _eigh_descendente(_producto_columnas(Z) / gl, k_max)
+        componentes = vectores.T
+    elif resolutor == "gram":
+        varianzas, vectores = _eigh_descendente(_producto_filas(Z) / gl, k_max)
+        # v = Z'u / ||Z'u||; con autovalor ~0 la dirección no está definida y queda en cero
+        normas = np.sqrt(varianzas * gl)
+        componentes = _proyectar_transpuesta(Z, vectores).T
+        utiles = normas > np.finfo(np.float64).eps * max(n, p) * max(normas.max(initial=0.0), 1.0)
+        componentes[utiles] /= normas[utiles, None]
+        componentes[~utiles] = 0.0
+    elif resolutor == "aleatorio":
+        k = min(n_componentes, k_max)
+        _, valores_singulares, componentes = randomized_svd(
+            Z, k, n_oversamples=SOBREMUESTREO_ALEATORIO, n_iter=ITERACIONES_ALEATORIO,
+            flip_sign=False, random_state=semilla)
+        varianzas = valores_singulares ** 2 / gl
+    else:
+        _, valores_singulares, componentes = np.linalg.svd(Z, full_matrices=False)
+        varianzas = valores_singulares ** 2 / gl
+
+    # La SVD aleatorizada y la completa trabajan en la precisión de Z
+    componentes = np.asarray(componentes, dtype=np.float64)
+    varianzas = np.asarray(varianzas, dtype=np.float64)
+    return ResultadoResolutor(componentes=orientar_componentes(componentes), varianzas=varianzas,
+                              varianza_total=varianza_total, nombre=resolutor,
+                              segundos=time.perf_counter() - inicio)
+
+
+def validar_resolutor(Z, resultado, tolerancia=TOLERANCIA_VALIDACION):
+    """
+    Compara 'resultado' con la SVD completa de Z.
+
+    Returns:
+        tuple: (error relativo máximo en varianzas, error máximo en las
+                cargas de los componentes, True si ambos están dentro de la tolerancia)
+    """
+    referencia = resolver_pca(Z, resolutor="exacto")
+    k = len(resultado.varianzas)
+    escala = max(referencia.varianzas[0], np.finfo(np.float64).tiny) if k else 1.0
+    error_varianzas = float(np.max(np.abs(resultado.varianzas - referencia.varianzas[:k]), initial=0.0)) / escala
+    # Solo se comparan componentes con varianza distinta de sus vecinos (si no, la base no es única)
+    distintos = np.ones(k, dtype=bool)
+    brechas = np.abs(np.diff(referencia.varianzas)) / escala
+    for i in range(k):
+        if (i > 0 and brechas[i - 1] < tolerancia) or (i < len(brechas) and brechas[i] < tolerancia):
+            distintos[i] = False
+    distintos &= referencia.varianzas[:k] / escala > tolerancia
+    if distintos.any():
+        error_componentes = float(np.max(np.abs(resultado.componentes[distintos] - referencia.componentes[:k][distintos])))
+    else:
+        error_componentes = 0.0
+    return error_varianzas, error_componentes, max(error_varianzas, error_componentes) <= tolerancia
@@ -0,0 +1,128 @@
+"""
+Selección de variables para archivos con miles de columnas.
+
+El estado de cada columna (marcada o no) vive en un bytearray de un byte por
+columna en lugar de un objeto por columna, y el filtro por texto o expresión
+regular devuelve índices para que la lista de la ventana dibuje solo las
+filas visibles. Este módulo no importa numpy ni pandas.
+"""
+import re
+
+# Nombres que parecen identificadores de fila (id, ID, %id, paciente_id...): no se preseleccionan
+PATRON_IDENTIFICADOR = re.compile(r"(^|[^a-z])id([^a-z]|$)", re.IGNORECASE)
+
+
+def columnas_por_defecto(column_names, numericas=None):
+    """
+    Columnas que se preseleccionan al abrir un archivo: las numéricas cuyo
+    nombre no parece un identificador. En el archivo de este proyecto son
+    las mismas que la antigua heurística de las columnas C a L.
+
+    Args:
+        column_names (list): Columnas del archivo, en orden.
+        numericas (set): Opcional; columnas numéricas (FuenteDatos.numericas).
+            Si es None se consideran numéricas todas.
+
+    Returns:
+        list: Columnas preseleccionadas, en el orden del archivo.
+    """
+    return [col for col in column_names
+            if (numericas is None or col in numericas) and not PATRON_IDENTIFICADOR.search(str(col))]
+
+
+def compilar_filtro(texto, regex=False):
+    """
+    Función nombre -> bool para 'texto': subcadena sin distinguir mayúsculas,
+    o expresión regular (re.search, también sin distinguir mayúsculas).
+
+    Raises:
+        re.error: Si 'regex' y el patrón no es válido.
+    """
+    if regex:
+        return re.compile(texto, re.IGNORECASE).search
+    texto = texto.casefold()
+    return lambda nombre: texto in nombre.casefold()
+
+
+class SeleccionColumnas:
+    """
+    Columnas de un archivo con su marca de selección y el filtro actual.
+
+    Las columnas conservan su etiqueta original (un Excel puede tener
+    encabezados numéricos, como 2020), que es la que devuelve
+    seleccionadas(); 'nombres' tiene su texto, para mostrar y filtrar.
+
+    Los filtros de subcadena son incrementales: si el texto nuevo contiene
+    al anterior (el usuario sigue escribiendo), solo se revisan las columnas
+    que ya pasaban el filtro.
+    """
+
+    def __init__(self, columnas, marcadas=()):
+        self.columnas = list(columnas)
+        self.nombres = [str(col) for col in self.columnas]
+        self.marcas = bytearray(len(self.columnas))
+        posiciones = {col: i for i, col in enumerate(self.columnas)}
+        for col in marcadas:
+            self.marcas[posiciones[col]] = 1
+        self.visibles = range(len(self.columnas)) # Índices que pasan el filtro actual
+        self._filtro = ("", False)
+
+    def __len__(self):
+        return len(self.columnas)
+
+    @property
+    def n_marcadas(self):
+        return self.marcas.count(1)
+
+    def filtrar(self, texto, regex=False):
+        """
+        Deja en self.visibles los índices de las columnas que pasan el filtro
+        ('' las muestra todas).
+
+        Returns:
+            list | range: self.visibles
+
+        Raises:
+            re.error: Si 'regex' y el patrón no es válido (self.visibles no cambia).
+        """
+        if not texto:
+            self.visibles = range(len(self.columnas))
+        else:
+            anterior, regex_anterior = self._filtro
+            candidatas = self.visibles if (not regex and not regex_anterior and anterior in texto) \
+                else range(len(self.columnas))
+            coincide = compilar_filtro(texto, regex)
+            self.visibles = [i for i in candidatas if coincide(self.nombres[i])]
+        self._filtro = (texto, regex)
+        return self.visibles
+
+    def alternar(self, indice):
+        """Cambia la marca de una columna y devuelve la nueva (True si quedó marcada)."""
+        self.marcas[indice] ^= 1
+        return bool(self.marcas[indice])
+
+    def marcar(self, indices, valor=True):
+        """Marca (o desmarca) de una vez todas las columnas de 'indices'."""
+        byte = 1 if valor else 0
+        if isinstance(indices, range) and indices.step == 1:
+            self.marcas[indices.start:indices.stop] = bytes([byte]) * len(indices)
+            return
+        for i in indices:
+            self.marcas[i] = byte
+
+    def marcar_patron(self, texto, regex=False, valor=True):
+        """
+        Marca (o desmarca) las columnas que pasan el filtro 'texto', sin
+        cambiar el filtro visible.
+
+        Returns:
+            int: Columnas afectadas.
+        """
+        coincide = compilar_filtro(texto, regex)
+        indices = [i for i, nombre in enumerate(self.nombres) if coincide(nombre)]
+        self.marcar(indices, valor)
+        return len(indices)
+
+    def seleccionadas(self):
+        """Columnas marcadas (con su etiqueta original), en el orden del archivo."""
+        return [col for col, marca in zip(self.columnas, self.marcas) if marca]
@@ -1,11 +1,410 @@
 import tkinter as tk
-from tkinter import scrolledtext, messagebox, font, filedialog
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from itertools import combinations
-import numpy as np
-import os 
+from tkinter import scrolledtext, messagebox, font, filedialog, ttk
+import queue
+import re
+import threading
+import time
+
+import acp
+from acp import (
+    ANCHO_HAZ,
+    FORMATOS_EXPORTACION,
+    MAX_K_COMBINACIONES,
+    MODOS_BUSQUEDA,
+    PRECISIONES,
+    PROCESOS_POR_DEFECTO,
+    TOP_N_COMBINACIONES,
+    BusquedaCancelada,
+)
+
+# --- Trabajos en segundo plano ---
+INTERVALO_SONDEO_MS = 100 # Cada cuánto revisa Tk la cola de mensajes del trabajo
+MAX_ANCHO_ETIQUETA_PX = 220 # Ancho máximo de los nombres de fila/columna en el visor de matrices
+COLOR_CALOR_POSITIVO = "#F44336" # Mapa de calor: valores positivos
+COLOR_CALOR_NEGATIVO = "#2196F3" # Mapa de calor: valores negativos
+MAX_REGISTROS_RENDIMIENTO = 50 # Operaciones que conserva el panel "Rendimiento"
+MAX_FILAS_CONSULTA = 500 # Combinaciones por k que muestra una consulta del índice
+
+
+class TrabajoEnSegundoPlano:
+    """
+    Ejecuta funcion(trabajo, *args) en un hilo aparte para no congelar la
+    ventana. El hilo nunca toca Tk: envía sus mensajes por una cola que el
+    hilo de Tk revisa con after() cada INTERVALO_SONDEO_MS.
+
+    La función puede llamar a trabajo.publicar(...) para enviar resultados
+    parciales y usar trabajo.progreso como callback de avance; tras pedir
+    cancelar(), la siguiente llamada a progreso lanza BusquedaCancelada.
+    """
+
+    def __init__(self, widget, funcion, *args, al_mensaje=None, al_progreso=None,
+                 al_terminar=None, al_cancelar=None, al_error=None):
+        self.widget = widget
+        self.funcion = funcion
+        self.args = args
+        self.al_mensaje = al_mensaje
+        self.al_progreso = al_progreso
+        self.al_terminar = al_terminar
+        self.al_cancelar = al_cancelar
+        self.al_error = al_error
+        self.cola = queue.Queue()
+        self.evento_cancelar = threading.Event()
+        self.avance = 0
+        self.inicio = None
+        self.hilo = None
+
+    @property
+    def activo(self):
+        return self.hilo is not None and self.hilo.is_alive()
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        self.hilo = threading.Thread(target=self._ejecutar, daemon=True)
+        self.hilo.start()
+        self.widget.after(INTERVALO_SONDEO_MS, self._sondear)
+
+    def cancelar(self):
+        self.evento_cancelar.set()
+
+    def publicar(self, *mensaje):
+        """Envía un mensaje al hilo de Tk (se entrega a al_mensaje)."""
+        self.cola.put(("mensaje", mensaje))
+
+    def progreso(self, evaluadas=0):
+        """Callback de avance para el motor; también es el punto de cancelación."""
+        if self.evento_cancelar.is_set():
+            raise BusquedaCancelada()
+        self.avance += evaluadas
+
+    def _ejecutar(self):
+        try:
+            resultado = self.funcion(self, *self.args)
+            self.cola.put(("fin", resultado))
+        except BusquedaCancelada:
+            self.cola.put(("cancelado", None))
+        except Exception as e:
+            self.cola.put(("error", e))
+
+    def _sondear(self):
+        try:
+            if not self.widget.winfo_exists():
+                self.cancelar()
+                return
+        except tk.TclError:
+            self.cancelar()
+            return
+
+        terminado = False
+        while True:
+            try:
+                tipo, contenido = self.cola.get_nowait()
+            except queue.Empty:
+                break
+            if tipo == "mensaje":
+                if self.al_mensaje:
+                    self.al_mensaje(*contenido)
+                continue
+            terminado = True
+            if tipo == "fin" and self.al_terminar:
+                self.al_terminar(contenido)
+            elif tipo == "cancelado" and self.al_cancelar:
+                self.al_cancelar()
+            elif tipo == "error" and self.al_error:
+                self.al_error(contenido)
+
+        if terminado:
+            return
+        if self.al_progreso:
+            self.al_progreso(self.avance, time.perf_counter() - self.inicio)
+        self.widget.after(INTERVALO_SONDEO_MS, self._sondear)
+
+
+class VisorMatriz(tk.Frame):
+    """
+    Cuadrícula de solo lectura para matrices de cualquier tamaño: solo se
+    formatean y dibujan las celdas visibles (se redibuja al desplazarse o al
+    cambiar el tamaño), con los nombres de filas y columnas fijos y un mapa
+    de calor opcional. Una matriz de 1000 x 1000 se abre igual de rápido que
+    una de 10 x 10.
+    """
+
+    def __init__(self, parent, matrix_df, fuente, bg, fg, bg_encabezado, formato="{:.4f}"):
+        super().__init__(parent, bg=bg)
+        self.valores = matrix_df.to_numpy(dtype=float)
+        self.filas = [str(nombre) for nombre in matrix_df.index]
+        self.columnas = [str(nombre) for nombre in matrix_df.columns]
+        self.formato = formato
+        self.bg = bg
+        self.fg = fg
+        self.mapa_calor = False
+        escala = matrix_df.abs().max().max() if self.valores.size else 0.0
+        self.escala = float(escala) if escala == escala and escala > 0 else 1.0 # escala == escala: no es NaN
+        self.primera_fila = 0
+        self.primera_columna = 0
+
+        self.fuente = font.Font(font=fuente)
+        self.alto = self.fuente.metrics("linespace") + 6
+        ancho_numero = self.fuente.measure(formato.format(-self.escala)) + 16
+        ancho_nombres = max((self.fuente.measure(nombre) for nombre in self.columnas), default=0) + 16
+        self.ancho = max(ancho_numero, min(ancho_nombres, MAX_ANCHO_ETIQUETA_PX))
+        ancho_filas = max((self.fuente.measure(nombre) for nombre in self.filas), default=0) + 16
+        self.ancho_etiquetas = min(ancho_filas, MAX_ANCHO_ETIQUETA_PX)
+
+        opciones = dict(highlightthickness=0, bd=0)
+        self.esquina = tk.Canvas(self, width=self.ancho_etiquetas, height=self.alto, bg=bg_encabezado, **opciones)
+        self.encabezado = tk.Canvas(self, height=self.alto, bg=bg_encabezado, **opciones)
+        self.etiquetas = tk.Canvas(self, width=self.ancho_etiquetas, bg=bg_encabezado, **opciones)
+        self.celdas = tk.Canvas(self, bg=bg, **opciones)
+        self.yscrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.xscrollbar = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.xview)
+        self.lbl_celda = tk.Label(self, text="", font=fuente, bg=bg, fg=fg, anchor="w")
+
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(1, weight=1)
+        self.esquina.grid(row=0, column=0, sticky="nsew")
+        self.encabezado.grid(row=0, column=1, sticky="ew")
+        self.etiquetas.grid(row=1, column=0, sticky="ns")
+        self.celdas.grid(row=1, column=1, sticky="nsew")
+        self.yscrollbar.grid(row=1, column=2, sticky="ns")
+        self.xscrollbar.grid(row=2, column=1, sticky="ew")
+        self.lbl_celda.grid(row=3, column=0, columnspan=3, sticky="ew", pady=(5, 0))
+
+        self.celdas.bind("<Configure>", lambda e: self.redibujar())
+        self.celdas.bind("<Motion>", self._mostrar_celda)
+        for widget in (self.celdas, self.etiquetas, self.encabezado):
+            widget.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+            widget.bind("<Shift-MouseWheel>", lambda e: self.xview("scroll", -1 if e.delta > 0 else 1, "units"))
+            widget.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+            widget.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+            widget.bind("<Shift-Button-4>", lambda e: self.xview("scroll", -1, "units"))
+            widget.bind("<Shift-Button-5>", lambda e: self.xview("scroll", 1, "units"))
+
+    def _visibles(self):
+        """(filas, columnas) que caben en el área de celdas."""
+        return (max(1, self.celdas.winfo_height() // self.alto),
+                max(1, self.celdas.winfo_width() // self.ancho))
+
+    def _desplazar(self, actual, total, visibles, args):
+        """Nueva primera fila/columna para los argumentos de yview/xview de una barra."""
+        if args[0] == "moveto":
+            nueva = int(round(float(args[1]) * total))
+        elif args[0] == "scroll":
+            paso = visibles if args[2] == "pages" else 1
+            nueva = actual + int(args[1]) * paso
+        else:
+            return actual
+        return max(0, min(nueva, total - visibles))
+
+    def yview(self, *args):
+        filas_visibles, _ = self._visibles()
+        self.primera_fila = self._desplazar(self.primera_fila, len(self.filas), filas_visibles, args)
+        self.redibujar()
+
+    def xview(self, *args):
+        _, columnas_visibles = self._visibles()
+        self.primera_columna = self._desplazar(self.primera_columna, len(self.columnas), columnas_visibles, args)
+        self.redibujar()
+
+    def activar_mapa_calor(self, activo):
+        self.mapa_calor = bool(activo)
+        self.redibujar()
+
+    def _recortar(self, texto, ancho):
+        """'texto' acortado con '…' para que quepa en 'ancho' píxeles."""
+        if self.fuente.measure(texto) <= ancho:
+            return texto
+        while texto and self.fuente.measure(texto + "…") > ancho:
+            texto = texto[:-1]
+        return texto + "…"
+
+    def _color(self, valor):
+        """Color de fondo del mapa de calor: del fondo al color del signo según |valor|."""
+        if valor != valor: # NaN
+            return self.bg
+        destino = COLOR_CALOR_POSITIVO if valor >= 0 else COLOR_CALOR_NEGATIVO
+        t = min(abs(valor) / self.escala, 1.0)
+        origen = [int(self.bg[i:i + 2], 16) for i in (1, 3, 5)]
+        final = [int(destino[i:i + 2], 16) for i in (1, 3, 5)]
+        return "#" + "".join(f"{round(a + (b - a) * t):02x}" for a, b in zip(origen, final))
+
+    def redibujar(self):
+        """Dibuja solo las filas y columnas visibles desde primera_fila/primera_columna."""
+        filas_visibles, columnas_visibles = self._visibles()
+        self.primera_fila = max(0, min(self.primera_fila, len(self.filas) - filas_visibles))
+        self.primera_columna = max(0, min(self.primera_columna, len(self.columnas) - columnas_visibles))
+        rango_filas = range(self.primera_fila, min(len(self.filas), self.primera_fila + filas_visibles + 1))
+        rango_columnas = range(self.primera_columna, min(len(self.columnas), self.primera_columna + columnas_visibles + 1))
+
+        for canvas in (self.encabezado, self.etiquetas, self.celdas):
+            canvas.delete("all")
+        for j_vis, j in enumerate(rango_columnas):
+            x = j_vis * self.ancho
+            self.encabezado.create_text(x + self.ancho - 8, self.alto // 2, anchor="e", fill=self.fg, font=self.fuente,
+                                        text=self._recortar(self.columnas[j], self.ancho - 16))
+        for i_vis, i in enumerate(rango_filas):
+            y = i_vis * self.alto
+            self.etiquetas.create_text(8, y + self.alto // 2, anchor="w", fill=self.fg, font=self.fuente,
+                                       text=self._recortar(self.filas[i], self.ancho_etiquetas - 16))
+            for j_vis, j in enumerate(rango_columnas):
+                x = j_vis * self.ancho
+                valor = self.valores[i, j]
+                if self.mapa_calor:
+                    self.celdas.create_rectangle(x, y, x + self.ancho, y + self.alto, width=0, fill=self._color(valor))
+                self.celdas.create_text(x + self.ancho - 8, y + self.alto // 2, anchor="e", fill=self.fg,
+                                        font=self.fuente, text=self.formato.format(valor))
+
+        if self.filas:
+            self.yscrollbar.set(self.primera_fila / len(self.filas),
+                                min(1.0, (self.primera_fila + filas_visibles) / len(self.filas)))
+        if self.columnas:
+            self.xscrollbar.set(self.primera_columna / len(self.columnas),
+                                min(1.0, (self.primera_columna + columnas_visibles) / len(self.columnas)))
+
+    def _mostrar_celda(self, event):
+        """Nombre completo de la fila y la columna bajo el cursor, con su valor."""
+        i = self.primera_fila + event.y // self.alto
+        j = self.primera_columna + event.x // self.ancho
+        if i < len(self.filas) and j < len(self.columnas):
+            self.lbl_celda.config(text=f"{self.filas[i]}  ×  {self.columnas[j]}  =  {self.formato.format(self.valores[i, j])}")
+        else:
+            self.lbl_celda.config(text="")
+
+
+class ListaVariables(tk.Frame):
+    """
+    Lista de variables con casillas para archivos con miles de columnas.
+    Solo se dibujan las filas visibles en un Canvas; las marcas viven en
+    un acp.SeleccionColumnas (un byte por columna), no en un BooleanVar y
+    un Checkbutton por columna. El campo de arriba filtra mientras se
+    escribe (subcadena o expresión regular) y los botones marcan o
+    desmarcan de una vez todas las columnas filtradas.
+    """
+
+    def __init__(self, parent, bg, fg, bg_lista, color_marca, color_error, fuente, fuente_botones):
+        super().__init__(parent, bg=bg)
+        self.seleccion = None
+        self.primera = 0
+        self.fg = fg
+        self.bg_lista = bg_lista
+        self.color_marca = color_marca
+        self.color_error = color_error
+        self.fuente = font.Font(font=fuente)
+        self.alto = self.fuente.metrics("linespace") + 8
+        self.lado = self.fuente.metrics("ascent") # Lado de la casilla
+
+        self.filtro_var = tk.StringVar()
+        self.regex_var = tk.BooleanVar(value=False)
+
+        filtro_frame = tk.Frame(self, bg=bg)
+        filtro_frame.pack(side="top", fill="x", pady=(0, 5))
+        self.entry_filtro = tk.Entry(filtro_frame, textvariable=self.filtro_var, font=fuente, bg=bg_lista, fg=fg,
+                                     insertbackground=fg, relief=tk.FLAT)
+        self.entry_filtro.pack(side="left", fill="x", expand=True, ipady=3)
+        tk.Checkbutton(filtro_frame, text="Regex", variable=self.regex_var, font=fuente, bg=bg, fg=fg,
+                       selectcolor=bg_lista, activebackground=bg, activeforeground=fg, highlightthickness=0,
+                       command=self.aplicar_filtro).pack(side="left", padx=(5, 0))
+
+        botones_frame = tk.Frame(self, bg=bg)
+        botones_frame.pack(side="top", fill="x", pady=(0, 5))
+        for texto, valor in (("Marcar filtradas", True), ("Desmarcar filtradas", False)):
+            tk.Button(botones_frame, text=texto, font=fuente_botones, bg=color_marca, fg=fg,
+                      activebackground=bg_lista, activeforeground=fg, relief=tk.FLAT, bd=0, padx=8,
+                      command=lambda valor=valor: self.marcar_filtradas(valor)).pack(side="left", padx=(0, 5))
+        self.lbl_contador = tk.Label(self, text="", font=fuente, bg=bg, fg=fg, anchor="w")
+        self.lbl_contador.pack(side="top", fill="x", pady=(0, 5))
+
+        lista_frame = tk.Frame(self, bg=bg_lista, highlightbackground=color_marca, highlightthickness=1)
+        lista_frame.pack(side="top", fill="both", expand=True)
+        self.canvas = tk.Canvas(lista_frame, bg=bg_lista, highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(lista_frame, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.filtro_var.trace_add("write", self.aplicar_filtro)
+        self.canvas.bind("<Configure>", lambda e: self.redibujar())
+        self.canvas.bind("<Button-1>", self._clic)
+        self.canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+
+    def cargar(self, seleccion):
+        """Muestra 'seleccion' (acp.SeleccionColumnas) con el filtro que haya escrito."""
+        self.seleccion = seleccion
+        self.primera = 0
+        self.aplicar_filtro()
+
+    def seleccionadas(self):
+        """Nombres de las columnas marcadas, en el orden del archivo."""
+        return self.seleccion.seleccionadas() if self.seleccion is not None else []
+
+    def aplicar_filtro(self, *args):
+        if self.seleccion is None:
+            return
+        try:
+            self.seleccion.filtrar(self.filtro_var.get(), self.regex_var.get())
+        except re.error:
+            # Expresión a medio escribir: se mantiene el filtro anterior
+            self.entry_filtro.config(bg=self.color_error)
+            return
+        self.entry_filtro.config(bg=self.bg_lista)
+        self.primera = 0
+        self.redibujar()
+
+    def marcar_filtradas(self, valor):
+        if self.seleccion is not None:
+            self.seleccion.marcar(self.seleccion.visibles, valor)
+            self.redibujar()
+
+    def _filas_visibles(self):
+        return max(1, self.canvas.winfo_height() // self.alto)
+
+    def yview(self, *args):
+        if self.seleccion is None:
+            return
+        total = len(self.seleccion.visibles)
+        filas = self._filas_visibles()
+        if args[0] == "moveto":
+            self.primera = int(round(float(args[1]) * total))
+        elif args[0] == "scroll":
+            self.primera += int(args[1]) * (filas if args[2] == "pages" else 1)
+        self.redibujar()
+
+    def _clic(self, event):
+        if self.seleccion is None:
+            return
+        posicion = self.primera + event.y // self.alto
+        if posicion < len(self.seleccion.visibles):
+            self.seleccion.alternar(self.seleccion.visibles[posicion])
+            self.redibujar()
+
+    def redibujar(self):
+        """Dibuja las filas visibles desde self.primera y actualiza el contador."""
+        self.canvas.delete("all")
+        if self.seleccion is None:
+            self.lbl_contador.config(text="")
+            self.scrollbar.set(0.0, 1.0)
+            return
+        visibles = self.seleccion.visibles
+        filas = self._filas_visibles()
+        self.primera = max(0, min(self.primera, len(visibles) - filas))
+        for fila, i in enumerate(visibles[self.primera:self.primera + filas + 1]):
+            y = fila * self.alto + (self.alto - self.lado) // 2
+            marcada = self.seleccion.marcas[i]
+            self.canvas.create_rectangle(10, y, 10 + self.lado, y + self.lado, outline=self.fg,
+                                         fill=self.color_marca if marcada else self.bg_lista)
+            if marcada:
+                self.canvas.create_text(10 + self.lado // 2, y + self.lado // 2, text="✓", fill=self.fg, font=self.fuente)
+            self.canvas.create_text(20 + self.lado, fila * self.alto + self.alto // 2, anchor="w", fill=self.fg,
+                                    font=self.fuente, text=self.seleccion.nombres[i])
+        if visibles:
+            self.scrollbar.set(self.primera / len(visibles), min(1.0, (self.primera + filas) / len(visibles)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        texto = f"{self.seleccion.n_marcadas:,} de {len(self.seleccion):,} seleccionadas"
+        if len(visibles) != len(self.seleccion):
+            texto += f" ({len(visibles):,} mostradas)"
+        self.lbl_contador.config(text=texto)
+
 
 class AppPCA(tk.Tk):
 
@@ -40,20 +439,39 @@ class AppPCA(tk.Tk):
         self.pca_cov_matrix_df = None
         self.data_transformed = None
         self.n_components_pca = 0
+        self.modelo_pca = None # acp.ModeloPCA cuando el análisis no dejó los datos en memoria
+        self.resultado_pca = None # Último acp.ResultadoPCA mostrado (para rehacer la sección 4)
+        self.cache_analisis = None # acp.CacheLRU; se crea en el primer análisis (importa pandas)
+        self.cache_disco = None # acp.CacheDisco para las búsquedas de combinaciones (entre sesiones)
         self.spin_n_components = None
         
         # --- NUEVAS variables para el flujo ---
-        self.data_raw = None           # Almacenará el DataFrame cargado
+        self.fuente_datos = None       # acp.FuenteDatos del archivo abierto (columnas bajo demanda)
+        self.estadisticas = None       # acp.EstadisticasSuficientes del archivo (cuando terminan de calcularse)
         self.all_column_names = []   # Lista de todas las columnas del CSV
-        self.column_vars = []        # Lista para las tk.BooleanVar de los checkboxes
         self.btn_analyze = None        # Referencia al nuevo botón "Analizar"
         self.loaded_filepath = None # <-- 2. AÑADIR PARA GUARDAR RUTA
         self.selected_variable_count = 0 # <-- 2. AÑADIR PARA GUARDAR CONTEO
         
         # --- NUEVAS variables para layout ---
         self.sidebar_frame = None
-        self.canvas_sidebar = None
-        self.checkbox_container = None
+        self.lista_variables = None    # ListaVariables del panel lateral
+        self.precision_var = None      # Clave de PRECISIONES para el análisis
+        self.en_disco_var = None       # True: datos estandarizados y componentes en archivos mapeados
+
+        # --- Trabajos en segundo plano ---
+        self.trabajo_analisis = None
+        self.trabajo_estadisticas = None
+        self.barra_progreso = None
+        self.lbl_progreso = None
+        self.btn_cancelar = None
+
+        # --- Panel "Rendimiento" ---
+        self.registros_rendimiento = [] # acp.RegistroRendimiento de las últimas operaciones
+        self.medir_memoria_var = None
+        self.btn_rendimiento = None
+        self.frame_rendimiento = None
+        self.txt_rendimiento = None
 
         # --- Bindings ---
         self.bind("<Escape>", self.cerrar_app)
@@ -61,17 +479,28 @@ class AppPCA(tk.Tk):
         # --- Inicializar la Interfaz ---
         self.crear_widgets()
 
+        # numpy/pandas/scikit-learn se cargan en segundo plano con la ventana ya dibujada
+        self.after_idle(self.precargar_motor)
+
+    def precargar_motor(self):
+        """
+        Importa el motor (acp.motor) en un hilo aparte para que el primer
+        análisis no espere la carga de pandas y scikit-learn. Si el usuario
+        lo necesita antes, el import simplemente espera a que termine.
+        """
+        threading.Thread(target=acp.precargar, daemon=True).start()
+
     def cerrar_app(self, event=None):
         """Cierra la aplicación."""
         self.destroy()
 
     def _validate_spinbox_input(self, proposed_value):
-        """Valida que la entrada del Spinbox sea un número entre 1 y n_components_pca (o 10)."""
+        """Valida que la entrada del Spinbox sea un número entre 1 y su máximo ('to')."""
         if proposed_value == "":
             return True
         try:
             value = int(proposed_value)
-            max_comps = self.n_components_pca if self.n_components_pca > 0 else 10
+            max_comps = int(float(self.spin_n_components.cget('to'))) if self.spin_n_components else 10
             if 1 <= value <= max_comps:
                 return True
             else:
@@ -81,12 +510,6 @@ class AppPCA(tk.Tk):
             self.bell()
             return False
 
-    # --- NUEVA FUNCIÓN (Helper para scroll) ---
-    def on_frame_configure(self, event=None):
-        """Actualiza el scrollregion del canvas para abarcar el frame de checkboxes."""
-        if self.canvas_sidebar:
-            self.canvas_sidebar.configure(scrollregion=self.canvas_sidebar.bbox("all"))
-
     # --- FUNCIÓN MODIFICADA: Layout y botones ---
     def crear_widgets(self):
         """Crea y posiciona todos los widgets en la ventana."""
@@ -157,6 +580,24 @@ class AppPCA(tk.Tk):
                                             validate='key',
                                             validatecommand=vcmd)
         self.spin_n_components.pack(side="left")
+        # Cambiar el número de componentes solo rehace la sección 4 del resultado
+        self.n_components_var.trace_add("write", self._actualizar_reduccion)
+
+        # --- Precisión y almacenamiento (tablas grandes) ---
+        almacenamiento_frame = tk.Frame(top_frame, bg=self.BG_COLOR)
+        almacenamiento_frame.pack(pady=5)
+        tk.Label(almacenamiento_frame, text="Precisión:", font=self.DESC_FONT,
+                 bg=self.BG_COLOR, fg=self.FG_COLOR).pack(side="left", padx=(0, 10))
+        self.precision_var = tk.StringVar(value=next(iter(PRECISIONES)))
+        opt_precision = tk.OptionMenu(almacenamiento_frame, self.precision_var, *PRECISIONES.keys())
+        opt_precision.config(font=self.DESC_FONT, bg=self.TEXT_BG, fg=self.FG_COLOR,
+                             activebackground=self.BTN_ACTIVE, relief=tk.FLAT, highlightthickness=0)
+        opt_precision.pack(side="left")
+        self.en_disco_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(almacenamiento_frame, text="Componentes en disco (memoria mapeada)", variable=self.en_disco_var,
+                       font=self.DESC_FONT, bg=self.BG_COLOR, fg=self.FG_COLOR, selectcolor=self.TEXT_BG,
+                       activebackground=self.BG_COLOR, activeforeground=self.FG_COLOR,
+                       highlightthickness=0).pack(side="left", padx=(20, 0))
 
         # --- Frame para botones horizontales ---
         button_bar_frame = tk.Frame(top_frame, bg=self.BG_COLOR)
@@ -248,35 +689,24 @@ class AppPCA(tk.Tk):
         lbl_sidebar_title.pack(side="top", fill="x", pady=(0, 10))
         
         lbl_sidebar_desc = tk.Label(self.sidebar_frame,
-                                     text="Seleccione las variables a incluir:",
+                                     text="Seleccione las variables a incluir (filtre por nombre):",
                                      font=self.DESC_FONT,
                                      bg=self.BG_COLOR,
                                      fg=self.FG_COLOR)
         lbl_sidebar_desc.pack(side="top", fill="x", pady=(0, 10))
 
-        # --- NUEVO: Contenedor scrollable para checkboxes ---
-        container_frame = tk.Frame(self.sidebar_frame, bg=self.TEXT_BG)
-        container_frame.pack(fill="both", expand=True, padx=5, pady=5)
-        container_frame.config(highlightbackground=self.BTN_COLOR, highlightthickness=1)
-
-        self.canvas_sidebar = tk.Canvas(container_frame, bg=self.TEXT_BG, highlightthickness=0)
-        scrollbar_sidebar = tk.Scrollbar(container_frame, orient="vertical", command=self.canvas_sidebar.yview)
-
-        self.canvas_sidebar.configure(yscrollcommand=scrollbar_sidebar.set)
-
-        scrollbar_sidebar.pack(side="right", fill="y")
-        self.canvas_sidebar.pack(side="left", fill="both", expand=True)
-        
-         # Este es el frame que contendrá los checkboxes, DENTRO del canvas
-        self.checkbox_container = tk.Frame(self.canvas_sidebar, bg=self.TEXT_BG)
-        
-        self.canvas_sidebar.create_window((0, 0), window=self.checkbox_container, anchor="nw")
-        
-        # Vincular el cambio de tamaño del frame al canvas
-        self.checkbox_container.bind("<Configure>", self.on_frame_configure)
+        # --- Lista virtual de variables (solo dibuja las filas visibles) ---
+        self.lista_variables = ListaVariables(self.sidebar_frame,
+                                              bg=self.BG_COLOR, fg=self.FG_COLOR, bg_lista=self.TEXT_BG,
+                                              color_marca=self.BTN_COLOR, color_error=self.WARN_COLOR,
+                                              fuente=self.SIDEBAR_FONT, fuente_botones=self.SIDEBAR_FONT)
+        self.lista_variables.pack(fill="both", expand=True, padx=5, pady=5)
 
 
         # --- Widgets del Frame de Resultados ---
+        # El panel de rendimiento se empaqueta antes para que el texto no lo tape
+        self._crear_panel_rendimiento(results_frame)
+
         self.txt_results = scrolledtext.ScrolledText(results_frame,
                                                        wrap=tk.WORD,
                                                        font=self.RESULT_FONT,
@@ -289,6 +719,8 @@ class AppPCA(tk.Tk):
 
 
         # --- Widgets del Frame Inferior ---
+        self.barra_progreso, self.lbl_progreso, self.btn_cancelar = self._crear_barra_progreso(bottom_frame)
+
         btn_exit = tk.Button(bottom_frame,
                                  text="Salir",
                                  font=self.BUTTON_FONT, bg=self.BTN_EXIT_BG, fg=self.FG_COLOR,
@@ -307,6 +739,121 @@ class AppPCA(tk.Tk):
         self.txt_results.configure(state='disabled')
 
 
+    def _crear_barra_progreso(self, parent):
+        """
+        Crea una fila con barra de progreso, etiqueta de avance (velocidad y
+        ETA) y botón Cancelar (deshabilitado hasta que haya un trabajo en curso).
+
+        Returns:
+            tuple: (barra, etiqueta, botón cancelar)
+        """
+        style = ttk.Style(self)
+        style.configure("PCA.Horizontal.TProgressbar", troughcolor=self.TEXT_BG,
+                        background=self.BTN_COLOR, bordercolor=self.BG_COLOR)
+
+        progreso_frame = tk.Frame(parent, bg=self.BG_COLOR)
+        progreso_frame.pack(fill="x", padx=50, pady=(0, 10))
+
+        barra = ttk.Progressbar(progreso_frame, style="PCA.Horizontal.TProgressbar",
+                                orient="horizontal", mode='determinate', maximum=1.0)
+        barra.pack(side="left", fill="x", expand=True)
+
+        btn_cancelar = tk.Button(progreso_frame, text="Cancelar", font=self.BUTTON_FONT,
+                                 bg=self.BTN_EXIT_BG, fg=self.FG_COLOR,
+                                 activebackground="#b72a38", activeforeground=self.FG_COLOR,
+                                 relief=tk.FLAT, padx=10, bd=0, state=tk.DISABLED)
+        btn_cancelar.pack(side="right", padx=(10, 0))
+
+        etiqueta = tk.Label(progreso_frame, text="", font=self.SIDEBAR_FONT,
+                            bg=self.BG_COLOR, fg=self.FG_COLOR, width=60, anchor="w")
+        etiqueta.pack(side="right", padx=(10, 0))
+
+        return barra, etiqueta, btn_cancelar
+
+    def _crear_panel_rendimiento(self, parent):
+        """
+        Panel plegable "Rendimiento": etapas medidas (tiempo, CPU, memoria y
+        conteos) de las últimas operaciones, con exportación a JSON.
+        """
+        panel = tk.Frame(parent, bg=self.BG_COLOR)
+        panel.pack(side="bottom", fill="x", pady=(10, 0))
+
+        barra = tk.Frame(panel, bg=self.BG_COLOR)
+        barra.pack(side="top", fill="x")
+        self.btn_rendimiento = tk.Button(barra, text="▸ Rendimiento", font=self.BUTTON_FONT,
+                                         bg=self.BG_COLOR, fg=self.BTN_COLOR,
+                                         activebackground=self.BG_COLOR, activeforeground=self.FG_COLOR,
+                                         relief=tk.FLAT, bd=0, command=self.alternar_panel_rendimiento)
+        self.btn_rendimiento.pack(side="left")
+
+        self.medir_memoria_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(barra, text="Medir memoria (más lento)", variable=self.medir_memoria_var,
+                       font=self.SIDEBAR_FONT, bg=self.BG_COLOR, fg=self.FG_COLOR, selectcolor=self.TEXT_BG,
+                       activebackground=self.BG_COLOR, activeforeground=self.FG_COLOR,
+                       highlightthickness=0).pack(side="left", padx=(20, 0))
+
+        tk.Button(barra, text="Exportar JSON", font=self.SIDEBAR_FONT, bg=self.BTN_COLOR, fg=self.FG_COLOR,
+                  activebackground=self.BTN_ACTIVE, activeforeground=self.FG_COLOR,
+                  relief=tk.FLAT, bd=0, padx=10, command=self.exportar_rendimiento_json).pack(side="right")
+
+        # Se empaqueta al desplegar el panel
+        self.frame_rendimiento = tk.Frame(panel, bg=self.BG_COLOR)
+        self.txt_rendimiento = scrolledtext.ScrolledText(self.frame_rendimiento, height=10, wrap=tk.NONE,
+                                                         font=(self.RESULT_FONT[0], 10), bg=self.TEXT_BG,
+                                                         fg=self.FG_COLOR, relief=tk.FLAT, borderwidth=0)
+        self.txt_rendimiento.pack(fill="both", expand=True, pady=(5, 0))
+        self.txt_rendimiento.configure(state='disabled')
+
+    def alternar_panel_rendimiento(self):
+        """Despliega o pliega el panel "Rendimiento"."""
+        if self.frame_rendimiento.winfo_ismapped():
+            self.frame_rendimiento.pack_forget()
+            self.btn_rendimiento.config(text="▸ Rendimiento")
+        else:
+            self.frame_rendimiento.pack(side="top", fill="x")
+            self.btn_rendimiento.config(text="▾ Rendimiento")
+            self._mostrar_rendimiento()
+
+    def _nuevo_registro(self, operacion):
+        """acp.RegistroRendimiento para una operación, midiendo memoria si está marcado en el panel."""
+        return acp.RegistroRendimiento(operacion, medir_memoria=self.medir_memoria_var.get())
+
+    def _agregar_registro(self, registro, estado="completada"):
+        """Termina 'registro', lo guarda (hasta MAX_REGISTROS_RENDIMIENTO) y actualiza el panel."""
+        registro.terminar(estado)
+        self.registros_rendimiento.append(registro)
+        del self.registros_rendimiento[:-MAX_REGISTROS_RENDIMIENTO]
+        if self.frame_rendimiento.winfo_ismapped():
+            self._mostrar_rendimiento()
+
+    def _mostrar_rendimiento(self):
+        self.txt_rendimiento.configure(state='normal')
+        self.txt_rendimiento.delete(1.0, tk.END)
+        if not self.registros_rendimiento:
+            self.txt_rendimiento.insert(tk.END, "Todavía no se midió ninguna operación.\n")
+        for registro in self.registros_rendimiento:
+            self.txt_rendimiento.insert(tk.END, "\n".join(registro.lineas()) + "\n\n")
+        self.txt_rendimiento.see(tk.END)
+        self.txt_rendimiento.configure(state='disabled')
+
+    def exportar_rendimiento_json(self):
+        """Guarda las medidas del panel "Rendimiento" en un archivo JSON."""
+        if not self.registros_rendimiento:
+            messagebox.showinfo("Rendimiento", "Todavía no se midió ninguna operación.")
+            return
+        filepath = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Archivos JSON", "*.json")],
+            title="Guardar medidas de rendimiento como...",
+            initialfile="rendimiento.json"
+        )
+        if not filepath:
+            return
+        try:
+            acp.exportar_rendimiento(self.registros_rendimiento, filepath)
+        except OSError as e:
+            messagebox.showerror("Error al Guardar", f"No se pudo guardar el archivo:\n{e}")
+
     # --- NUEVA FUNCIÓN ---
     def cargar_archivo(self):
         """
@@ -323,13 +870,18 @@ class AppPCA(tk.Tk):
             return
 
         self.loaded_filepath = filepath # <-- 3. GUARDAR LA RUTA DEL ARCHIVO
+        registro = self._nuevo_registro("Carga de archivo")
 
         try:
-            # Cargar y guardar el DataFrame
-            self.data_raw = pd.read_csv(filepath)
-            self.all_column_names = self.data_raw.columns.tolist()
+            # Solo encabezado y vista previa: las columnas se leen al analizarlas
+            registro("Leyendo encabezado y vista previa")
+            self.fuente_datos = acp.FuenteDatos(filepath)
+            self.all_column_names = list(self.fuente_datos.columnas)
+            self.resultado_pca = None
+            self.calcular_estadisticas()
 
             # Poblar la sidebar con las columnas
+            registro("Llenando la lista de variables")
             self.poblar_sidebar()
 
             # Habilitar el botón de análisis
@@ -349,8 +901,10 @@ class AppPCA(tk.Tk):
             self.btn_ver_pca_matriz.config(state=tk.DISABLED)
             self.btn_guardar_pca.config(state=tk.DISABLED)
             self.btn_combinations.config(state=tk.NORMAL)
+            self._agregar_registro(registro)
 
         except Exception as e:
+            self._agregar_registro(registro, "error")
             messagebox.showerror("Error al leer CSV", f"No se pudo leer el archivo CSV:\n{e}")
             self.txt_results.configure(state='normal')
             self.txt_results.delete(1.0, tk.END)
@@ -361,48 +915,65 @@ class AppPCA(tk.Tk):
 
 
     # --- NUEVA FUNCIÓN ---
+    def calcular_estadisticas(self):
+        """
+        Recorre el archivo recién abierto en segundo plano y acumula sus
+        estadísticas suficientes (acp.EstadisticasSuficientes). Mientras no
+        estén listas, los análisis leen las filas como siempre; después,
+        cualquier selección se analiza sin volver a leer el archivo.
+        """
+        if self.trabajo_estadisticas is not None:
+            self.trabajo_estadisticas.cancelar()
+        self.estadisticas = None
+        fuente_datos = self.fuente_datos
+        registro = self._nuevo_registro("Estadísticas del archivo")
+
+        def calcular(trabajo, fuente_datos):
+            def leidas(filas):
+                registro.contar(filas, "filas")
+                trabajo.progreso(filas)
+
+            registro("Acumulando estadísticas por patrón de faltantes")
+            try:
+                return acp.EstadisticasSuficientes.desde_fuente(fuente_datos, progreso=leidas)
+            finally:
+                registro.cerrar_etapa()
+
+        def libre():
+            # La etiqueta de progreso es del análisis o la exportación mientras corren
+            return self.trabajo_analisis is None or not self.trabajo_analisis.activo
+
+        def al_progreso(avance, segundos):
+            if libre():
+                self.lbl_progreso.config(text=f"Preparando estadísticas del archivo... {avance:,} filas")
+
+        def al_terminar(estadisticas):
+            if self.fuente_datos is not fuente_datos:
+                return
+            self._agregar_registro(registro, "completada" if estadisticas is not None else "descartada (demasiados patrones)")
+            self.estadisticas = estadisticas
+            if libre():
+                self.lbl_progreso.config(text="Estadísticas listas: los análisis ya no releen el archivo."
+                                         if estadisticas is not None else "")
+
+        def al_error(e):
+            if self.fuente_datos is fuente_datos:
+                self._agregar_registro(registro, "error")
+                if libre():
+                    self.lbl_progreso.config(text="")
+
+        self.trabajo_estadisticas = TrabajoEnSegundoPlano(
+            self, calcular, fuente_datos, al_progreso=al_progreso, al_terminar=al_terminar, al_error=al_error)
+        self.trabajo_estadisticas.iniciar()
+
     def poblar_sidebar(self):
-        """Limpia y puebla el sidebar con checkboxes para cada columna."""
-        # Limpiar widgets anteriores
-        for widget in self.checkbox_container.winfo_children():
-            widget.destroy()
-        
-        self.column_vars = []
-        
-        # Estilo para los checkboxes
-        style = {
-            'bg': self.TEXT_BG,
-            'fg': self.FG_COLOR,
-            'selectcolor': self.BG_COLOR, # Color de fondo de la marca
-            'activebackground': self.BG_COLOR,
-            'activeforeground': self.FG_COLOR,
-            'font': self.SIDEBAR_FONT,
-            'relief': tk.FLAT,
-            'bd': 0,
-            'highlightthickness': 0
-        }
-
-        for i, col_name in enumerate(self.all_column_names):
-            var = tk.BooleanVar()
-            
-            # Heurística: Pre-seleccionar columnas C a L (índices 2 a 11) por defecto
-            # Esto mantiene el comportamiento original si se carga el mismo tipo de archivo
-            if 2 <= i <= 11:
-                var.set(True)
-            else:
-                var.set(False)
-            
-            cb = tk.Checkbutton(self.checkbox_container, 
-                                 text=col_name, 
-                                 variable=var, 
-                                 anchor="w",
-                                 **style)
-            cb.pack(side="top", fill="x", padx=10, pady=2)
-            self.column_vars.append(var)
-        
-        # Resetear la vista del scroll y actualizar
-        self.canvas_sidebar.yview_moveto(0)
-        self.on_frame_configure()
+        """
+        Carga las columnas del archivo en la lista del panel lateral.
+        Se preseleccionan las numéricas cuyo nombre no parece un
+        identificador (ver acp.columnas_por_defecto).
+        """
+        marcadas = acp.columnas_por_defecto(self.all_column_names, self.fuente_datos.numericas)
+        self.lista_variables.cargar(acp.SeleccionColumnas(self.all_column_names, marcadas))
 
 
     # --- FUNCIÓN MODIFICADA: Ahora solo llama al análisis ---
@@ -411,15 +982,11 @@ class AppPCA(tk.Tk):
         Inicia el análisis de PCA usando las variables seleccionadas 
         en el sidebar.
         """
-        if self.data_raw is None:
+        if self.fuente_datos is None:
             messagebox.showwarning("Sin Datos", "Por favor, cargue un archivo primero.")
             return
 
-        # Obtener las variables seleccionadas de los checkboxes
-        selected_column_names = []
-        for i, var in enumerate(self.column_vars):
-            if var.get():
-                selected_column_names.append(self.all_column_names[i])
+        selected_column_names = self.lista_variables.seleccionadas()
 
         if len(selected_column_names) == 0:
             messagebox.showwarning("Sin Selección", "Por favor, seleccione al menos una variable para analizar.")
@@ -435,98 +1002,154 @@ class AppPCA(tk.Tk):
     def ejecutar_analisis(self, selected_columns):
         """
         Función principal que se ejecuta al presionar "Analizar Variables".
-        Usa el DataFrame cargado (self.data_raw) y las columnas seleccionadas.
+        Lee del archivo abierto (self.fuente_datos) las columnas seleccionadas.
+        El cálculo corre en segundo plano (ver _calcular_analisis) y los
+        resultados se escriben al terminar (ver _mostrar_analisis).
         
         Args:
             selected_columns (list): La lista de nombres de columnas a analizar.
         """
-        try:
-            # Deshabilitar botones al iniciar análisis
-            self.btn_ver_matriz.config(state=tk.DISABLED)
-            self.btn_ver_pca_matriz.config(state=tk.DISABLED)
-            self.btn_guardar_pca.config(state=tk.DISABLED)
-            self.cov_matrix_df = None
-            self.pca_cov_matrix_df = None
-            self.data_transformed = None
-            self.n_components_pca = 0
+        if self.trabajo_analisis is not None and self.trabajo_analisis.activo:
+            messagebox.showwarning("Análisis en curso", "Espere a que termine el análisis actual o cancélelo.")
+            return
+
+        # Deshabilitar botones al iniciar análisis
+        self.btn_ver_matriz.config(state=tk.DISABLED)
+        self.btn_ver_pca_matriz.config(state=tk.DISABLED)
+        self.btn_guardar_pca.config(state=tk.DISABLED)
+        self.btn_analyze.config(state=tk.DISABLED)
+        self.cov_matrix_df = None
+        self.pca_cov_matrix_df = None
+        self.data_transformed = None
+        self.n_components_pca = 0
+        self.modelo_pca = None
+        self.resultado_pca = None
 
-            # Habilitar texto para escritura
+        self.txt_results.configure(state='normal')
+        self.txt_results.delete(1.0, tk.END)
+        self.txt_results.insert(tk.END, f"Iniciando análisis con {len(selected_columns)} variables seleccionadas...\n\n")
+        self.txt_results.configure(state='disabled')
+        registro = self._nuevo_registro(f"Análisis ({len(selected_columns)} variables)")
+
+        def al_mensaje(etapa):
+            self.lbl_progreso.config(text=etapa)
+
+        def al_finalizar():
+            self.barra_progreso.stop()
+            self.barra_progreso.config(mode='determinate', value=0)
+            self.btn_cancelar.config(state=tk.DISABLED)
+            self.btn_analyze.config(state=tk.NORMAL)
+
+        def al_terminar(resultado):
+            al_finalizar()
+            origen = " (desde caché)" if resultado.desde_cache else ""
+            self.lbl_progreso.config(text=f"Análisis terminado en {time.perf_counter() - self.trabajo_analisis.inicio:.2f} s{origen}")
+            registro("Mostrando resultados")
+            self._mostrar_analisis(resultado)
+            self._agregar_registro(registro, "completada" + origen)
+
+        def al_cancelar():
+            al_finalizar()
+            self._agregar_registro(registro, "cancelada")
+            self.lbl_progreso.config(text="Análisis cancelado.")
             self.txt_results.configure(state='normal')
-            self.txt_results.delete(1.0, tk.END)
-            
-            self.txt_results.insert(tk.END, f"Iniciando análisis con {len(selected_columns)} variables seleccionadas...\n\n")
-            self.update_idletasks()
+            self.txt_results.insert(tk.END, "Análisis cancelado por el usuario.\n", 'warning')
+            self.txt_results.configure(state='disabled')
 
-            # --- 1. Limpieza de Datos (YA CARGADOS) ---
-            
-            # Quitar columnas 'Unnamed' si existen (buena práctica)
-            data_raw_cleaned = self.data_raw.loc[:, ~self.data_raw.columns.str.contains('^Unnamed')]
-            
-            # Verificar si las columnas seleccionadas existen
-            try:
-                # Usar .copy() para evitar SettingWithCopyWarning
-                data_numeric = data_raw_cleaned[selected_columns].copy()
-            except KeyError as e:
+        def al_error(e):
+            al_finalizar()
+            self._agregar_registro(registro, "error")
+            self.lbl_progreso.config(text="")
+            self.txt_results.configure(state='normal')
+            if isinstance(e, KeyError):
                 messagebox.showerror("Error de Columnas", f"Una de las columnas seleccionadas ({e}) no se pudo encontrar. Recargue el archivo.")
                 self.txt_results.insert(tk.END, f"ERROR: Columna no encontrada {e}.\n")
-                return
-            except Exception as e:
-                messagebox.showerror("Error de Selección", f"Ocurrió un error al seleccionar las columnas: {e}")
-                self.txt_results.insert(tk.END, f"ERROR: {e}.\n")
-                return
-                
-            column_names = data_numeric.columns.tolist()
-
-            # Forzar conversión a numérico y manejar errores
-            for col in data_numeric.columns:
-                data_numeric[col] = pd.to_numeric(data_numeric[col], errors='coerce')
-
-            original_rows = len(data_numeric)
-            # data_numeric ya fue 'droppeada' de NAs en la carga, pero volvemos a hacerlo por si acaso
-            rows_before_drop = len(data_numeric)
-            data_numeric = data_numeric.dropna()
-            cleaned_rows = len(data_numeric)
-            rows_dropped = rows_before_drop - cleaned_rows
-
-            self.txt_results.insert(tk.END, f"Se cargaron {original_rows} filas (para estas variables).\n")
-            if rows_dropped > 0:
-                self.txt_results.insert(tk.END, f"Se eliminaron {rows_dropped} filas con datos faltantes o no numéricos.\n", 'warning')
-            if cleaned_rows == 0:
-                messagebox.showerror("Error de Datos", "No quedaron filas válidas después de limpiar los datos. Revise las variables seleccionadas.")
-                self.txt_results.insert(tk.END, f"ERROR: No hay datos válidos para analizar.\n")
-                return
+            else:
+                messagebox.showerror("Error", f"Ocurrió un error inesperado durante el análisis: {e}")
+                self.txt_results.insert(tk.END, f"ERROR INESPERADO: {e}\n")
+            self.txt_results.configure(state='disabled')
 
-            self.txt_results.insert(tk.END, f"Analizando {cleaned_rows} filas y {len(column_names)} variables:\n")
-            self.txt_results.insert(tk.END, ", ".join(column_names) + "\n\n")
+        # Componentes a retener: con pocos y datos grandes solo se calculan esos
+        try:
+            n_componentes = max(1, int(self.n_components_var.get()))
+        except ValueError:
+            n_componentes = None
+
+        self.trabajo_analisis = TrabajoEnSegundoPlano(
+            self, self._calcular_analisis, self.fuente_datos, list(selected_columns), registro, n_componentes,
+            self.estadisticas, PRECISIONES[self.precision_var.get()], self.en_disco_var.get(), al_mensaje=al_mensaje, al_terminar=al_terminar,
+            al_cancelar=al_cancelar, al_error=al_error)
+        self.btn_cancelar.config(state=tk.NORMAL, command=self.trabajo_analisis.cancelar)
+        self.barra_progreso.config(mode='indeterminate')
+        self.barra_progreso.start(INTERVALO_SONDEO_MS)
+        self.trabajo_analisis.iniciar()
+
+    def _calcular_analisis(self, trabajo, fuente_datos, selected_columns, registro, n_componentes=None, estadisticas=None,
+                           precision="float64", en_disco=False):
+        """
+        Parte pesada del análisis: lee las columnas seleccionadas y llama a
+        acp.analizar_pca. Corre en el hilo del trabajo, así que no toca ningún
+        widget: informa la etapa con trabajo.publicar (y la mide en
+        'registro') y devuelve el ResultadoPCA para _mostrar_analisis. Una
+        selección ya analizada sale de self.cache_analisis sin recalcular, y
+        con las estadísticas del archivo ya calculadas no se lee ninguna fila,
+        salvo que se pida float32 o 'en_disco': esas opciones solo existen
+        cuando se leen las filas (el análisis por bloques de un archivo
+        grande tampoco las aplica; _mostrar_analisis lo avisa).
+        """
+        def etapa(nombre):
+            registro(nombre)
+            trabajo.publicar(nombre)
 
-            # --- 2. Matriz de Varianza-Covarianza (Datos Originales) ---
-            self.txt_results.insert(tk.END, "--- 1. Matriz de varianza-covarianza (Datos originales) ---\n", 'title')
-            cov_matrix = data_numeric.cov()
-            self.cov_matrix_df = cov_matrix
-            self.txt_results.insert(tk.END, self.cov_matrix_df.to_string(float_format="%.4f") + "\n\n")
+        def leyendo(filas):
+            registro.contar(filas, "filas")
+            trabajo.progreso(filas)
+            trabajo.publicar(f"Leyendo datos... {trabajo.avance:,} filas")
 
-            # --- 3. Estandarización ---
-            scaler = StandardScaler()
-            data_scaled = scaler.fit_transform(data_numeric)
+        try:
+            if estadisticas is not None and precision == "float64" and not en_disco:
+                return acp.analizar_pca_desde_estadisticas(estadisticas, selected_columns, etapa=etapa)
+            if self.cache_analisis is None:
+                self.cache_analisis = acp.CacheLRU()
+
+            if acp.usar_por_bloques(fuente_datos):
+                # Archivo grande: una pasada por bloques sin cargarlo en memoria
+                return acp.analizar_pca_por_bloques(fuente_datos, selected_columns, etapa=etapa, progreso=leyendo,
+                                                    cache=self.cache_analisis)
+
+            etapa("Leyendo datos...")
+            data_raw = fuente_datos.cargar(selected_columns, progreso=leyendo, precision=precision)
+            return acp.analizar_pca(data_raw, selected_columns, etapa=etapa, progreso=trabajo.progreso,
+                                    n_componentes=n_componentes, cache=self.cache_analisis,
+                                    precision=precision, en_disco=en_disco)
+        finally:
+            # Lo que falta (esperar a la ventana) no es parte del cálculo
+            registro.cerrar_etapa()
 
-            # --- 4. Análisis de Componentes Principales (PCA) ---
-            self.txt_results.insert(tk.END, "--- 2. Análisis de Componentes Principales (sobre datos estandarizados) ---\n", 'title')
-            
-            # Asegurarse de que n_components no sea mayor que las variables
-            n_features = data_scaled.shape[1]
-            if n_features == 0:
+    def _mostrar_analisis(self, resultado):
+        """Escribe en el panel de resultados el ResultadoPCA de _calcular_analisis."""
+        try:
+            self.txt_results.configure(state='normal')
+
+            if resultado.filas_limpias == 0:
+                messagebox.showerror("Error de Datos", "No quedaron filas válidas después de limpiar los datos. Revise las variables seleccionadas.")
+                for linea in acp.lineas_analisis(resultado, 1):
+                    self.txt_results.insert(tk.END, *linea)
+                return
+            if len(resultado.columnas) == 0:
                 messagebox.showerror("Error", "No hay variables (features) para analizar.")
                 return
 
-            # PCA() por defecto usa min(n_muestras, n_variables)
-            pca = PCA() 
-            self.data_transformed = pca.fit_transform(data_scaled)
-            self.n_components_pca = pca.n_components_
-            
+            self.cov_matrix_df = resultado.matriz_covarianza
+            self.pca_cov_matrix_df = resultado.matriz_covarianza_pca
+            self.data_transformed = resultado.datos_transformados
+            self.n_components_pca = resultado.n_componentes
+            self.modelo_pca = resultado.modelo
+
             # --- Actualizar 'to' del Spinbox ---
             if self.spin_n_components:
                 # El máximo de componentes es el número de variables que entran
-                max_comps_posibles = min(cleaned_rows, len(column_names))
+                max_comps_posibles = min(resultado.filas_limpias, len(resultado.columnas))
                 self.spin_n_components.config(to=max_comps_posibles)
                 try:
                     current_val = int(self.n_components_var.get())
@@ -535,25 +1158,7 @@ class AppPCA(tk.Tk):
                 except ValueError:
                     self.n_components_var.set("1")
 
-            explained_variance = pca.explained_variance_ratio_
-
-            self.txt_results.insert(tk.END, "Varianza explicada por cada componente:\n")
-            for i, var in enumerate(explained_variance):
-                self.txt_results.insert(tk.END, f"  Componente principal {i+1}: {var*100:6.2f}%\n")
-
-            # --- 5. Matriz de Covarianza de PCA ---
-            self.txt_results.insert(tk.END, "\n--- 3. Matriz de covarianza (Nuevas variables PCA) ---\n", 'title')
-            self.txt_results.insert(tk.END,
-                                 "Esta matriz muestra que las nuevas variables (Componentes Principales) no están correlacionadas entre sí (valores fuera de la diagonal son ~0).\nLa diagonal muestra la varianza de cada componente.\n\n",
-                                 'info')
-
-            pca_cov_matrix = np.cov(self.data_transformed, rowvar=False)
-            pc_names = [f"PC{i+1}" for i in range(self.n_components_pca)]
-            self.pca_cov_matrix_df = pd.DataFrame(pca_cov_matrix, columns=pc_names, index=pc_names)
-
-            self.txt_results.insert(tk.END, self.pca_cov_matrix_df.to_string(float_format="%.4f") + "\n\n")
-
-            # --- 6. Resultado de Reducción ---
+            # --- Componentes para el resultado de reducción ---
             try:
                 n_comps_display = int(self.n_components_var.get())
                 max_comps_spinbox = int(self.spin_n_components.cget('to'))
@@ -565,20 +1170,24 @@ class AppPCA(tk.Tk):
                 messagebox.showwarning("Valor Inválido", "El número de componentes debe ser un número entero. Usando 1.")
                 n_comps_display = 1
                 self.n_components_var.set("1")
-
-            self.txt_results.insert(tk.END, f"\n--- 4. Resultado de reducción a {n_comps_display} Componente(s) (para cálculo) ---\n", 'title')
-
-            info_kept = np.sum(explained_variance[:n_comps_display]) * 100
-            info_lost = 100.0 - info_kept
-
-            s_comps = "s" if n_comps_display > 1 else ""
-            s_pc = f"PC1 a PC{n_comps_display}" if n_comps_display > 1 else "PC1"
-
-            self.txt_results.insert(tk.END, f"\nPorcentaje de información (varianza) retenida por {s_pc}: \n", 'success')
-            self.txt_results.insert(tk.END, f"{info_kept:.2f}%\n\n", 'success')
-
-            self.txt_results.insert(tk.END, f"Porcentaje de información (varianza) PERDIDA al reducir a {n_comps_display} componente{s_comps}: \n", 'warning')
-            self.txt_results.insert(tk.END, f"{info_lost:.2f}%\n", 'warning')
+            if resultado.componentes_truncados and n_comps_display > resultado.n_componentes:
+                # Solo se calcularon los componentes pedidos al iniciar el análisis
+                n_comps_display = resultado.n_componentes
+                self.n_components_var.set(str(n_comps_display))
+
+            for linea in acp.lineas_analisis(resultado, n_comps_display, con_reduccion=False):
+                self.txt_results.insert(tk.END, *linea)
+            if PRECISIONES[self.precision_var.get()] != resultado.precision or \
+                    (self.en_disco_var.get() and not resultado.en_disco):
+                # Análisis por bloques: no hay datos estandarizados ni componentes en memoria que cambiar
+                self.txt_results.insert(tk.END, "Aviso: el archivo se analizó por bloques; la precisión elegida y "
+                                                "'Componentes en disco' no se aplicaron (análisis en float64).\n\n")
+            # La sección 4 va después de esta marca; _actualizar_reduccion la rehace
+            self.txt_results.mark_set("inicio_reduccion", tk.END)
+            self.txt_results.mark_gravity("inicio_reduccion", tk.LEFT)
+            for linea in acp.lineas_reduccion(resultado, n_comps_display):
+                self.txt_results.insert(tk.END, *linea)
+            self.resultado_pca = resultado
 
             # Habilitar TODOS los botones de resultados
             self.btn_ver_matriz.config(state=tk.NORMAL)
@@ -592,58 +1201,105 @@ class AppPCA(tk.Tk):
         finally:
             self.txt_results.configure(state='disabled')
 
+    def _actualizar_reduccion(self, *args):
+        """
+        Rehace la sección 4 (retención y pérdida) con el valor actual del
+        Spinbox usando el último resultado, sin volver a analizar.
+        """
+        if self.resultado_pca is None:
+            return
+        try:
+            n_comps = int(self.n_components_var.get())
+        except ValueError:
+            return # Campo vacío mientras se escribe
+        if not 1 <= n_comps <= int(float(self.spin_n_components.cget('to'))):
+            return
+
+        self.txt_results.configure(state='normal')
+        self.txt_results.delete("inicio_reduccion", tk.END)
+        for linea in acp.lineas_reduccion(self.resultado_pca, n_comps):
+            self.txt_results.insert(tk.END, *linea)
+        self.txt_results.configure(state='disabled')
+
     def guardar_datos_pca(self):
         """
-        Guarda TODOS los datos transformados por PCA en un nuevo archivo XLSX (Excel).
-        AHORA TAMBIÉN GUARDA LA SUMA (Y USA NOMBRE AUTOMÁTICO).
+        Guarda TODOS los componentes PCA y la columna COMPONENTE_SUMA, con
+        nombre automático, en el formato elegido en el diálogo (Excel,
+        Parquet, CSV o NumPy). Se escribe en segundo plano y por bloques; si el
+        análisis no dejó los datos en memoria (por bloques o desde las
+        estadísticas), se relee el archivo y se proyecta bloque a bloque.
         """
-        if self.data_transformed is None or self.n_components_pca == 0:
+        if self.modelo_pca is None and (self.data_transformed is None or self.n_components_pca == 0):
             messagebox.showwarning("Sin Datos", "No hay datos transformados para guardar. Ejecute el análisis primero.")
             return
+        if self.trabajo_analisis is not None and self.trabajo_analisis.activo:
+            messagebox.showwarning("Análisis en curso", "Espere a que termine el análisis actual o cancélelo.")
+            return
 
         n_comps_to_save = self.n_components_pca
 
-        # --- 5. MODIFICACIÓN PARA NOMBRE AUTOMÁTICO ---
-        if self.loaded_filepath:
-            # Obtener el nombre base del archivo cargado (ej. "mi_archivo")
-            base_name = os.path.basename(self.loaded_filepath)
-            base_name = os.path.splitext(base_name)[0]
-        else:
-            base_name = "datos_analizados" # Nombre de fallback
-
-        num_vars = self.selected_variable_count
-        
-        # Crear el nombre de archivo sugerido (sin extensión)
-        suggested_filename = f"{base_name}_ACP_{num_vars}Variables"
-        # ---------------------------------------------------
-
         filepath = filedialog.asksaveasfilename(
             defaultextension=".xlsx", # La extensión se añade si no se escribe
-            filetypes=[("Archivos Excel", "*.xlsx"), ("Todos los archivos", "*.*")],
+            filetypes=[(descripcion, f"*{extension}") for extension, descripcion in FORMATOS_EXPORTACION.items()],
             title="Guardar TODOS los datos de PCA como...",
-            initialfile=suggested_filename # <-- AÑADIR EL NOMBRE SUGERIDO
+            initialfile=acp.nombre_exportacion(self.loaded_filepath, self.selected_variable_count)
         )
-
         if not filepath:
             return
 
-        try:
-            # --- 1. Crear el DataFrame con todos los PCs ---
-            pc_names = [f"PC{i+1}" for i in range(n_comps_to_save)]
-            data_to_save = self.data_transformed[:, :n_comps_to_save]
-            df_to_save = pd.DataFrame(data=data_to_save, columns=pc_names)
+        registro = self._nuevo_registro(f"Exportación ({acp.formato_exportacion(filepath)})")
 
-            # --- 2. AÑADIR LA SUMA ---
-            df_to_save['COMPONENTE_SUMA'] = df_to_save.sum(axis=1)
+        def exportar(trabajo, fuente_datos, modelo, data_transformed, ruta):
+            def escritas(filas):
+                registro.contar(filas, "filas")
+                trabajo.progreso(filas)
 
-            # 3. Guardar en Excel
-            df_to_save.to_excel(filepath, index=False, engine='openpyxl')
+            registro("Escribiendo componentes" if data_transformed is not None
+                     else "Releyendo, proyectando y escribiendo por bloques")
+            try:
+                if data_transformed is not None:
+                    return acp.exportar_componentes(data_transformed, ruta, progreso=escritas)
+                return acp.exportar_componentes_por_bloques(fuente_datos, modelo, ruta, progreso=escritas)
+            finally:
+                registro.cerrar_etapa()
+
+        def al_finalizar(texto):
+            self.barra_progreso.stop()
+            self.barra_progreso.config(mode='determinate', value=0)
+            self.btn_cancelar.config(state=tk.DISABLED)
+            self.btn_guardar_pca.config(state=tk.NORMAL)
+            self.lbl_progreso.config(text=texto)
+
+        def al_progreso(avance, segundos):
+            velocidad = avance / segundos if segundos > 0 else 0.0
+            self.lbl_progreso.config(text=f"Exportando componentes... {avance:,} filas · {velocidad:,.0f} filas/s · {segundos:.1f} s")
+
+        def al_terminar(filas):
+            self._agregar_registro(registro)
+            al_finalizar(f"Exportación terminada: {filas:,} filas en {time.perf_counter() - self.trabajo_analisis.inicio:.2f} s")
             messagebox.showinfo("Éxito", f"TODOS los {n_comps_to_save} componentes PCA (y la columna 'COMPONENTE_SUMA') guardados exitosamente en:\n{filepath}")
 
-        except ImportError:
-             messagebox.showerror("Error de Librería", "Para guardar como .xlsx, necesitas instalar la librería 'openpyxl'.\n\nEjecuta en tu terminal: pip install openpyxl")
-        except Exception as e:
-            messagebox.showerror("Error al Guardar", f"Ocurrió un error al guardar el archivo:\n{e}")
+        def al_error(e):
+            self._agregar_registro(registro, "error")
+            al_finalizar("")
+            if isinstance(e, ImportError):
+                messagebox.showerror("Error de Librería", "Para guardar como .parquet, necesitas instalar la librería 'pyarrow'.\n\nEjecuta en tu terminal: pip install pyarrow")
+            else:
+                messagebox.showerror("Error al Guardar", f"Ocurrió un error al guardar el archivo:\n{e}")
+
+        def al_cancelar():
+            self._agregar_registro(registro, "cancelada")
+            al_finalizar("Exportación cancelada.")
+
+        self.trabajo_analisis = TrabajoEnSegundoPlano(
+            self, exportar, self.fuente_datos, self.modelo_pca, self.data_transformed, filepath,
+            al_progreso=al_progreso, al_terminar=al_terminar,
+            al_cancelar=al_cancelar, al_error=al_error)
+        self.btn_guardar_pca.config(state=tk.DISABLED)
+        self.btn_cancelar.config(state=tk.NORMAL, command=self.trabajo_analisis.cancelar)
+        self.barra_progreso.config(mode='indeterminate')
+        self.barra_progreso.start(INTERVALO_SONDEO_MS)
+        self.trabajo_analisis.iniciar()
 
     # --- (Las funciones de mostrar matriz no cambian) ---
 
@@ -677,7 +1333,8 @@ class AppPCA(tk.Tk):
 
     def _crear_ventana_generica_matriz(self, titulo, label_text, matrix_df):
         """
-        Función auxiliar para crear una ventana modal genérica para mostrar una matriz.
+        Función auxiliar para crear una ventana modal genérica para mostrar
+        una matriz (en un VisorMatriz).
         """
         win_matriz = tk.Toplevel(self)
         win_matriz.title(titulo)
@@ -695,39 +1352,17 @@ class AppPCA(tk.Tk):
         bottom_frame_matriz = tk.Frame(win_matriz, bg=self.BG_COLOR)
         bottom_frame_matriz.pack(side="bottom", fill="x", pady=10)
 
-        text_frame_matriz = tk.Frame(win_matriz, bg=self.BG_COLOR)
-        text_frame_matriz.pack(fill="both", expand=True, padx=20, pady=10)
-
-        xscrollbar = tk.Scrollbar(text_frame_matriz, orient=tk.HORIZONTAL)
-        yscrollbar = tk.Scrollbar(text_frame_matriz, orient=tk.VERTICAL)
+        # Solo se dibujan las celdas visibles: matrices de cientos de variables abren al instante
+        visor = VisorMatriz(win_matriz, matrix_df, self.RESULT_FONT, bg=self.TEXT_BG, fg=self.FG_COLOR,
+                            bg_encabezado=self.BG_COLOR)
+        visor.pack(fill="both", expand=True, padx=20, pady=10)
 
-        txt_matriz = tk.Text(text_frame_matriz,
-                             wrap=tk.NONE,
-                             font=self.RESULT_FONT,
-                             bg=self.TEXT_BG,
-                             fg=self.FG_COLOR,
-                             relief=tk.FLAT,
-                             borderwidth=0,
-                             xscrollcommand=xscrollbar.set,
-                             yscrollcommand=yscrollbar.set)
-
-        xscrollbar.config(command=txt_matriz.xview)
-        yscrollbar.config(command=txt_matriz.yview)
-
-        text_frame_matriz.grid_rowconfigure(0, weight=1)
-        text_frame_matriz.grid_columnconfigure(0, weight=1)
-
-        txt_matriz.grid(row=0, column=0, sticky="nsew")
-        yscrollbar.grid(row=0, column=1, sticky="ns")
-        xscrollbar.grid(row=1, column=0, sticky="ew")
-
-        try:
-            matrix_string = matrix_df.to_string(float_format="%.4f")
-        except AttributeError:
-             matrix_string = str(matrix_df)
-
-        txt_matriz.insert(tk.END, matrix_string)
-        txt_matriz.configure(state='disabled')
+        mapa_calor_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(bottom_frame_matriz, text="Mapa de calor", variable=mapa_calor_var,
+                       command=lambda: visor.activar_mapa_calor(mapa_calor_var.get()),
+                       font=self.DESC_FONT, bg=self.BG_COLOR, fg=self.FG_COLOR,
+                       selectcolor=self.TEXT_BG, activebackground=self.BG_COLOR,
+                       activeforeground=self.FG_COLOR).pack(pady=(0, 5))
 
         btn_close = tk.Button(bottom_frame_matriz,
                                text="Cerrar",
@@ -748,7 +1383,7 @@ class AppPCA(tk.Tk):
     # --- NUEVOS MÉTODOS PARA COMBINACIONES ---
     def abrir_ventana_combinaciones(self):
         """Abre una ventana emergente y calcula las mejores combinaciones."""
-        if self.data_raw is None:
+        if self.fuente_datos is None:
             return
 
         # Crear ventana
@@ -772,147 +1407,357 @@ class AppPCA(tk.Tk):
 
         # --- Frame para los botones (Cerrar y Descargar) ---
         btn_frame = tk.Frame(win_combo, bg=self.BG_COLOR)
-        btn_frame.pack(pady=10)
+        btn_frame.pack(side="bottom", pady=10, before=txt_combo)
+
+        # Barra de progreso con velocidad, ETA y botón Cancelar (encima de los botones)
+        controles = self._crear_barra_progreso(win_combo)
+        controles[0].master.pack_configure(side="bottom", padx=20, before=txt_combo)
+
+        # Trabajo en curso de esta ventana (para cancelar al cerrar) e índice de la última búsqueda
+        estado = {'trabajo': None, 'indice': None}
+
+        def cerrar():
+            if estado['trabajo'] is not None:
+                estado['trabajo'].cancelar()
+            win_combo.destroy()
+
+        win_combo.protocol("WM_DELETE_WINDOW", cerrar)
 
         # Botón Descargar Reporte
         tk.Button(btn_frame, text="Descargar Informe (.txt)", font=self.BUTTON_FONT, 
                   bg="#2196F3", fg=self.FG_COLOR, # Azul
                   activebackground="#1976D2", activeforeground=self.FG_COLOR,
-                  command=lambda: self.descargar_reporte(txt_combo), 
+                  command=lambda: self.descargar_reporte(txt_combo, estado['trabajo']), 
                   relief=tk.FLAT).pack(side="left", padx=10)
 
         # Botón Cerrar
         tk.Button(btn_frame, text="Cerrar", font=self.BUTTON_FONT, 
                   bg=self.BTN_EXIT_BG, fg=self.FG_COLOR,
-                  command=win_combo.destroy, relief=tk.FLAT).pack(side="left", padx=10)
+                  command=cerrar, relief=tk.FLAT).pack(side="left", padx=10)
 
-        # Ejecutar cálculo
-        self.after(100, lambda: self.calcular_mejores_combinaciones(txt_combo))
-        
-    def descargar_reporte(self, text_widget):
-        """Guarda el contenido del widget de texto en un archivo .txt automáticamente."""
-        content = text_widget.get("1.0", tk.END).strip()
-        
-        if not content or "Calculando..." in content:
-            messagebox.showwarning("Espera", "Espera a que termine el cálculo antes de descargar.")
-            return
+        # --- Frame para el modo de búsqueda ---
+        modo_frame = tk.Frame(win_combo, bg=self.BG_COLOR)
+        modo_frame.pack(before=txt_combo, pady=(0, 5))
 
-        folder_name = "Mejores Combinaciones"
-        
-        # 1. Crear carpeta si no existe
-        if not os.path.exists(folder_name):
-            try:
-                os.makedirs(folder_name)
-            except OSError as e:
-                messagebox.showerror("Error", f"No se pudo crear la carpeta: {e}")
+        tk.Label(modo_frame, text="Modo de búsqueda:", font=self.DESC_FONT,
+                 bg=self.BG_COLOR, fg=self.FG_COLOR).pack(side="left", padx=(0, 10))
+
+        modo_var = tk.StringVar(value="Automático")
+        opt_modo = tk.OptionMenu(modo_frame, modo_var, *MODOS_BUSQUEDA.keys())
+        opt_modo.config(font=self.DESC_FONT, bg=self.TEXT_BG, fg=self.FG_COLOR,
+                        activebackground=self.BTN_ACTIVE, relief=tk.FLAT, highlightthickness=0)
+        opt_modo.pack(side="left")
+
+        tk.Label(modo_frame, text="Ancho del haz:", font=self.DESC_FONT,
+                 bg=self.BG_COLOR, fg=self.FG_COLOR).pack(side="left", padx=(20, 10))
+
+        ancho_var = tk.StringVar(value=str(ANCHO_HAZ))
+        tk.Spinbox(modo_frame, from_=1, to=1000, textvariable=ancho_var, width=5,
+                   font=self.DESC_FONT, bg=self.TEXT_BG, fg=self.FG_COLOR,
+                   relief=tk.FLAT, bd=0, buttonbackground=self.BTN_COLOR).pack(side="left")
+
+        tk.Label(modo_frame, text="Procesos:", font=self.DESC_FONT,
+                 bg=self.BG_COLOR, fg=self.FG_COLOR).pack(side="left", padx=(20, 10))
+
+        procesos_var = tk.StringVar(value=str(PROCESOS_POR_DEFECTO))
+        tk.Spinbox(modo_frame, from_=1, to=PROCESOS_POR_DEFECTO, textvariable=procesos_var, width=4,
+                   font=self.DESC_FONT, bg=self.TEXT_BG, fg=self.FG_COLOR,
+                   relief=tk.FLAT, bd=0, buttonbackground=self.BTN_COLOR).pack(side="left")
+
+        def guardar_indice_ventana(indice):
+            estado['indice'] = indice
+
+        def calcular(modo="automatico", ancho=ANCHO_HAZ, procesos=PROCESOS_POR_DEFECTO, n_mejores=TOP_N_COMBINACIONES):
+            if estado['trabajo'] is not None and estado['trabajo'].activo:
+                messagebox.showwarning("Espera", "Espera a que termine el cálculo o cancélalo.", parent=win_combo)
                 return
+            txt_combo.delete(1.0, tk.END)
+            estado['trabajo'] = self.calcular_mejores_combinaciones(
+                txt_combo, modo, ancho, procesos, controles, n_mejores,
+                al_indice=guardar_indice_ventana if indice_var.get() else None)
 
-        # 2. Obtener nombre base del archivo CSV analizado
-        if self.loaded_filepath:
-            base_name = os.path.basename(self.loaded_filepath)
-            base_name = os.path.splitext(base_name)[0] # Quitar extensión .csv
-        else:
-            base_name = "datos_desconocidos"
+        tk.Label(modo_frame, text="Top N:", font=self.DESC_FONT,
+                 bg=self.BG_COLOR, fg=self.FG_COLOR).pack(side="left", padx=(20, 10))
+
+        top_var = tk.StringVar(value=str(TOP_N_COMBINACIONES))
+        tk.Spinbox(modo_frame, from_=1, to=100, textvariable=top_var, width=4,
+                   font=self.DESC_FONT, bg=self.TEXT_BG, fg=self.FG_COLOR,
+                   relief=tk.FLAT, bd=0, buttonbackground=self.BTN_COLOR).pack(side="left")
 
-        # 3. Calcular el número del reporte
-        # Buscamos archivos que empiecen con "Reporte_No_" y contengan el nombre base
-        current_files = [f for f in os.listdir(folder_name) 
-                         if f.startswith("Reporte_No_") and base_name in f and f.endswith(".txt")]
+        def recalcular():
+            try:
+                n_mejores = max(1, int(top_var.get()))
+            except ValueError:
+                n_mejores = TOP_N_COMBINACIONES
+                top_var.set(str(TOP_N_COMBINACIONES))
+            try:
+                ancho = max(1, int(ancho_var.get()))
+            except ValueError:
+                ancho = ANCHO_HAZ
+                ancho_var.set(str(ANCHO_HAZ))
+            try:
+                procesos = max(1, int(procesos_var.get()))
+            except ValueError:
+                procesos = PROCESOS_POR_DEFECTO
+                procesos_var.set(str(PROCESOS_POR_DEFECTO))
+            calcular(MODOS_BUSQUEDA[modo_var.get()], ancho, procesos, n_mejores)
+
+        tk.Button(modo_frame, text="Recalcular", font=self.BUTTON_FONT,
+                  bg=self.BTN_COLOR, fg=self.FG_COLOR,
+                  activebackground=self.BTN_ACTIVE, activeforeground=self.FG_COLOR,
+                  command=recalcular, relief=tk.FLAT).pack(side="left", padx=(20, 0))
+
+        # --- Frame para el índice de combinaciones (consultas sin repetir la búsqueda) ---
+        consulta_frame = tk.Frame(win_combo, bg=self.BG_COLOR)
+        consulta_frame.pack(before=txt_combo, pady=(0, 5))
+
+        indice_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(consulta_frame, text="Guardar índice", variable=indice_var,
+                       font=self.DESC_FONT, bg=self.BG_COLOR, fg=self.FG_COLOR, selectcolor=self.TEXT_BG,
+                       activebackground=self.BG_COLOR, activeforeground=self.FG_COLOR,
+                       highlightthickness=0).pack(side="left")
+
+        tk.Label(consulta_frame, text="Contiene:", font=self.DESC_FONT,
+                 bg=self.BG_COLOR, fg=self.FG_COLOR).pack(side="left", padx=(20, 10))
+        contiene_var = tk.StringVar()
+        tk.Entry(consulta_frame, textvariable=contiene_var, width=24, font=self.DESC_FONT,
+                 bg=self.TEXT_BG, fg=self.FG_COLOR, insertbackground=self.FG_COLOR,
+                 relief=tk.FLAT).pack(side="left")
+
+        tk.Label(consulta_frame, text="k:", font=self.DESC_FONT,
+                 bg=self.BG_COLOR, fg=self.FG_COLOR).pack(side="left", padx=(20, 10))
+        k_var = tk.StringVar(value="0") # 0 = todos los tamaños
+        tk.Spinbox(consulta_frame, from_=0, to=MAX_K_COMBINACIONES, textvariable=k_var, width=3,
+                   font=self.DESC_FONT, bg=self.TEXT_BG, fg=self.FG_COLOR,
+                   relief=tk.FLAT, bd=0, buttonbackground=self.BTN_COLOR).pack(side="left")
+
+        tk.Label(consulta_frame, text="Mínimo %:", font=self.DESC_FONT,
+                 bg=self.BG_COLOR, fg=self.FG_COLOR).pack(side="left", padx=(20, 10))
+        minimo_var = tk.StringVar()
+        tk.Entry(consulta_frame, textvariable=minimo_var, width=6, font=self.DESC_FONT,
+                 bg=self.TEXT_BG, fg=self.FG_COLOR, insertbackground=self.FG_COLOR,
+                 relief=tk.FLAT).pack(side="left")
+
+        tk.Button(consulta_frame, text="Consultar", font=self.BUTTON_FONT,
+                  bg=self.BTN_COLOR, fg=self.FG_COLOR,
+                  activebackground=self.BTN_ACTIVE, activeforeground=self.FG_COLOR,
+                  command=lambda: self.consultar_indice_combinaciones(
+                      win_combo, estado['indice'], contiene_var.get(), k_var.get(), minimo_var.get()),
+                  relief=tk.FLAT).pack(side="left", padx=(20, 0))
+
+        # Ejecutar cálculo (el modo automático elige exacto o aproximado según el tamaño)
+        self.after(100, calcular)
         
-        next_number = len(current_files) + 1
+    def descargar_reporte(self, text_widget, trabajo=None):
+        """Guarda el contenido del widget de texto en un archivo .txt automáticamente."""
+        content = text_widget.get("1.0", tk.END).strip()
         
-        # 4. Construir nombre final
-        filename = f"Reporte_No_{next_number}_{base_name}.txt"
-        full_path = os.path.join(folder_name, filename)
+        if not content or "Calculando..." in content or (trabajo is not None and trabajo.activo):
+            messagebox.showwarning("Espera", "Espera a que termine el cálculo antes de descargar.")
+            return
 
-        # 5. Guardar archivo
         try:
-            with open(full_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            
+            full_path = acp.guardar_informe(content, self.loaded_filepath)
             messagebox.showinfo("Informe Guardado", f"Se ha guardado el reporte exitosamente en:\n\n{full_path}")
-            
-            # Opcional: Abrir la carpeta automáticamente para el usuario
-            # os.startfile(folder_name) 
-            
         except Exception as e:
             messagebox.showerror("Error al guardar", f"No se pudo guardar el archivo:\n{e}")
 
-    def calcular_mejores_combinaciones(self, text_widget):
+    def calcular_mejores_combinaciones(self, text_widget, modo="automatico", ancho_haz=ANCHO_HAZ, procesos=PROCESOS_POR_DEFECTO,
+                                       controles=None, n_mejores=TOP_N_COMBINACIONES, al_indice=None):
         """
-        Lógica de fuerza bruta: Prueba combinaciones de k variables y encuentra
-        cuál grupo tiene la mayor varianza explicada en su primera componente.
+        Busca, para cada k, el grupo de k variables con la mayor varianza
+        explicada en sus primeras componentes (tantas como indica el selector
+        de componentes a retener). La búsqueda corre en segundo plano y cada
+        resultado se escribe en 'text_widget' en cuanto está listo.
+
+        Args:
+            text_widget: Widget de texto donde se escribe el informe.
+            modo (str): Valor de MODOS_BUSQUEDA; "automatico" elige entre la
+                búsqueda exacta y la aproximada según el número de combinaciones.
+            ancho_haz (int): Ancho de la búsqueda en haz.
+            procesos (int): Procesos para la enumeración exacta en paralelo.
+            controles (tuple): (barra, etiqueta, botón cancelar) creados con
+                _crear_barra_progreso; opcional.
+            n_mejores (int): Subconjuntos listados por cada k.
+            al_indice (callable): Opcional; si se da, la búsqueda registra todas
+                las combinaciones puntuadas, guarda el índice junto a los
+                informes y al terminar se lo pasa (acp.IndiceCombinaciones).
+
+        Returns:
+            TrabajoEnSegundoPlano: El trabajo iniciado, o None si no se pudo iniciar.
         """
         text_widget.insert(tk.END, "Calculando... por favor espere.\n\n")
-        self.update_idletasks()
 
-        # 1. Obtener variables disponibles (las que están chequeadas en el sidebar)
-        selected_source_cols = []
-        for i, var in enumerate(self.column_vars):
-            if var.get():
-                selected_source_cols.append(self.all_column_names[i])
+        # 1. Obtener variables disponibles (las que están marcadas en el sidebar)
+        selected_source_cols = self.lista_variables.seleccionadas()
 
-        n_total = len(selected_source_cols)
-        
-        if n_total < 2:
+        if len(selected_source_cols) < 2:
             text_widget.insert(tk.END, "Error: Necesitas seleccionar al menos 2 variables en el panel lateral para hacer combinaciones.")
-            return
+            return None
 
-        # Limpiar datos base
+        # Componentes cuya retención se maximiza: los mismos que se retienen en el análisis
         try:
-            data_clean = self.data_raw[selected_source_cols].copy()
-            data_clean = data_clean.select_dtypes(include=[np.number]).dropna()
-        except Exception as e:
+            n_componentes = max(1, int(self.n_components_var.get()))
+        except ValueError:
+            n_componentes = 1
+
+        barra, etiqueta, btn_cancelar = controles if controles else (None, None, None)
+        total = {'combinaciones': None}
+        registro = self._nuevo_registro(f"Combinaciones ({len(selected_source_cols)} variables, modo {modo})")
+
+        def al_mensaje(tipo, *datos):
+            if tipo == "limpiar":
+                text_widget.delete(1.0, tk.END)
+            elif tipo == "total":
+                total['combinaciones'] = datos[0]
+                if barra is not None and datos[0] is None:
+                    barra.config(mode='indeterminate')
+                    barra.start(INTERVALO_SONDEO_MS)
+            elif tipo == "texto":
+                text_widget.insert(tk.END, *datos)
+                text_widget.see(tk.END)
+
+        def al_progreso(avance, segundos):
+            if etiqueta is not None:
+                etiqueta.config(text=acp.formatear_progreso(avance, total['combinaciones'], segundos))
+            if barra is not None and total['combinaciones']:
+                barra.config(value=min(avance / total['combinaciones'], 1.0))
+
+        def al_finalizar(texto):
+            if barra is not None:
+                barra.stop()
+                barra.config(mode='determinate', value=1.0 if texto.startswith("Terminado") else 0)
+            if etiqueta is not None:
+                etiqueta.config(text=texto)
+            if btn_cancelar is not None:
+                btn_cancelar.config(state=tk.DISABLED)
+
+        def al_terminar(resultado):
+            if al_indice is not None and resultado.indice is not None:
+                al_indice(resultado.indice)
+            self._agregar_registro(registro, "completada (desde caché)" if resultado.desde_cache else "completada")
+            if resultado.desde_cache:
+                al_finalizar(f"Terminado: resultado guardado de una búsqueda anterior ({time.perf_counter() - trabajo.inicio:.2f} s)")
+            else:
+                al_finalizar(f"Terminado: {acp.formatear_progreso(trabajo.avance, None, time.perf_counter() - trabajo.inicio)}")
+
+        def al_cancelar():
+            self._agregar_registro(registro, "cancelada")
+            al_finalizar("Búsqueda cancelada.")
+            text_widget.insert(tk.END, "\n" + "="*60 + "\nBúsqueda cancelada por el usuario.")
+
+        def al_error(e):
+            self._agregar_registro(registro, "error")
+            al_finalizar("")
             text_widget.insert(tk.END, f"Error en los datos: {e}")
-            return
 
-        text_widget.delete(1.0, tk.END)
-        text_widget.insert(tk.END, f"Analizando combinaciones posibles desde {n_total} variables base...\n")
-        text_widget.insert(tk.END, "-"*60 + "\n", 'info')
+        trabajo = TrabajoEnSegundoPlano(
+            text_widget, self._buscar_combinaciones, self.fuente_datos, selected_source_cols,
+            modo, ancho_haz, procesos, n_mejores, registro, n_componentes, al_indice is not None,
+            al_mensaje=al_mensaje, al_progreso=al_progreso, al_terminar=al_terminar,
+            al_cancelar=al_cancelar, al_error=al_error)
+        if barra is not None:
+            barra.config(mode='determinate', value=0)
+        if btn_cancelar is not None:
+            btn_cancelar.config(state=tk.NORMAL, command=trabajo.cancelar)
+        trabajo.iniciar()
+        return trabajo
+
+    def _buscar_combinaciones(self, trabajo, fuente_datos, selected_source_cols, modo, ancho_haz, procesos, n_mejores,
+                              registro, n_componentes=1, registrar_indice=False):
+        """
+        Parte pesada de calcular_mejores_combinaciones (ver
+        acp.buscar_combinaciones_archivo). Corre en el hilo del trabajo: el
+        informe se envía línea a línea con trabajo.publicar y las etapas se
+        miden en 'registro'. Las búsquedas ya hechas sobre el mismo archivo
+        salen de self.cache_disco sin leerlo. Con registrar_indice el índice
+        de combinaciones se guarda con acp.guardar_indice.
+        """
+        if self.cache_disco is None:
+            self.cache_disco = acp.CacheDisco()
+        n_total = len(selected_source_cols)
 
-        # 2. Bucle de 2 a 9 variables
-        max_k = min(9, n_total) # No podemos buscar 9 si solo tienes 5 variables
-        
-        for k in range(2, max_k + 1):
-            best_variance = -1.0
-            best_cols = None
-            
-            # Generar todas las combinaciones de tamaño k
-            # ADVERTENCIA: Si n_total es muy grande (>20), esto puede tardar.
-            combos = list(combinations(selected_source_cols, k))
-            
-            if len(combos) > 5000:
-                 text_widget.insert(tk.END, f"Salatando k={k} (demasiadas combinaciones: {len(combos)})...\n")
-                 continue
-
-            for cols in combos:
-                # Subconjunto de datos
-                sub_data = data_clean[list(cols)]
-                
-                # Estandarizar
-                scaler = StandardScaler()
-                sub_scaled = scaler.fit_transform(sub_data)
-                
-                # PCA (solo necesitamos ver la varianza del primer componente para evaluar "fuerza")
-                pca = PCA(n_components=1)
-                pca.fit(sub_scaled)
-                
-                var_ratio = pca.explained_variance_ratio_[0]
-                
-                if var_ratio > best_variance:
-                    best_variance = var_ratio
-                    best_cols = cols
-
-            # 3. Imprimir resultado para este k
-            if best_cols:
-                porcentaje = best_variance * 100
-                text_widget.insert(tk.END, f"\nMejores {k} Variables:\n", 'header')
-                text_widget.insert(tk.END, f"Retención (PC1): {porcentaje:.2f}%\n")
-                text_widget.insert(tk.END, f"Variables: {', '.join(best_cols)}\n", 'var_list')
-                text_widget.see(tk.END)
-                self.update_idletasks() # Mantiene la UI viva
+        def al_inicio(resultado):
+            registro("Buscando combinaciones")
+            trabajo.publicar("limpiar")
+            for linea in acp.lineas_encabezado_combinaciones(resultado):
+                trabajo.publicar("texto", *linea)
+            # El total solo se conoce de antemano en modo exacto
+            trabajo.publicar("total", acp.total_combinaciones(n_total) if resultado.modo in acp.MODOS_EXACTOS else None)
+
+        def al_resultado(resultado_k):
+            for linea in acp.lineas_resultado_k(resultado_k, n_total, n_componentes):
+                trabajo.publicar("texto", *linea)
+            if resultado_k.metodo in acp.METODOS_EXACTOS:
+                # La poda evalúa menos de C(n, k): la barra salta al final de este k
+                trabajo.avance = max(trabajo.avance, acp.total_combinaciones(n_total, resultado_k.k))
+
+        def evaluadas(n=0):
+            registro.contar(n, "combinaciones evaluadas")
+            trabajo.progreso(n)
+
+        def leidas(filas):
+            # Leer las columnas no cuenta como combinaciones evaluadas: solo se revisa la cancelación
+            registro.contar(filas, "filas")
+            trabajo.progreso()
+
+        registro("Leyendo datos y calculando la correlación")
+        try:
+            resultado = acp.buscar_combinaciones_archivo(
+                fuente_datos, selected_source_cols, modo, MAX_K_COMBINACIONES, ancho_haz, procesos, n_mejores,
+                evaluadas, al_inicio, al_resultado, cache_disco=self.cache_disco, progreso_lectura=leidas,
+                n_componentes=n_componentes, registrar_indice=registrar_indice)
+            if resultado.indice is not None:
+                registro("Guardando el índice de combinaciones")
+                try:
+                    ruta = acp.guardar_indice(resultado.indice, fuente_datos.ruta)
+                    trabajo.publicar("texto", f"\nÍndice de {len(resultado.indice):,} combinaciones guardado en: {ruta}\n", 'info')
+                except OSError as e:
+                    trabajo.publicar("texto", f"\nNo se pudo guardar el índice de combinaciones: {e}\n", 'info')
+        finally:
+            registro.cerrar_etapa()
+        for linea in acp.lineas_cierre_combinaciones(resultado):
+            trabajo.publicar("texto", *linea)
+        return resultado
+
+    def consultar_indice_combinaciones(self, parent, indice, contiene, k, minimo):
+        """
+        Muestra en una ventana las combinaciones del índice de la última
+        búsqueda que cumplen la consulta (sin repetir la búsqueda).
+
+        Args:
+            parent: Ventana de combinaciones.
+            indice (acp.IndiceCombinaciones): Índice de la búsqueda, o None.
+            contiene (str): Variables que deben estar, separadas por comas.
+            k (str): Tamaño de las combinaciones ("0" = todos).
+            minimo (str): Retención mínima en %, o vacío.
+        """
+        if indice is None:
+            messagebox.showwarning("Sin índice", "Marca 'Guardar índice' y recalcula para poder consultar.", parent=parent)
+            return
+        try:
+            tamano = int(k) if k.strip() else 0
+            minimo_proporcion = float(minimo.replace(",", ".")) / 100 if minimo.strip() else None
+        except ValueError:
+            messagebox.showwarning("Consulta", "k debe ser un entero y el mínimo un porcentaje.", parent=parent)
+            return
+        variables = [nombre.strip() for nombre in contiene.split(",") if nombre.strip()]
+        try:
+            resultados = indice.consultar(k=tamano or None, contiene=variables, minimo=minimo_proporcion,
+                                          limite=MAX_FILAS_CONSULTA)
+        except KeyError as e:
+            messagebox.showwarning("Consulta", f"La variable {e} no está en la búsqueda.", parent=parent)
+            return
 
-        text_widget.insert(tk.END, "\n" + "="*60 + "\nAnálisis Finalizado.")
+        win_consulta = tk.Toplevel(parent)
+        win_consulta.title("Consulta del índice de combinaciones")
+        win_consulta.geometry("700x400")
+        win_consulta.configure(bg=self.BG_COLOR)
+        txt_consulta = scrolledtext.ScrolledText(win_consulta, wrap=tk.WORD, font=self.RESULT_FONT,
+                                                 bg=self.TEXT_BG, fg=self.FG_COLOR, relief=tk.FLAT)
+        txt_consulta.pack(fill="both", expand=True, padx=20, pady=10)
+        txt_consulta.insert(tk.END, acp.formatear_consulta(indice, resultados, tamano or None))
+        txt_consulta.configure(state='disabled')
 
 
 if __name__ == "__main__":
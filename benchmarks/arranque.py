@@ -0,0 +1,86 @@
+"""
+Presupuesto de tiempo de arranque de la ventana.
+
+Importa el script de la interfaz en un proceso nuevo con 'python -X importtime'
+y comprueba que (1) el tiempo acumulado de importación no pase de
+PRESUPUESTO_ARRANQUE_MS y (2) no se cargue ninguno de los módulos pesados:
+esos se importan en segundo plano una vez abierta la ventana.
+
+Uso:
+    python benchmarks/arranque.py [--presupuesto MS] [--repeticiones N]
+
+Devuelve código 1 si se incumple el presupuesto.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULO_INTERFAZ = "análisis_de_componentes_principales"
+PRESUPUESTO_ARRANQUE_MS = 200 # Importación completa del script de la interfaz (tkinter incluido)
+MODULOS_PESADOS = ("numpy", "pandas", "sklearn", "scipy")
+REPETICIONES = 5 # Se toma la mejor para no medir ruido del sistema
+
+
+def medir_importacion(modulo):
+    """
+    Importa 'modulo' en un intérprete nuevo con -X importtime.
+
+    Returns:
+        tuple: (ms acumulados de los imports de primer nivel,
+                {módulo: ms acumulados} de todos los imports)
+    """
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True, encoding="utf-8", check=True).stderr
+
+    tiempos = {}
+    total_us = 0
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        if not acumulado.strip().isdigit():
+            continue # Encabezado de la tabla
+        acumulado_us = int(acumulado)
+        tiempos[nombre.strip()] = acumulado_us / 1000
+        # Los imports anidados vienen sangrados; solo los de primer nivel suman al total
+        if not nombre[1:].startswith(" "):
+            total_us += acumulado_us
+    return total_us / 1000, tiempos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--presupuesto", type=float, default=PRESUPUESTO_ARRANQUE_MS,
+                        help=f"Milisegundos permitidos (por defecto {PRESUPUESTO_ARRANQUE_MS}).")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    args = parser.parse_args(argv)
+
+    # La primera importación puede incluir la compilación a .pyc: se descarta
+    medir_importacion(MODULO_INTERFAZ)
+    mediciones = [medir_importacion(MODULO_INTERFAZ) for _ in range(max(1, args.repeticiones))]
+    total_ms, tiempos = min(mediciones, key=lambda m: m[0])
+
+    print(f"Importación de {MODULO_INTERFAZ}: {total_ms:.1f} ms (presupuesto {args.presupuesto:.0f} ms)")
+    print("Módulos más lentos:")
+    for nombre, ms in sorted(tiempos.items(), key=lambda t: -t[1])[:10]:
+        print(f"  {ms:8.1f} ms  {nombre}")
+
+    errores = []
+    if total_ms > args.presupuesto:
+        errores.append(f"el arranque tarda {total_ms:.1f} ms, más que el presupuesto de {args.presupuesto:.0f} ms")
+    cargados = sorted({n.split(".")[0] for n in tiempos} & set(MODULOS_PESADOS))
+    if cargados:
+        errores.append(f"se importan módulos pesados al arrancar: {', '.join(cargados)}")
+
+    for error in errores:
+        print(f"FALLO: {error}", file=sys.stderr)
+    if not errores:
+        print("OK")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Velocidad de exportación de componentes por formato (acp.exportacion).
+
+Escribe la misma matriz sintética de componentes en cada formato de
+FORMATOS_EXPORTACION y muestra tiempo, filas por segundo y tamaño del
+archivo. Como referencia mide también la exportación anterior a Excel
+(DataFrame completo + pandas.to_excel con openpyxl), que se puede omitir con
+--sin-referencia porque es la más lenta con muchas filas. Los formatos cuya
+librería no está instalada se indican y se saltan.
+
+Uso:
+    python benchmarks/exportacion.py [--filas N] [--componentes K] [--sin-referencia]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acp.exportacion import nombres_columnas # noqa: E402
+from acp.motor import exportar_componentes # noqa: E402
+from acp.parametros import FORMATOS_EXPORTACION # noqa: E402
+
+FILAS = 200_000
+COMPONENTES = 10
+
+
+def exportar_con_pandas(datos, filepath):
+    """La exportación a Excel de antes: DataFrame completo y to_excel."""
+    df = pd.DataFrame(datos, columns=nombres_columnas(datos.shape[1])[:-1])
+    df['COMPONENTE_SUMA'] = df.sum(axis=1)
+    df.to_excel(filepath, index=False, engine='openpyxl')
+
+
+def medir(funcion, datos, filepath):
+    inicio = time.perf_counter()
+    funcion(datos, filepath)
+    return time.perf_counter() - inicio, os.path.getsize(filepath)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, default=FILAS)
+    parser.add_argument("--componentes", type=int, default=COMPONENTES)
+    parser.add_argument("--sin-referencia", action="store_true",
+                        help="No mide la exportación anterior con pandas.to_excel.")
+    args = parser.parse_args(argv)
+
+    datos = np.random.default_rng(0).normal(size=(args.filas, args.componentes))
+    casos = [(f"{extension[1:]:<8} {descripcion}", exportar_componentes, extension)
+             for extension, descripcion in FORMATOS_EXPORTACION.items()]
+    if not args.sin_referencia:
+        casos.append(("xlsx     pandas.to_excel (referencia)", exportar_con_pandas, ".xlsx"))
+
+    print(f"{args.filas:,} filas x {args.componentes} componentes (+ COMPONENTE_SUMA)\n")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for nombre, funcion, extension in casos:
+            filepath = os.path.join(carpeta, f"componentes{extension}")
+            try:
+                segundos, tamano = medir(funcion, datos, filepath)
+            except ImportError as e:
+                print(f"  {nombre:<38} omitido ({e.name} no está instalado)")
+                continue
+            print(f"  {nombre:<38} {segundos:8.2f} s  {args.filas / segundos:>12,.0f} filas/s  {tamano / 1024 ** 2:8.1f} MB")
+            os.remove(filepath)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
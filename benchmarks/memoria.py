@@ -0,0 +1,95 @@
+"""
+Presupuesto de memoria del análisis en memoria (acp.motor.analizar_pca).
+
+Analiza una tabla sintética (numérica, con un 1 % de faltantes) en cada
+combinación de precisión y almacenamiento y comprueba que (1) el pico de
+memoria de Python y NumPy (tracemalloc, sin contar la tabla de entrada) no
+pase de MULTIPLOS_PICO veces el tamaño de la entrada más BLOQUES_FIJOS
+bloques de trabajo (un costo fijo que no crece con la entrada, así que el
+presupuesto vale con cualquier --filas) y (2) el análisis no
+reserve más de MAX_ARREGLOS_COMPLETOS arreglos del tamaño de los datos (la
+matriz limpia y los componentes). Los mapeos en disco no cuentan para
+tracemalloc: en ese modo el pico es solo lo que queda en RAM.
+
+Uso:
+    python benchmarks/memoria.py [--filas N] [--variables N]
+
+Devuelve código 1 si se incumple el presupuesto.
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from acp.motor import ELEMENTOS_POR_BLOQUE, analizar_pca # noqa: E402
+
+FILAS = 400_000
+VARIABLES = 60
+FRACCION_FALTANTES = 0.01 # Celdas vacías en los datos sintéticos
+MAX_ARREGLOS_COMPLETOS = 2 # Matriz limpia (estandarizada en el sitio) y componentes
+BLOQUES_FIJOS = 3 # Búferes de ELEMENTOS_POR_BLOQUE celdas en float64 permitidos además del múltiplo (conversión, filas válidas, proyección)
+# Pico permitido, en veces el tamaño de la entrada (más BLOQUES_FIJOS), por (precisión, en disco). Con todos los
+# componentes: float64 = matriz limpia + componentes, float32 = la mitad, en disco = solo bloques
+MULTIPLOS_PICO = {
+    ("float64", False): 2.25,
+    ("float32", False): 1.25,
+    ("float32", True): 0.5,
+}
+
+
+def datos_sinteticos(filas, variables, semilla=0):
+    rng = np.random.default_rng(semilla)
+    datos = rng.normal(size=(filas, variables)) @ rng.normal(size=(variables, variables))
+    datos[rng.random(datos.shape) < FRACCION_FALTANTES] = np.nan
+    return pd.DataFrame(datos, columns=[f"V{j + 1}" for j in range(variables)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, default=FILAS)
+    parser.add_argument("--variables", type=int, default=VARIABLES)
+    args = parser.parse_args(argv)
+
+    datos = datos_sinteticos(args.filas, args.variables)
+    columnas = list(datos.columns)
+    entrada = int(datos.memory_usage(index=False).sum())
+    # Los imports perezosos (scikit-learn, etc.) no son parte del análisis
+    analizar_pca(datos.iloc[:100], columnas)
+
+    fijo = BLOQUES_FIJOS * ELEMENTOS_POR_BLOQUE * np.dtype(np.float64).itemsize
+    print(f"Entrada: {args.filas:,} x {args.variables} ({entrada / 1024 ** 2:.1f} MB), "
+          f"más {fijo / 1024 ** 2:.0f} MB fijos de bloques")
+    errores = []
+    for (precision, en_disco), multiplo in MULTIPLOS_PICO.items():
+        tracemalloc.start()
+        try:
+            resultado = analizar_pca(datos, columnas, precision=precision, en_disco=en_disco)
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        nombre = f"{precision}{', en disco' if en_disco else ''}"
+        print(f"  {nombre:<20} pico {pico / 1024 ** 2:8.1f} MB = {pico / entrada:5.2f} x entrada "
+              f"(máximo {multiplo:.2f} x entrada + fijo), {resultado.arreglos_completos} arreglos completos")
+        if pico > multiplo * entrada + fijo:
+            errores.append(f"{nombre}: el pico es {pico / 1024 ** 2:.1f} MB; el máximo es {multiplo:.2f} veces la "
+                           f"entrada más {fijo / 1024 ** 2:.0f} MB ({(multiplo * entrada + fijo) / 1024 ** 2:.1f} MB)")
+        if resultado.arreglos_completos > MAX_ARREGLOS_COMPLETOS:
+            errores.append(f"{nombre}: {resultado.arreglos_completos} arreglos del tamaño de los datos "
+                           f"(máximo {MAX_ARREGLOS_COMPLETOS})")
+        del resultado
+
+    for error in errores:
+        print(f"FALLO: {error}", file=sys.stderr)
+    if not errores:
+        print("OK")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
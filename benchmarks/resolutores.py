@@ -0,0 +1,72 @@
+"""
+Tiempos y validación de los resolutores de PCA (acp.resolutores).
+
+Para datos sintéticos altos, anchos y grandes con pocos componentes, mide
+cada resolutor, indica cuál elige el modo automático y compara el resultado
+con la SVD completa. Devuelve código 1 si algún resolutor se sale de la
+tolerancia.
+
+Uso:
+    python benchmarks/resolutores.py [--semilla N]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acp.resolutores import TOLERANCIA_VALIDACION, elegir_resolutor, resolver_pca, validar_resolutor # noqa: E402
+
+# (nombre, filas, variables, componentes pedidos)
+CASOS = [
+    ("alto", 20_000, 60, None),
+    ("ancho", 300, 3_000, None),
+    ("grande, pocos componentes", 4_000, 1_000, 5),
+]
+MAX_DIMENSION_EIGH = 5_000 # No se prueba eigh sobre matrices más grandes que esto (memoria)
+
+
+def datos_sinteticos(n, p, rng, rango=20):
+    """Datos con espectro decreciente (como variables correlacionadas reales), estandarizados."""
+    latentes = rng.normal(size=(n, rango)) * np.geomspace(10.0, 0.5, rango)
+    X = latentes @ rng.normal(size=(rango, p)) + 0.1 * rng.normal(size=(n, p))
+    X -= X.mean(axis=0)
+    return X / X.std(axis=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(args.semilla)
+
+    fallos = []
+    for nombre, n, p, k in CASOS:
+        Z = datos_sinteticos(n, p, rng)
+        automatico = elegir_resolutor(n, p, k)
+        print(f"\n{nombre}: {n} x {p}, componentes pedidos: {k or 'todos'} (automático: {automatico})")
+        resolutores = [r for r, dimension in (("covarianza", p), ("gram", n)) if dimension <= MAX_DIMENSION_EIGH]
+        resolutores += ["exacto"] + (["aleatorio"] if k else [])
+        for resolutor in resolutores:
+            resultado = resolver_pca(Z, k, resolutor)
+            if k:
+                resultado.componentes = resultado.componentes[:k]
+                resultado.varianzas = resultado.varianzas[:k]
+            error_var, error_comp, valido = validar_resolutor(Z, resultado)
+            marca = "*" if resolutor == automatico else " "
+            print(f" {marca} {resolutor:<11} {resultado.segundos:8.3f} s   error varianzas {error_var:.1e}"
+                  f"   error cargas {error_comp:.1e}   {'OK' if valido else 'FUERA DE TOLERANCIA'}")
+            if not valido:
+                fallos.append(f"{nombre}/{resolutor}")
+
+    if fallos:
+        print(f"\nFALLO (tolerancia {TOLERANCIA_VALIDACION:g}): {', '.join(fallos)}", file=sys.stderr)
+        return 1
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
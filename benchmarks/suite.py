@@ -0,0 +1,267 @@
+"""
+Suite de rendimiento: carga, análisis, búsqueda de combinaciones y exportación.
+
+Mide cada etapa sin ventana sobre datos sintéticos (rejilla de filas x
+variables, con un 1 % de faltantes para que la limpieza haga algo y la
+búsqueda de combinaciones en varios tamaños máximos k) y sobre el archivo
+del proyecto, 'nueva_base_1 2(matriz).csv', como caso real. De cada etapa
+se guarda el mejor tiempo de --repeticiones y el pico de memoria de Python
+y NumPy (tracemalloc, en una ejecución aparte para no inflar los tiempos).
+
+Los resultados se pueden guardar como base (JSON) y comparar con una base
+anterior de la misma máquina: es una regresión si una etapa tarda más de
+--umbral-tiempo veces lo que tardaba (y al menos MIN_SEGUNDOS_REGRESION
+más) o usa más de --umbral-memoria veces su memoria (y al menos
+MIN_MB_REGRESION más). Las bases van por defecto a benchmarks/bases/, que
+no se versiona: los tiempos solo son comparables en la misma máquina.
+
+Uso:
+    python benchmarks/suite.py [--rapido] [--filtro TEXTO] [--repeticiones N]
+                               [--guardar [RUTA]] [--comparar [RUTA]]
+                               [--umbral-tiempo X] [--umbral-memoria X] [--sin-memoria]
+
+Devuelve código 1 si hay regresiones respecto de la base comparada.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from acp.carga import FuenteDatos, pyarrow_disponible # noqa: E402
+from acp.estadisticas import EstadisticasSuficientes, analizar_pca_desde_estadisticas # noqa: E402
+from acp.motor import analizar_pca, buscar_combinaciones, exportar_componentes # noqa: E402
+from acp.seleccion import columnas_por_defecto # noqa: E402
+
+ARCHIVO_REAL = os.path.join(RAIZ, "nueva_base_1 2(matriz).csv")
+RUTA_BASE = os.path.join(RAIZ, "benchmarks", "bases", "suite.json")
+VERSION_BASE = 1
+
+# Rejilla de datos sintéticos: (filas, variables)
+CASOS_SINTETICOS = [(10_000, 10), (10_000, 200), (200_000, 10), (200_000, 50)]
+CASOS_RAPIDOS = [(2_000, 10), (2_000, 50)]
+# Búsqueda de combinaciones: (modo, variables candidatas, tamaños máximos k)
+BUSQUEDAS = [("exacta", 16, (4, 6, 9)), ("gray", 16, (9,)), ("intercambio", 50, (9,))]
+BUSQUEDAS_RAPIDAS = [("exacta", 10, (4, 6)), ("gray", 10, (6,)), ("intercambio", 30, (6,))]
+FRACCION_FALTANTES = 0.01 # Celdas vacías en los datos sintéticos
+REPETICIONES = 3 # Se toma el mejor tiempo para no medir ruido del sistema
+UMBRAL_TIEMPO = 1.25 # Regresión si una etapa tarda 25 % más que en la base...
+MIN_SEGUNDOS_REGRESION = 0.01 # ...y al menos esto más (las etapas muy cortas son ruidosas)
+UMBRAL_MEMORIA = 1.10 # Regresión si el pico de memoria crece 10 %...
+MIN_MB_REGRESION = 1.0 # ...y al menos esto más
+
+
+def datos_sinteticos(filas, variables, rng, rango=5):
+    """Variables correlacionadas (pocos factores latentes) con FRACCION_FALTANTES de celdas vacías."""
+    latentes = rng.normal(size=(filas, rango)) * np.geomspace(5.0, 0.5, rango)
+    datos = latentes @ rng.normal(size=(rango, variables)) + rng.normal(size=(filas, variables))
+    datos[rng.random(datos.shape) < FRACCION_FALTANTES] = np.nan
+    return pd.DataFrame(datos, columns=[f"V{j + 1}" for j in range(variables)])
+
+
+def medir(funcion, repeticiones, con_memoria):
+    """
+    Mejor tiempo de 'repeticiones' llamadas a 'funcion' y, si 'con_memoria',
+    el pico de memoria de una llamada más bajo tracemalloc.
+
+    Returns:
+        dict: {"segundos": float, "pico_mb": float o None}
+    """
+    tiempos = []
+    for _ in range(max(1, repeticiones)):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    pico_mb = None
+    if con_memoria:
+        tracemalloc.start()
+        try:
+            funcion()
+            pico_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return {"segundos": min(tiempos), "pico_mb": pico_mb}
+
+
+def etapas_archivo(nombre, ruta, columnas, carpeta):
+    """
+    (nombre de etapa, función) para un archivo: carga, análisis en memoria
+    (float64, y float32 con los arreglos en disco), estadísticas suficientes
+    y exportación de los componentes. Con pyarrow instalado también se mide
+    la carga con motor_csv="pyarrow", que debe dar los mismos datos que la del
+    motor c.
+    """
+    datos = FuenteDatos(ruta).cargar(columnas)
+    datos_simples = FuenteDatos(ruta).cargar(columnas, precision="float32")
+    resultado = analizar_pca(datos, columnas)
+    salida = os.path.join(carpeta, "componentes")
+
+    def estadisticas():
+        suficientes = EstadisticasSuficientes.desde_fuente(FuenteDatos(ruta))
+        if suficientes is not None:
+            analizar_pca_desde_estadisticas(suficientes, columnas)
+
+    etapas = [(f"{nombre}/carga", lambda: FuenteDatos(ruta).cargar(columnas))]
+    if pyarrow_disponible() and not ruta.lower().endswith((".xlsx", ".xls")):
+        # Los dos motores pueden redondear distinto el último dígito al convertir texto a float
+        pd.testing.assert_frame_equal(FuenteDatos(ruta).cargar(columnas, motor_csv="pyarrow"), datos,
+                                      check_exact=False, rtol=1e-12, obj=f"{nombre}: carga con pyarrow")
+        etapas.append((f"{nombre}/carga_pyarrow", lambda: FuenteDatos(ruta).cargar(columnas, motor_csv="pyarrow")))
+    return etapas + [
+        (f"{nombre}/analisis", lambda: analizar_pca(datos, columnas)),
+        (f"{nombre}/analisis_float32_disco",
+         lambda: analizar_pca(datos_simples, columnas, precision="float32", en_disco=True)),
+        (f"{nombre}/estadisticas", estadisticas),
+        (f"{nombre}/exportacion_npy", lambda: exportar_componentes(resultado.datos_transformados, salida + ".npy")),
+        (f"{nombre}/exportacion_csv", lambda: exportar_componentes(resultado.datos_transformados, salida + ".csv")),
+    ]
+
+
+def etapas_combinaciones(nombre, datos, columnas, modo, max_k, n_componentes=1):
+    """Búsqueda de combinaciones en un solo proceso (el pool haría los tiempos poco comparables)."""
+    sufijo = f"_pc{n_componentes}" if n_componentes > 1 else ""
+    return [(f"{nombre}/combinaciones_{modo}_k{max_k}{sufijo}",
+             lambda: buscar_combinaciones(datos, columnas, modo=modo, max_k=max_k, procesos=1,
+                                          n_componentes=n_componentes))]
+
+
+def construir_etapas(rapido, carpeta, semilla):
+    """Todas las etapas de la suite, en el orden en que se ejecutan."""
+    rng = np.random.default_rng(semilla)
+    etapas = []
+
+    for filas, variables in (CASOS_RAPIDOS if rapido else CASOS_SINTETICOS):
+        nombre = f"sintetico_{filas}x{variables}"
+        ruta = os.path.join(carpeta, f"{nombre}.csv")
+        datos_sinteticos(filas, variables, rng).to_csv(ruta, index=False)
+        etapas += etapas_archivo(nombre, ruta, [f"V{j + 1}" for j in range(variables)], carpeta)
+
+    filas_busqueda = CASOS_RAPIDOS[0][0] if rapido else CASOS_SINTETICOS[0][0]
+    for modo, variables, tamanos in (BUSQUEDAS_RAPIDAS if rapido else BUSQUEDAS):
+        datos = datos_sinteticos(filas_busqueda, variables, rng)
+        for max_k in tamanos:
+            etapas += etapas_combinaciones(f"sintetico_{filas_busqueda}x{variables}", datos, list(datos.columns),
+                                           modo, max_k)
+
+    fuente = FuenteDatos(ARCHIVO_REAL)
+    columnas = columnas_por_defecto(fuente.columnas, fuente.numericas)
+    etapas += etapas_archivo("real", ARCHIVO_REAL, columnas, carpeta)
+    datos_reales = fuente.cargar(columnas)
+    etapas += etapas_combinaciones("real", datos_reales, columnas, "exacta", 9)
+    # Retención de PC1 a PC3: debe costar casi lo mismo que solo PC1
+    etapas += etapas_combinaciones("real", datos_reales, columnas, "exacta", 9, n_componentes=3)
+    return etapas
+
+
+def comparar(actual, base, umbral_tiempo, umbral_memoria):
+    """
+    Etapas de 'actual' que empeoraron respecto de 'base'.
+
+    Returns:
+        list: (etapa, descripción) de cada regresión.
+    """
+    regresiones = []
+    for etapa, medida in actual.items():
+        anterior = base.get(etapa)
+        if anterior is None:
+            continue
+        segundos, segundos_base = medida["segundos"], anterior["segundos"]
+        if segundos > segundos_base * umbral_tiempo and segundos - segundos_base >= MIN_SEGUNDOS_REGRESION:
+            regresiones.append((etapa, f"tiempo {segundos_base:.3f} s -> {segundos:.3f} s "
+                                       f"(x{segundos / segundos_base:.2f})"))
+        pico, pico_base = medida.get("pico_mb"), anterior.get("pico_mb")
+        if pico is not None and pico_base is not None \
+                and pico > pico_base * umbral_memoria and pico - pico_base >= MIN_MB_REGRESION:
+            regresiones.append((etapa, f"memoria {pico_base:.1f} MB -> {pico:.1f} MB (x{pico / pico_base:.2f})"))
+    return regresiones
+
+
+def leer_base(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        base = json.load(f)
+    if base.get("version") != VERSION_BASE:
+        raise ValueError(f"{ruta}: versión de base {base.get('version')} (se esperaba {VERSION_BASE})")
+    return base
+
+
+def guardar_base(ruta, resultados, args):
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    base = {
+        "version": VERSION_BASE,
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "maquina": f"{platform.machine()} {platform.processor()}".strip(),
+        "rapido": args.rapido,
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(base, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rapido", action="store_true", help="Datos pequeños (menos de un minuto).")
+    parser.add_argument("--filtro", default="", help="Solo las etapas cuyo nombre contiene este texto.")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--guardar", nargs="?", const=RUTA_BASE, metavar="RUTA",
+                        help=f"Guarda los resultados como base (por defecto {os.path.relpath(RUTA_BASE, RAIZ)}).")
+    parser.add_argument("--comparar", nargs="?", const=RUTA_BASE, metavar="RUTA",
+                        help="Compara con una base guardada y devuelve 1 si hay regresiones.")
+    parser.add_argument("--umbral-tiempo", type=float, default=UMBRAL_TIEMPO)
+    parser.add_argument("--umbral-memoria", type=float, default=UMBRAL_MEMORIA)
+    parser.add_argument("--sin-memoria", action="store_true", help="No mide el pico de memoria (más rápido).")
+    args = parser.parse_args(argv)
+
+    base = None
+    if args.comparar:
+        try:
+            base = leer_base(args.comparar)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer la base: {e}", file=sys.stderr)
+            return 1
+        if base.get("rapido") != args.rapido:
+            print("Aviso: la base se midió con otro tamaño de datos (--rapido); solo se comparan las etapas comunes.")
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        etapas = [(nombre, funcion) for nombre, funcion in construir_etapas(args.rapido, carpeta, args.semilla)
+                  if args.filtro in nombre]
+        print(f"{len(etapas)} etapas, mejor de {args.repeticiones} repeticiones\n")
+        for nombre, funcion in etapas:
+            medida = medir(funcion, args.repeticiones, not args.sin_memoria)
+            resultados[nombre] = medida
+            memoria = f"{medida['pico_mb']:9.1f} MB" if medida["pico_mb"] is not None else ""
+            referencia = ""
+            if base is not None and nombre in base["resultados"]:
+                referencia = f"   (base {base['resultados'][nombre]['segundos']:.3f} s)"
+            print(f"  {nombre:<52} {medida['segundos']:9.3f} s {memoria}{referencia}")
+
+    if args.guardar:
+        guardar_base(args.guardar, resultados, args)
+        print(f"\nBase guardada en: {args.guardar}")
+
+    if base is not None:
+        regresiones = comparar(resultados, base["resultados"], args.umbral_tiempo, args.umbral_memoria)
+        for etapa, descripcion in regresiones:
+            print(f"REGRESIÓN: {etapa}: {descripcion}", file=sys.stderr)
+        if regresiones:
+            return 1
+        print("\nOK: sin regresiones respecto de la base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())